@@ -0,0 +1,239 @@
+"""
+NAS Sync - Adaptive transfer tuning
+
+A fixed number of parallel copies and a fixed 1 MB buffer are never right
+for both a Wi-Fi NAS and a 10 GbE one. TransferTuner watches the bytes the
+copy workers move and how long each chunk takes, and every second adjusts
+the parallel transfers and the buffer size in turn, AIMD-style (like TCP
+congestion control):
+
+- throughput went up: one step up (one more transfer, next buffer size)
+- throughput dropped after a step up: halve that setting (multiplicative
+  decrease)
+- no clear change: parallel transfers keep growing while chunk latency
+  stays near the best seen, the buffer stays as it is
+- chunks take several times longer than the best seen, or fail: the NAS
+  is overloaded, halve the parallel transfers
+
+Parallel transfers double until the first window without a gain (like TCP
+slow start), so short runs benefit too.
+
+The best settings seen for a destination are stored in ~/.nassync/tuning.json
+and are where the next run starts.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+BUFFER_SIZES = tuple(1024 * 2 ** step for step in range(6, 14))   # 64 KB .. 8 MB
+
+WINDOW_SECONDS = 1.0
+
+# Relative throughput change that counts as better or worse
+GAIN = 0.05
+LOSS = 0.10
+
+# Median chunk latency above these multiples of the best seen: stop adding
+# transfers, and overload
+LATENCY_RISING = 1.5
+LATENCY_LIMIT = 3.0
+
+
+def _nearest_buffer(size, sizes=BUFFER_SIZES):
+    return min(sizes, key=lambda candidate: abs(candidate - size))
+
+
+class TransferTuner:
+    """AIMD controller for parallel transfers and the copy buffer size
+
+    Copy workers call acquire()/release() around each file (at most
+    `workers` run at once) and record() after each chunk.
+    """
+
+    def __init__(self, workers=2, buffer_size=1024 * 1024, min_workers=1, max_workers=8,
+                 buffer_sizes=BUFFER_SIZES, window=WINDOW_SECONDS, clock=time.monotonic,
+                 log=None):
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.workers = min(max(int(workers), self.min_workers), self.max_workers)
+        self.buffer_sizes = tuple(buffer_sizes)
+        self.buffer_size = _nearest_buffer(buffer_size, self.buffer_sizes)
+        self.window = window
+        self.clock = clock
+        self.log = log
+
+        self._cond = threading.Condition()
+        self._active = 0
+
+        self._window_start = clock()
+        self._window_bytes = 0
+        self._latencies = []
+        self._errors = 0
+
+        self._dimension = 'workers'
+        self._slow_start = True
+        self._stepped_up = None     # setting raised at the end of the last window
+        self._last_throughput = None
+        self._base_latency = None
+        self.windows = 0
+        self.best = None    # (bytes/s, workers, buffer size)
+
+    def acquire(self):
+        """Wait for a transfer slot"""
+        with self._cond:
+            while self._active >= self.workers:
+                self._cond.wait()
+            self._active += 1
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def record(self, nbytes, seconds, error=False):
+        """Account one chunk (or a failed transfer) and adjust at the end of a window"""
+        with self._cond:
+            self._window_bytes += nbytes
+            if seconds > 0:
+                self._latencies.append(seconds)
+            if error:
+                self._errors += 1
+
+            now = self.clock()
+            if now - self._window_start >= self.window:
+                self._adjust(now)
+
+    def restart_window(self):
+        """Start a new window, e.g. after a pause (no traffic is not a slow NAS)"""
+        with self._cond:
+            self._window_start = self.clock()
+            self._window_bytes = 0
+            self._latencies = []
+            self._errors = 0
+
+    def _adjust(self, now):
+        elapsed = now - self._window_start
+        moved = self._window_bytes
+        latencies = sorted(self._latencies)
+        errors = self._errors
+
+        self._window_start = now
+        self._window_bytes = 0
+        self._latencies = []
+        self._errors = 0
+        if not moved and not errors:
+            return      # idle (scanning, comparing): nothing to learn
+
+        self.windows += 1
+        throughput = moved / elapsed
+        latency = latencies[len(latencies) // 2] if latencies else None
+        if latency is not None:
+            self._base_latency = min(self._base_latency or latency, latency)
+
+        # Clearly faster only: of equal settings the lighter one is kept
+        if self.best is None or throughput > self.best[0] * (1 + GAIN):
+            self.best = (throughput, self.workers, self.buffer_size)
+
+        last = self._last_throughput
+        self._last_throughput = throughput
+        ratio = latency / self._base_latency if latency and self._base_latency else 1.0
+        gain = last is None or throughput > last * (1 + GAIN)
+
+        stepped_up, self._stepped_up = self._stepped_up, None
+        if errors or ratio > LATENCY_LIMIT:
+            self._dimension = 'workers'
+            self._decrease('overloaded')
+        elif stepped_up and throughput < last * (1 - LOSS):
+            # The last step up made things worse
+            self._dimension = stepped_up
+            self._decrease('slower')
+        elif gain or (self._dimension == 'workers' and ratio <= LATENCY_RISING):
+            self._increase()
+
+        if not gain:
+            self._slow_start = False
+        if not self._slow_start:
+            self._dimension = 'buffer' if self._dimension == 'workers' else 'workers'
+
+    def _increase(self):
+        """One step up on the current setting, up to its limit"""
+        before = (self.workers, self.buffer_size)
+        if self._dimension == 'workers':
+            step = self.workers if self._slow_start else 1
+            self.workers = min(self.max_workers, self.workers + step)
+            self._cond.notify_all()
+        else:
+            index = self.buffer_sizes.index(self.buffer_size)
+            self.buffer_size = self.buffer_sizes[min(len(self.buffer_sizes) - 1, index + 1)]
+        if (self.workers, self.buffer_size) != before:
+            self._stepped_up = self._dimension
+
+    def _decrease(self, reason):
+        if self._dimension == 'workers':
+            self.workers = max(self.min_workers, self.workers // 2)
+        else:
+            index = self.buffer_sizes.index(self.buffer_size)
+            self.buffer_size = self.buffer_sizes[max(0, index - 1)]   # half the size
+        if self.log:
+            self.log(f"Transfer tuning ({reason}): {self.describe()}", "INFO")
+
+    def describe(self, settings=None):
+        workers, buffer_size = settings or (self.workers, self.buffer_size)
+        return f"{workers} parallel transfers, {buffer_size // 1024} KB buffer"
+
+    def best_settings(self):
+        """(workers, buffer size) of the fastest window, or the current settings"""
+        if self.best is None:
+            return self.workers, self.buffer_size
+        return self.best[1], self.best[2]
+
+
+class TuningStore:
+    """Best transfer settings per destination, in ~/.nassync/tuning.json"""
+
+    def __init__(self, store_file=None):
+        self.store_file = Path(store_file) if store_file else \
+            Path.home() / '.nassync' / 'tuning.json'
+
+    def _load(self):
+        if not self.store_file.exists():
+            return {}
+        try:
+            with open(self.store_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading tuning data: {e}")
+            return {}
+
+    @staticmethod
+    def _key(destination):
+        return os.path.normcase(os.path.abspath(str(destination)))
+
+    def get(self, destination):
+        return self._load().get(self._key(destination))
+
+    def put(self, destination, tuner):
+        """Remember the tuner's best settings, if it saw enough traffic to judge"""
+        if tuner.best is None or tuner.windows < 3:
+            return
+        workers, buffer_size = tuner.best_settings()
+        data = self._load()
+        data[self._key(destination)] = {
+            'workers': workers,
+            'buffer_kb': buffer_size // 1024,
+            'throughput_mbps': round(tuner.best[0] / (1024 * 1024), 1),
+            'updated': datetime.now().isoformat(timespec='seconds'),
+        }
+        try:
+            self.store_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.store_file.with_suffix('.tmp')
+            with open(temp_file, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(temp_file, self.store_file)
+        except Exception as e:
+            print(f"Error saving tuning data: {e}")
@@ -0,0 +1,622 @@
+#!/usr/bin/env python3
+"""
+NAS Sync - Benchmark Suite
+Times SyncEngine on deterministic synthetic trees and compares the results
+against a saved baseline. Runs on a local disk or tmpfs, no NAS required.
+
+Examples:
+  python benchmark.py --tree mixed --output results.json
+  python benchmark.py --tree tiny --workdir /dev/shm --baseline baseline.json
+  python benchmark.py --tree all --save-baseline baseline.json
+  python benchmark.py --tree tiny --latency linkstation --scale 0.2
+  python benchmark.py --memory 1000000
+  python benchmark.py --order-curve --tree mixed --latency linkstation
+  python benchmark.py --tree tiny --latency linkstation --pack zlib
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from fnmatch import fnmatch
+from pathlib import Path
+
+from latency_fs import LATENCY_PROFILES, SimulatedFS
+from pack_store import COMPRESSIONS
+from sync_engine import SyncEngine
+
+
+# Fixed reference time so generated mtimes are identical on every run
+BASE_MTIME = 1700000000
+OLD_AGE_DAYS = 400
+RETENTION_WINDOW_DAYS = 200
+
+
+def retention_days():
+    """Retention period that keeps recent files and drops the old fifth"""
+    return int((time.time() - BASE_MTIME) // 86400) + RETENTION_WINDOW_DAYS
+
+TREE_PROFILES = {
+    # name: (tiny files, tiny max size, huge files, huge size MB, depth, branching)
+    'tiny': (5000, 4096, 0, 0, 0, 0),
+    'huge': (0, 0, 3, 64, 0, 0),
+    'deep': (0, 0, 0, 0, 10, 2),
+    'mixed': (2000, 16384, 1, 64, 6, 2),
+}
+
+SCENARIOS = ('cold_copy', 'noop_resync', 'verify', 'mirror_delete', 'retention')
+
+# Transfer orders compared by --order-curve; 'priority' is scan order with
+# PRIORITY_PATTERNS first
+ORDER_STRATEGIES = ('scan', 'newest', 'smallest', 'physical', 'priority')
+PRIORITY_PATTERNS = '*9.dat'   # every tenth tiny file, spread over the tree
+
+# Share of files reported by --order-curve, and the share counted as "recent"
+PROTECTED_MARKS = (0.5, 0.9, 1.0)
+RECENT_SHARE = 0.1
+
+
+class TreeGenerator:
+    """Build a reproducible directory tree from a profile and a seed"""
+
+    def __init__(self, seed=42, scale=1.0):
+        self.seed = seed
+        self.scale = scale
+
+    def _mtime(self, rng):
+        # One file in five is older than the retention window
+        if rng.random() < 0.2:
+            return BASE_MTIME - OLD_AGE_DAYS * 86400 - rng.randint(0, 86400 * 30)
+        return BASE_MTIME - rng.randint(0, 86400 * 30)
+
+    def _write(self, path, data, rng):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        mtime = self._mtime(rng)
+        os.utime(path, (mtime, mtime))
+
+    def _block(self, rng, size):
+        return rng.getrandbits(size * 8).to_bytes(size, 'little') if size else b''
+
+    def generate(self, root, profile):
+        """Create the tree for `profile` under root and return a summary"""
+        rng = random.Random(f"{self.seed}:{profile}")
+        root = Path(root)
+        root.mkdir(parents=True, exist_ok=True)
+
+        tiny_count, tiny_max, huge_count, huge_mb, depth, branching = TREE_PROFILES[profile]
+        tiny_count = int(tiny_count * self.scale)
+        huge_size = int(huge_mb * 1024 * 1024 * self.scale)
+
+        files = 0
+        total_bytes = 0
+
+        # Many tiny files, 100 per directory
+        for i in range(tiny_count):
+            size = rng.randint(0, tiny_max)
+            path = root / 'tiny' / f"d{i // 100:04d}" / f"f{i:06d}.dat"
+            self._write(path, self._block(rng, size), rng)
+            files += 1
+            total_bytes += size
+
+        # A few huge files, built from a repeated 1 MB random block
+        if huge_count:
+            block = self._block(rng, 1024 * 1024)
+            for i in range(huge_count):
+                path = root / 'huge' / f"image{i:02d}.bin"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, 'wb') as f:
+                    written = 0
+                    while written < huge_size:
+                        chunk = block[:huge_size - written]
+                        f.write(chunk)
+                        written += len(chunk)
+                mtime = self._mtime(rng)
+                os.utime(path, (mtime, mtime))
+                files += 1
+                total_bytes += huge_size
+
+        # Deep nesting: two small files per directory at every level
+        if depth:
+            stack = [(root / 'deep', 1)]
+            while stack:
+                directory, level = stack.pop()
+                for j in range(2):
+                    size = rng.randint(0, 2048)
+                    self._write(directory / f"n{j}.txt", self._block(rng, size), rng)
+                    files += 1
+                    total_bytes += size
+                if level < depth:
+                    for b in range(branching):
+                        stack.append((directory / f"l{level}_{b}", level + 1))
+
+        # Settled directory mtimes, as in a real tree that was not just created
+        for directory, _, _ in os.walk(root, topdown=False):
+            os.utime(directory, (BASE_MTIME, BASE_MTIME))
+
+        return {'files': files, 'bytes': total_bytes}
+
+
+class Benchmark:
+    """Run sync scenarios against a generated tree"""
+
+    def __init__(self, workdir, repeat=3, engine_options=None, log=None,
+                 latency=None, latency_scale=1.0, error_rates=None):
+        self.workdir = Path(workdir)
+        self.repeat = repeat
+        self.engine_options = engine_options or {}
+        self.messages = log
+
+        # Simulated NAS conditions for the destination (see latency_fs.py)
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.error_rates = error_rates
+
+    def _log(self, message, level="INFO"):
+        if self.messages and level in ("ERROR", "WARNING"):
+            self.messages(f"[{level}] {message}")
+
+    def engine_config(self, source, destination, **overrides):
+        config = {
+            'source': str(source),
+            'destination': str(destination),
+            'mode': 'mirror',
+            'verify': False,
+            'subfolders': True,
+            'include': '*',
+            'exclude': '',
+            'retention_enabled': False,
+            'retention_days': retention_days(),
+            'listing_cache_dir': str(self.workdir / 'listings'),
+            # Throwaway destinations: keep them out of ~/.nassync/capabilities.json
+            'fs_probe': 'off',
+            'tuning_file': str(self.workdir / 'tuning.json'),
+            'journal_dir': str(self.workdir / 'journals'),
+            'pack_index_dir': str(self.workdir / 'packs'),
+        }
+        config.update(self.engine_options)
+        config.update(overrides)
+        return config
+
+    def run_engine(self, config, ledger=None, simulate=True):
+        """Run one sync, through the NAS simulator when one is configured"""
+        engine = SyncEngine(config, self._log, lambda value: None, ledger=ledger)
+
+        if not simulate or not (self.latency or self.error_rates):
+            started = time.perf_counter()
+            result = engine.sync()
+            result['wall'] = time.perf_counter() - started
+            return result
+
+        with SimulatedFS(config['destination'], profile=self.latency,
+                         scale=self.latency_scale, error_rates=self.error_rates) as fs:
+            started = time.perf_counter()
+            result = engine.sync()
+            result['wall'] = time.perf_counter() - started
+        result['fs'] = fs.summary()
+        return result
+
+    def _prepare_extras(self, destination, count=200):
+        """Add files to the destination that mirror mode must delete"""
+        for i in range(count):
+            path = destination / 'extra' / f"d{i // 50}" / f"x{i:04d}.dat"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b'x' * (i % 512))
+
+    def run_scenario(self, name, source):
+        """Run one scenario `repeat` times and return the timings"""
+        runs = []
+
+        for _ in range(self.repeat):
+            destination = self.workdir / 'dest'
+            if destination.exists():
+                shutil.rmtree(destination)
+            shutil.rmtree(self.workdir / 'listings', ignore_errors=True)
+            shutil.rmtree(self.workdir / 'packs', ignore_errors=True)
+
+            if name == 'cold_copy':
+                result = self.run_engine(self.engine_config(source, destination))
+            else:
+                # Every other scenario starts from a synchronized destination
+                self.run_engine(self.engine_config(source, destination), simulate=False)
+
+                if name == 'noop_resync':
+                    result = self.run_engine(self.engine_config(source, destination))
+                elif name == 'verify':
+                    result = self.run_engine(self.engine_config(source, destination, verify=True))
+                elif name == 'mirror_delete':
+                    self._prepare_extras(destination)
+                    result = self.run_engine(self.engine_config(source, destination))
+                elif name == 'retention':
+                    result = self.run_engine(self.engine_config(
+                        source, destination, mode='copy', retention_enabled=True))
+                else:
+                    raise ValueError(f"Unknown scenario: {name}")
+
+            runs.append(result)
+
+        walls = [run['wall'] for run in runs]
+        best = runs[walls.index(min(walls))]
+
+        return {
+            'wall_min': round(min(walls), 4),
+            'wall_median': round(statistics.median(walls), 4),
+            'copied': best.get('copied', 0),
+            'updated': best.get('updated', 0),
+            'deleted': best.get('deleted', 0),
+            'skipped': best.get('skipped', 0),
+            'errors': best.get('errors', 0),
+            'phases': best.get('phases', {}),
+            'fs': best.get('fs'),
+        }
+
+    def run(self, trees, scenarios, seed=42, scale=1.0):
+        """Generate each tree and run every scenario on it"""
+        generator = TreeGenerator(seed, scale)
+        results = {}
+
+        for tree in trees:
+            source = self.workdir / f"source_{tree}"
+            if source.exists():
+                shutil.rmtree(source)
+
+            started = time.perf_counter()
+            summary = generator.generate(source, tree)
+            summary['generate_seconds'] = round(time.perf_counter() - started, 3)
+
+            tree_results = {'tree': summary, 'scenarios': {}}
+            for scenario in scenarios:
+                print(f"  {tree:6} {scenario:14}", end=" ", flush=True)
+                tree_results['scenarios'][scenario] = self.run_scenario(scenario, source)
+                print(f"{tree_results['scenarios'][scenario]['wall_median']:.3f}s")
+
+            results[tree] = tree_results
+            shutil.rmtree(source, ignore_errors=True)
+
+        return results
+
+
+class ProtectionRecorder:
+    """Transfer ledger stand-in that notes when each file reached the destination"""
+
+    def __init__(self):
+        self.started = None
+        self.protected = []     # (seconds since start, relative path, size)
+
+    def begin_run(self, source, destination):
+        self.started = time.perf_counter()
+        return 0
+
+    def record(self, run_id, rel_path, action, size=0, duration=0.0, error=None):
+        if action in ('copied', 'updated') and not error:
+            self.protected.append((time.perf_counter() - self.started, str(rel_path), size))
+
+    def flush_if_due(self):
+        pass
+
+    def flush(self):
+        pass
+
+
+def protection_curve(protected, total_files, total_bytes, groups):
+    """Seconds until shares of the files and bytes, and whole groups, were copied
+
+    groups maps a name to a set of relative paths (recent files, priority files).
+    """
+    times = sorted(protected)
+    curve = {}
+    for mark in PROTECTED_MARKS:
+        needed = max(1, int(round(total_files * mark)))
+        curve[f"files_{mark:.0%}"] = round(times[needed - 1][0], 4) \
+            if len(times) >= needed else None
+
+    copied = 0
+    curve['bytes_50%'] = None
+    for seconds, _, size in times:
+        copied += size
+        if copied >= total_bytes / 2:
+            curve['bytes_50%'] = round(seconds, 4)
+            break
+
+    for name, members in groups.items():
+        done = [seconds for seconds, rel_path, _ in times if rel_path in members]
+        curve[f"{name}_100%"] = round(max(done), 4) \
+            if members and len(done) == len(members) else None
+    return curve
+
+
+def order_benchmark(bench, source, strategies=ORDER_STRATEGIES):
+    """Cold copy of source in each transfer order: time to N% protected
+
+    "Recent" files are the newest RECENT_SHARE of the tree by mtime, the
+    ones that matter most after an outage; "priority" files match
+    PRIORITY_PATTERNS.
+    """
+    files = []
+    for directory, _, names in os.walk(source):
+        for name in names:
+            path = os.path.join(directory, name)
+            st = os.stat(path)
+            files.append((st.st_mtime, os.path.relpath(path, source), st.st_size))
+    files.sort(reverse=True)
+    groups = {
+        'recent': {rel_path for _, rel_path, _ in files[:max(1, int(len(files) * RECENT_SHARE))]},
+        'priority': {rel_path for _, rel_path, _ in files
+                     if fnmatch(os.path.basename(rel_path), PRIORITY_PATTERNS)},
+    }
+    total_bytes = sum(size for _, _, size in files)
+
+    results = {}
+    for strategy in strategies:
+        if strategy == 'priority':
+            options = {'transfer_order': 'scan', 'priority_patterns': PRIORITY_PATTERNS}
+        else:
+            options = {'transfer_order': strategy}
+
+        curves = []
+        for _ in range(bench.repeat):
+            destination = bench.workdir / 'dest'
+            if destination.exists():
+                shutil.rmtree(destination)
+            recorder = ProtectionRecorder()
+            result = bench.run_engine(bench.engine_config(source, destination, **options),
+                                      ledger=recorder)
+            curve = protection_curve(recorder.protected, len(files), total_bytes, groups)
+            curve['wall'] = round(result['wall'], 4)
+            curves.append(curve)
+
+        # Median of each measure over the runs
+        results[strategy] = {}
+        for key in curves[0]:
+            values = [curve[key] for curve in curves]
+            results[strategy][key] = round(statistics.median(values), 4) \
+                if None not in values else None
+
+    header = ''.join(f"{key:>14}" for key in results[strategies[0]])
+    print(f"{'order':10}{header}")
+    for strategy, curve in results.items():
+        cells = ''.join(f"{'-':>14}" if value is None else f"{value:>13.3f}s"
+                        for value in curve.values())
+        print(f"{strategy:10}{cells}")
+    return results
+
+
+def compare_to_baseline(report, baseline, threshold):
+    """Return (rows, regressions) comparing median wall times.
+
+    With a latency profile the number of simulated filesystem operations is
+    deterministic, so any increase counts as a regression regardless of time.
+    """
+    rows = []
+    regressions = []
+
+    for tree, tree_results in report['results'].items():
+        base_tree = baseline.get('results', {}).get(tree, {}).get('scenarios', {})
+        for scenario, values in tree_results['scenarios'].items():
+            base = base_tree.get(scenario)
+            if not base or not base.get('wall_median'):
+                rows.append((tree, scenario, None, values['wall_median'], None))
+                continue
+
+            change = (values['wall_median'] - base['wall_median']) / base['wall_median']
+            rows.append((tree, scenario, base['wall_median'], values['wall_median'], change))
+            if change > threshold:
+                regressions.append(f"{tree}/{scenario}")
+
+            base_ops = (base.get('fs') or {}).get('ops', {})
+            ops = (values.get('fs') or {}).get('ops', {})
+            for op, count in sorted(ops.items()):
+                if op in base_ops and count > base_ops[op]:
+                    regressions.append(f"{tree}/{scenario} {op} ops {base_ops[op]} -> {count}")
+
+    return rows, regressions
+
+
+def print_comparison(rows, threshold):
+    print("\n" + "=" * 72)
+    print("COMPARISON WITH BASELINE")
+    print("=" * 72)
+    print(f"{'tree':8}{'scenario':16}{'baseline':>12}{'current':>12}{'change':>12}")
+    for tree, scenario, base, current, change in rows:
+        if base is None:
+            print(f"{tree:8}{scenario:16}{'-':>12}{current:>11.3f}s{'new':>12}")
+            continue
+        marker = "  !" if change > threshold else ""
+        print(f"{tree:8}{scenario:16}{base:>11.3f}s{current:>11.3f}s{change:>+11.1%}{marker}")
+
+
+def memory_benchmark(file_count, files_per_dir=200):
+    """Bytes per file held by a scan: list of Paths vs FileInventory
+
+    Builds both representations for a synthetic photo-archive layout in
+    memory (no files on disk) and measures them with tracemalloc. Mirror mode
+    used to add a set of relative Paths; the streaming diff needs nothing extra.
+    """
+    import tracemalloc
+    from file_inventory import FileInventory
+
+    root = '/mnt/nas/backup'
+
+    def entries():
+        for i in range(file_count):
+            d = i // files_per_dir
+            yield f"{d // 1000:02d}/{d // 10 % 100:02d}/album{d}", f"IMG_{i:07d}.jpg"
+
+    def legacy(mirror):
+        files = [Path(root, rel_dir, name) for rel_dir, name in entries()]
+        # The copy loop hashed every path (trusted_files lookup)
+        for file_path in files:
+            hash(file_path)
+        if mirror:
+            return files, {file_path.relative_to(root) for file_path in files}
+        return files
+
+    def compact():
+        files = FileInventory(root)
+        last_dir = dir_index = None
+        for rel_dir, name in entries():
+            if rel_dir != last_dir:
+                dir_index = files.add_dir(rel_dir)
+                last_dir = rel_dir
+            files.add(dir_index, name, 4096, BASE_MTIME)
+        return files
+
+    results = {}
+    for name, build in (('paths', lambda: legacy(False)), ('paths+mirror', lambda: legacy(True)),
+                        ('inventory', compact)):
+        tracemalloc.start()
+        held = build()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del held
+        results[name] = {'bytes_per_file': current / file_count,
+                         'peak_bytes_per_file': peak / file_count}
+
+    print(f"{'representation':20}{'bytes/file':>12}{'peak/file':>12}")
+    for name, result in results.items():
+        print(f"{name:20}{result['bytes_per_file']:>12.0f}{result['peak_bytes_per_file']:>12.0f}")
+    return results
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the NAS Sync engine on synthetic trees")
+    parser.add_argument('--tree', default='mixed', choices=sorted(TREE_PROFILES) + ['all'],
+                        help="Synthetic tree profile to generate")
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Multiply file counts and huge file sizes")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the tree generator")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per scenario")
+    parser.add_argument('--workdir', help="Directory for generated trees (e.g. /dev/shm)")
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    parser.add_argument('--baseline', help="Compare against a previously saved report")
+    parser.add_argument('--save-baseline', help="Save this report as a baseline file")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Relative slowdown that counts as a regression (default 0.2)")
+    parser.add_argument('--latency', choices=sorted(LATENCY_PROFILES),
+                        help="Simulate NAS latency and throughput on the destination")
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help="Multiply the simulated per-operation latency")
+    parser.add_argument('--listing-cache', choices=('off', 'on', 'trust'),
+                        help="Source listing cache mode (default: engine default)")
+    parser.add_argument('--scan-threads', type=int,
+                        help="Directories listed concurrently (default: engine default)")
+    parser.add_argument('--auto-tune', choices=('on', 'off'),
+                        help="Tune parallel transfers and buffer while copying (default: on)")
+    parser.add_argument('--transfer-workers', type=int,
+                        help="Parallel transfers (starting point when auto-tuning)")
+    parser.add_argument('--pack', choices=COMPRESSIONS,
+                        help="Pack small files with this compression (default: no packing)")
+    parser.add_argument('--order-curve', action='store_true',
+                        help="Only compare transfer orders: time until 50/90/100%% of the "
+                             "files, half the bytes and the newest files were copied")
+    parser.add_argument('--memory', type=int, metavar='FILES',
+                        help="Only measure scan memory per file for this many files")
+    parser.add_argument('--error-rate', action='append', default=[], metavar='OP=RATE',
+                        help="Inject errors, e.g. --error-rate stat=0.01 (repeatable)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.memory:
+        results = memory_benchmark(args.memory)
+        if args.output:
+            Path(args.output).write_text(json.dumps({'memory': results}, indent=2))
+        return 0
+
+    trees = sorted(TREE_PROFILES) if args.tree == 'all' else [args.tree]
+    scenarios = args.scenario or list(SCENARIOS)
+
+    error_rates = {}
+    for item in args.error_rate:
+        op, _, rate = item.partition('=')
+        error_rates[op] = float(rate)
+
+    workdir = Path(tempfile.mkdtemp(prefix='nassync_bench_', dir=args.workdir))
+    print(f"Benchmark workdir: {workdir}")
+
+    try:
+        engine_options = {}
+        if args.listing_cache:
+            engine_options['listing_cache'] = args.listing_cache
+        if args.scan_threads:
+            engine_options['scan_threads'] = args.scan_threads
+        if args.auto_tune:
+            engine_options['auto_tune'] = args.auto_tune == 'on'
+        if args.transfer_workers:
+            engine_options['transfer_workers'] = args.transfer_workers
+        if args.pack:
+            engine_options['pack_small_files'] = True
+            engine_options['pack_compression'] = args.pack
+
+        bench = Benchmark(workdir, repeat=args.repeat, engine_options=engine_options,
+                          log=print, latency=args.latency,
+                          latency_scale=args.latency_scale, error_rates=error_rates)
+        if args.order_curve:
+            results = {}
+            generator = TreeGenerator(args.seed, args.scale)
+            for tree in trees:
+                source = workdir / f"source_{tree}"
+                summary = generator.generate(source, tree)
+                print(f"Tree {tree}: {summary['files']} files")
+                results[tree] = {'tree': summary, 'orders': order_benchmark(bench, source)}
+                shutil.rmtree(source, ignore_errors=True)
+        else:
+            results = bench.run(trees, scenarios, seed=args.seed, scale=args.scale)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': f"{platform.system()} {platform.release()}",
+            'machine': platform.machine(),
+            'seed': args.seed,
+            'scale': args.scale,
+            'repeat': args.repeat,
+            'workdir': str(args.workdir or tempfile.gettempdir()),
+            'latency': args.latency,
+            'latency_scale': args.latency_scale,
+            'error_rates': error_rates,
+            'engine_options': engine_options,
+        },
+        'results': results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+        print(f"Report written to {args.output}")
+    else:
+        print(output)
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(output)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline and not args.order_curve:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        rows, regressions = compare_to_baseline(report, baseline, args.threshold)
+        print_comparison(rows, args.threshold)
+        if regressions:
+            print(f"\nRegressions over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print("\nNo regressions")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
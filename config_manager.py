@@ -2,11 +2,89 @@ import json
 import os
 from pathlib import Path
 
+from fingerprint import DEFAULT_VERIFY_POLICY
+
+# Settings used when a key is missing from config.json (matches the GUI defaults)
+DEFAULT_CONFIG = {
+    'source': '',
+    'destination': '',
+    'interval': 30,
+    'mode': 'mirror',
+    'include': '*',
+    'exclude': '*.tmp,~*,.DS_Store,Thumbs.db',
+    'verify': True,
+    'verify_policy': DEFAULT_VERIFY_POLICY,
+    'sample_min_size_mb': 64,
+    'sample_blocks': 16,
+    'subfolders': True,
+    'bandwidth_limit': False,
+    'bandwidth_value': None,
+    'retention_enabled': False,
+    'retention_days': 30,
+    'notifications': False,
+    'history_max_entries': 100000,
+    'scheduled_sync': False,
+    'schedule_times': '09:00,18:00',
+    'schedule_jitter': 60,
+    'catch_up': 'once',
+    'profile_mode': 'off',
+    'profile_keep': 10,
+    'listing_cache': 'on',
+    'scan_threads': 8,
+    'hash_workers': 0,
+    'fs_probe': 'auto',
+    'copy_buffer_kb': 1024,
+    'auto_tune': True,
+    'transfer_workers': 2,
+    'max_transfer_workers': 8,
+    'range_copy_streams': 0,
+    'range_copy_min_mb': 512,
+    'transfer_order': 'scan',
+    'priority_patterns': '',
+    'resume_interrupted': True,
+    'pack_small_files': False,
+    'pack_max_kb': 128,
+    'pack_compression': 'none',
+    'pack_size_mb': 256,
+    'pack_compact_ratio': 0.5,
+    'jobs': [],
+    'max_parallel_jobs': 2,
+    'device_concurrency': 2
+}
+
+# Settings a job may override; everything else is shared by all jobs
+JOB_KEYS = ('name', 'source', 'destination', 'mode', 'include', 'exclude', 'verify',
+            'verify_policy', 'subfolders', 'retention_enabled', 'retention_days', 'priority',
+            'transfer_order', 'priority_patterns', 'enabled')
+
+DEFAULT_JOB = 'default'
+
+
+def get_jobs(config):
+    """Expand the configured jobs into complete per-job configurations
+
+    Without a 'jobs' list the top-level settings form a single job named
+    'default', which is how config files from older versions are read.
+    """
+    shared = {key: value for key, value in config.items() if key != 'jobs'}
+    jobs = []
+
+    for index, job in enumerate(config.get('jobs') or [{}]):
+        merged = dict(shared)
+        merged.update({key: value for key, value in job.items() if value is not None})
+        merged['name'] = job.get('name') or (DEFAULT_JOB if index == 0 else f"job{index + 1}")
+        merged.setdefault('priority', 'normal')
+        merged.setdefault('enabled', True)
+        jobs.append(merged)
+
+    return jobs
+
+
 class ConfigManager:
-    def __init__(self):
+    def __init__(self, config_file=None):
         # Store config in user's home directory
         self.config_dir = Path.home() / '.nassync'
-        self.config_file = self.config_dir / 'config.json'
+        self.config_file = Path(config_file) if config_file else self.config_dir / 'config.json'
 
         # Create config directory if it doesn't exist
         self.config_dir.mkdir(exist_ok=True)
@@ -34,6 +112,22 @@ class ConfigManager:
             print(f"Error loading config: {e}")
             return None
 
+    def load_config_with_defaults(self):
+        """Load configuration with defaults filled in for missing keys"""
+        config = dict(DEFAULT_CONFIG)
+        config.update(self.load_config() or {})
+        return config
+
+    def merged_config(self, values):
+        """The saved configuration with values laid over it
+
+        Keys only set in config.json (hash_workers, fs_probe, ...) are kept,
+        so they reach the jobs and survive saving from the GUI.
+        """
+        config = dict(self.load_config() or {})
+        config.update(values)
+        return config
+
     def get_config_path(self):
         """Get the path to the config file"""
         return str(self.config_file)
@@ -0,0 +1,337 @@
+"""
+NAS Sync - Cron-style scheduler
+
+Keeps scheduled runs in a heap ordered by deadline and sleeps until the
+earliest one instead of polling. Schedules can be fixed intervals, daily
+times ("09:00,18:00") or cron expressions ("*/15 8-18 * * 1-5", "@daily").
+
+- jitter: every deadline is delayed by a random 0..jitter seconds so many
+  machines sharing a NAS do not all start at the same second
+- catch-up: runs missed while the computer was asleep are either run once
+  on wake-up ('once') or dropped ('skip'); several missed runs never pile up
+- skip if running: a run that is due while the previous one is still going
+  is skipped
+"""
+
+import heapq
+import itertools
+import random
+import re
+import threading
+from datetime import datetime, timedelta
+
+
+CATCH_UP_POLICIES = ('once', 'skip')
+
+# Wake up at least this often to notice suspend/resume and clock changes
+MAX_SLEEP = 60
+
+MACROS = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+MONTH_NAMES = ['jan', 'feb', 'mar', 'apr', 'may', 'jun',
+               'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+DAY_NAMES = ['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat']
+
+TIME_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})$')
+
+
+def _parse_field(text, low, high, names=None, offset=0):
+    """Expand one cron field into the set of values it matches"""
+    def value(token):
+        token = token.lower()
+        if names and token in names:
+            return names.index(token) + offset
+        return int(token)
+
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"invalid step in '{text}'")
+
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            first, last = part.split('-', 1)
+            start, end = value(first), value(last)
+        else:
+            start = value(part)
+            end = high if step != 1 else start
+
+        if not low <= start <= end <= high:
+            raise ValueError(f"'{text}' is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+
+    return values
+
+
+class CronExpression:
+    """Standard five-field cron expression: minute hour day month weekday"""
+
+    def __init__(self, text):
+        self.text = text.strip()
+        fields = MACROS.get(self.text.lower(), self.text).split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression needs 5 fields: '{text}'")
+
+        minute, hour, day, month, weekday = fields
+        self.minutes = _parse_field(minute, 0, 59)
+        self.hours = _parse_field(hour, 0, 23)
+        self.days = _parse_field(day, 1, 31)
+        self.months = _parse_field(month, 1, 12, MONTH_NAMES, offset=1)
+        # 0 and 7 are both Sunday
+        self.weekdays = {value % 7 for value in _parse_field(weekday, 0, 7, DAY_NAMES)}
+
+        # Cron matches either day field when both are restricted; like Vixie
+        # cron, a field starting with '*' (such as */2) counts as unrestricted
+        self.any_day = not day.startswith('*') and not weekday.startswith('*')
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        return (day_ok or weekday_ok) if self.any_day else (day_ok and weekday_ok)
+
+    def next_after(self, moment):
+        """First matching minute strictly after moment"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+
+        while candidate <= limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) +
+                             timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+
+        raise ValueError(f"cron expression never matches: '{self.text}'")
+
+    def __str__(self):
+        return self.text
+
+
+class IntervalTrigger:
+    """Run every fixed number of seconds"""
+
+    def __init__(self, seconds):
+        self.seconds = max(1, int(seconds))
+
+    def next_after(self, moment):
+        return moment + timedelta(seconds=self.seconds)
+
+    def __str__(self):
+        if self.seconds % 60:
+            return f"every {self.seconds} seconds"
+        minutes = self.seconds // 60
+        return f"every {minutes} minute{'s' if minutes != 1 else ''}"
+
+
+class AnyTrigger:
+    """Earliest of several triggers"""
+
+    def __init__(self, triggers, label=None):
+        self.triggers = list(triggers)
+        self.label = label
+
+    def next_after(self, moment):
+        return min(trigger.next_after(moment) for trigger in self.triggers)
+
+    def __str__(self):
+        return self.label or '; '.join(str(trigger) for trigger in self.triggers)
+
+
+def parse_schedule(text):
+    """Parse daily times ("09:00,18:00") or cron expressions separated by ';'"""
+    text = (text or '').strip()
+    if not text:
+        raise ValueError("schedule is empty")
+
+    # Daily times contain no spaces; cron expressions always do (or are macros)
+    if ' ' not in text and not text.startswith('@'):
+        triggers = []
+        for item in text.split(','):
+            match = TIME_PATTERN.match(item.strip())
+            if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+                raise ValueError(f"invalid time '{item.strip()}' (use HH:MM)")
+            triggers.append(CronExpression(f"{int(match.group(2))} {int(match.group(1))} * * *"))
+        return AnyTrigger(triggers, label=f"daily at {text}")
+
+    triggers = [CronExpression(part) for part in text.split(';') if part.strip()]
+    return triggers[0] if len(triggers) == 1 else AnyTrigger(triggers)
+
+
+def schedule_from_config(config):
+    """Trigger for the configured auto-sync schedule and whether to run right away"""
+    if config.get('scheduled_sync'):
+        return parse_schedule(config.get('schedule_times')), False
+
+    try:
+        minutes = int(config.get('interval', 30))
+    except (TypeError, ValueError):
+        minutes = 30
+    return IntervalTrigger(minutes * 60), True
+
+
+class ScheduledEntry:
+    """One named schedule and its callback"""
+
+    def __init__(self, name, trigger, callback):
+        self.name = name
+        self.trigger = trigger
+        self.callback = callback
+        self.due = None
+        self.running = False
+        self.removed = False
+
+
+class CronScheduler:
+    """Run callbacks at scheduled times, sleeping until the next deadline"""
+
+    def __init__(self, log=None, jitter=0, catch_up='once', misfire_grace=120, busy=None,
+                 seed=None):
+        self.log = log or (lambda message, level="INFO": None)
+        self.jitter = max(0, jitter or 0)
+        self.catch_up = catch_up if catch_up in CATCH_UP_POLICIES else 'once'
+        self.misfire_grace = misfire_grace
+        self.busy = busy
+
+        self._heap = []
+        self._entries = {}
+        self._threads = []
+        self._counter = itertools.count()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+
+    def _push(self, entry, due):
+        entry.due = due
+        heapq.heappush(self._heap, (due, next(self._counter), entry))
+
+    def _next_due(self, trigger, after):
+        due = trigger.next_after(after)
+        if self.jitter:
+            due += timedelta(seconds=self._rng.uniform(0, self.jitter))
+        return due
+
+    def add(self, name, trigger, callback, run_now=False):
+        """Schedule callback; run_now also fires it once immediately"""
+        entry = ScheduledEntry(name, trigger, callback)
+        now = datetime.now()
+
+        with self._lock:
+            if name in self._entries:
+                self._entries[name].removed = True
+            self._entries[name] = entry
+            self._push(entry, now if run_now else self._next_due(trigger, now))
+
+        if not run_now:
+            self.log(f"Next {name}: {entry.due.strftime('%Y-%m-%d %H:%M:%S')} ({trigger})",
+                     "INFO")
+        self._wake.set()
+        return entry
+
+    def remove(self, name):
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry:
+                entry.removed = True
+        self._wake.set()
+
+    def next_run_time(self, name=None):
+        """Earliest upcoming deadline (of one entry or of all)"""
+        with self._lock:
+            if name:
+                entry = self._entries.get(name)
+                return entry.due if entry else None
+            dues = [entry.due for entry in self._entries.values() if entry.due]
+            return min(dues) if dues else None
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    def join(self, timeout=None):
+        """Wait for callbacks that are still running"""
+        for thread in list(self._threads):
+            thread.join(timeout)
+
+    def run(self):
+        """Dispatch due entries until stop() is called"""
+        while not self._stopped:
+            with self._lock:
+                due = self._heap[0][0] if self._heap else None
+
+            timeout = MAX_SLEEP
+            if due is not None:
+                timeout = min(MAX_SLEEP, max(0.0, (due - datetime.now()).total_seconds()))
+
+            if self._wake.wait(timeout):
+                self._wake.clear()
+                continue
+
+            self._dispatch_due()
+
+    def _dispatch_due(self):
+        now = datetime.now()
+        fire = []
+
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due, _, entry = heapq.heappop(self._heap)
+                if entry.removed:
+                    continue
+
+                # Next deadline counts from now, so missed runs collapse into one
+                self._push(entry, self._next_due(entry.trigger, now))
+
+                late = (now - due).total_seconds()
+                if late > self.misfire_grace:
+                    if self.catch_up == 'skip':
+                        self.log(f"Missed {entry.name} at {due.strftime('%Y-%m-%d %H:%M')} "
+                                 f"(computer asleep?) - skipped", "WARNING")
+                        continue
+                    self.log(f"Catching up missed {entry.name} from "
+                             f"{due.strftime('%Y-%m-%d %H:%M')}", "WARNING")
+                fire.append(entry)
+
+        for entry in fire:
+            self._fire(entry)
+
+    def _fire(self, entry):
+        if entry.running or (self.busy and self.busy()):
+            self.log(f"Skipping {entry.name}: previous run still in progress", "WARNING")
+            return
+
+        entry.running = True
+
+        def target():
+            try:
+                entry.callback()
+            except Exception as e:
+                self.log(f"Scheduled {entry.name} failed: {str(e)}", "ERROR")
+            finally:
+                entry.running = False
+                if not self._stopped and not entry.removed:
+                    self.log(f"Next {entry.name}: "
+                             f"{entry.due.strftime('%Y-%m-%d %H:%M:%S')}", "INFO")
+
+        thread = threading.Thread(target=target, daemon=True)
+        self._threads = [item for item in self._threads if item.is_alive()] + [thread]
+        thread.start()
@@ -0,0 +1,157 @@
+"""
+NAS Sync - Destination listing snapshot
+
+Lists each destination directory once, with a few directories fetched ahead
+in parallel, and answers "does it exist / what size / what mtime" questions
+for the files in it from memory. Missing directories are created once per
+run. This replaces the exists() + stat() + mkdir() round trips SyncEngine
+used to make for every file, which dominate a no-change sync over SMB.
+"""
+
+import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DestinationIndex:
+    """In-memory listing of the destination directories a sync touches"""
+
+    def __init__(self, destination, workers=8, read_ahead=None):
+        # Paths are compared as strings, so use the same form the engine joins onto
+        self.destination = str(destination)
+        self.workers = max(1, int(workers or 1))
+        self.read_ahead = read_ahead or self.workers * 4
+
+        self._executor = None
+        self._order = []
+        self._submitted = 0
+        self._futures = {}
+        self._listings = {}
+        self._current = None
+        self._known_dirs = set()
+        self._lock = threading.Lock()
+
+        self.listed = 0
+        self.created = 0
+
+    def prefetch(self, directories):
+        """Start listing directories in the order they will be looked up"""
+        seen = set()
+        self._order = []
+        for directory in directories:
+            directory = str(directory)
+            if directory not in seen:
+                seen.add(directory)
+                self._order.append(directory)
+
+        if self.workers > 1 and len(self._order) > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix='dest-index')
+        self._top_up()
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._futures = {}
+        self._listings = {}
+
+    def _list(self, directory):
+        """Map file names to (size, mtime); None when the directory is missing"""
+        files = {}
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            info = entry.stat()
+                            files[entry.name] = (info.st_size, info.st_mtime)
+                    except OSError:
+                        continue
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+        with self._lock:
+            self.listed += 1
+        return files
+
+    def _top_up(self):
+        """Keep `read_ahead` listings in flight ahead of the lookups"""
+        if not self._executor:
+            return
+
+        with self._lock:
+            while (self._submitted < len(self._order) and
+                   len(self._futures) < self.read_ahead):
+                directory = self._order[self._submitted]
+                self._submitted += 1
+                self._futures[directory] = self._executor.submit(self._list, directory)
+
+    def listing(self, directory):
+        """Listing of one directory, waiting for its prefetch if needed"""
+        directory = str(directory)
+
+        if directory != self._current:
+            # Lookups move through the tree directory by directory: free the last one
+            self._listings.pop(self._current, None)
+            self._current = directory
+
+        if directory in self._listings:
+            return self._listings[directory]
+
+        with self._lock:
+            future = self._futures.pop(directory, None)
+
+        try:
+            files = future.result() if future else self._list(directory)
+        except OSError:
+            files = False
+
+        self._listings[directory] = files
+        if files is not None and files is not False:
+            self._known_dirs.add(directory)
+        self._top_up()
+        return files
+
+    def lookup(self, path):
+        """(size, mtime) of a destination file, or None if it does not exist"""
+        path = str(path)
+        files = self.listing(os.path.dirname(path))
+
+        if files is False:
+            # Listing failed (permissions, network): ask the file system directly
+            try:
+                info = os.stat(path)
+            except OSError:
+                return None
+            return None if stat.S_ISDIR(info.st_mode) else (info.st_size, info.st_mtime)
+
+        if files is None:
+            return None
+        return files.get(os.path.basename(path))
+
+    def ensure_dir(self, directory):
+        """Create a destination directory unless this run already saw or made it"""
+        directory = str(directory)
+        if directory in self._known_dirs:
+            return
+
+        os.makedirs(directory, exist_ok=True)
+
+        # The new directory and all of its parents exist now (copies run on
+        # several threads, so the bookkeeping is shared)
+        with self._lock:
+            self.created += 1
+            path = directory
+            while path.startswith(self.destination) and path not in self._known_dirs:
+                self._known_dirs.add(path)
+                if path in self._listings and self._listings[path] is None:
+                    self._listings[path] = {}
+                parent = os.path.dirname(path)
+                if parent == path:
+                    break
+                path = parent
+
+    def add_known_dir(self, directory):
+        self._known_dirs.add(str(directory))
@@ -0,0 +1,166 @@
+"""
+NAS Sync - Directory listing cache
+
+A directory's mtime changes whenever an entry is added, removed or renamed
+in it, so a listing taken at a known mtime stays valid until the mtime
+changes. The cache stores every source directory's listing with its mtime;
+a rescan stats the directory and reuses the stored names when it matches.
+
+Modes:
+  off    always list directories (plain os.walk behaviour)
+  on     reuse listings of unchanged directories; files are still compared
+  trust  additionally treat files in unchanged directories as already synced
+         (fast for append-only trees such as photo archives, but in-place
+         edits of files in unchanged directories are not picked up)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from parallel_walk import ParallelWalker
+
+
+LISTING_CACHE_MODES = ('off', 'on', 'trust')
+
+CACHE_VERSION = 1
+
+# Listings of directories modified this recently may still change within the
+# same mtime tick, so they are not cached (like git's "racy clean" check)
+RACY_SECONDS = 2.0
+
+
+class DirectoryCache:
+    """Listing cache for one source/destination pair"""
+
+    def __init__(self, source, destination, mode='on', signature='', cache_dir=None):
+        self.source = os.path.abspath(str(source))
+        self.mode = mode if mode in LISTING_CACHE_MODES else 'on'
+        self.signature = signature
+
+        self.cache_dir = Path(cache_dir) if cache_dir else Path.home() / '.nassync' / 'listings'
+        key = hashlib.sha1(f"{self.source}\0{destination}".encode('utf-8')).hexdigest()[:16]
+        self.cache_file = self.cache_dir / f"{key}.json"
+
+        self.entries = {}
+        self.seen = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the cache written by the previous run"""
+        if self.mode == 'off' or not self.cache_file.exists():
+            return
+
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error loading listing cache: {e}")
+            return
+
+        if data.get('version') != CACHE_VERSION or data.get('source') != self.source:
+            return
+
+        # Filters or mode changed: listings are still valid, "already synced" is not
+        if self.mode == 'trust' and data.get('signature') != self.signature:
+            self.mode = 'on'
+
+        self.entries = data.get('dirs', {})
+
+    def save(self):
+        """Store the listings seen in this run (drops directories that are gone)"""
+        if self.mode == 'off':
+            return
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cache_file.with_suffix('.tmp')
+            with open(temp_file, 'w') as f:
+                json.dump({
+                    'version': CACHE_VERSION,
+                    'source': self.source,
+                    'signature': self.signature,
+                    'dirs': self.seen,
+                }, f, separators=(',', ':'))
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            print(f"Error saving listing cache: {e}")
+
+    def clear(self):
+        self.entries = {}
+        self.seen = {}
+        try:
+            self.cache_file.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _key(self, path):
+        # walk() builds paths by joining onto the source, so a prefix cut is enough
+        if path.startswith(self.source):
+            rel = path[len(self.source):].lstrip(os.sep)
+        else:
+            rel = os.path.relpath(path, self.source)
+            rel = '' if rel == '.' else rel
+        return rel.replace(os.sep, '/') if os.sep != '/' else rel
+
+    def invalidate(self, path):
+        """Forget a directory so the next run lists (and compares) it again"""
+        key = self._key(str(path))
+        self.seen.pop(key, None)
+        self.entries.pop(key, None)
+
+    def list_dir(self, path):
+        """Return (file names, subdirectory names, unchanged) for one directory"""
+        key = self._key(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        cached = self.entries.get(key)
+        if cached and self.mode != 'off' and cached[0] == mtime_ns:
+            with self._lock:
+                self.hits += 1
+                self.seen[key] = cached
+            return cached[1], cached[2], True
+
+        files = []
+        dirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    # Like os.walk: symlinked directories are not descended into
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            dirs.append(entry.name)
+                    else:
+                        files.append(entry.name)
+                except OSError:
+                    files.append(entry.name)
+
+        with self._lock:
+            self.misses += 1
+            if time.time() - mtime_ns / 1e9 > RACY_SECONDS:
+                self.seen[key] = [mtime_ns, files, dirs]
+        return files, dirs, False
+
+    def _walk_listing(self, path):
+        files, dirs, unchanged = self.list_dir(path)
+        return dirs, files, unchanged
+
+    def walk(self, top, keep_dir=None, threads=1, sort_key=None):
+        """Yield (directory, file names, trusted) for top and every subdirectory
+
+        `trusted` is set for unchanged directories in trust mode. Unreadable
+        directories are skipped, as os.walk does.
+        """
+        walker = ParallelWalker(threads, keep_dir, list_dir=self._walk_listing,
+                                sort_key=sort_key)
+        for path, (dirs, files, unchanged) in walker.listings(top):
+            yield path, files, unchanged and self.mode == 'trust'
+
+    def summary(self):
+        total = self.hits + self.misses
+        return f"{self.hits} of {total} directories unchanged ({self.mode})"
@@ -0,0 +1,81 @@
+"""
+NAS Sync - Compact file inventory
+
+A scan of millions of files used to be held as a list of Path objects
+(plus a set of relative Paths in mirror mode), roughly 1 KB per file.
+FileInventory stores each directory path once and keeps the per-file data
+in columns: the name string, and the directory index, size, mtime and
+flags in `array`/`bytearray` columns - around 100 bytes per file.
+
+Files are addressed by their index; Path objects are only built for the
+file currently being processed.
+"""
+
+import os
+from array import array
+from pathlib import Path
+
+
+# Flag bits
+TRUSTED = 1   # listing cache vouches for the file (trust mode)
+
+
+class FileInventory:
+    """Files below one root directory, in scan order"""
+
+    def __init__(self, root):
+        self.root = str(root)
+        self.dirs = []              # relative directory paths, '' is the root itself
+        self.dir_of = array('i')    # index into self.dirs
+        self.names = []
+        self.sizes = array('q')     # -1 when not known from the scan
+        self.mtimes = array('d')
+        self.flags = bytearray()
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(range(len(self.names)))
+
+    def add_dir(self, rel_dir):
+        """Register a directory and return its index for add()"""
+        self.dirs.append(rel_dir)
+        return len(self.dirs) - 1
+
+    def add(self, dir_index, name, size=-1, mtime=0.0, flags=0):
+        self.dir_of.append(dir_index)
+        self.names.append(name)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.flags.append(flags)
+
+    def rel_dir(self, index):
+        return self.dirs[self.dir_of[index]]
+
+    def rel_path(self, index):
+        """Path relative to the root, as a string"""
+        rel_dir = self.dirs[self.dir_of[index]]
+        return os.path.join(rel_dir, self.names[index]) if rel_dir else self.names[index]
+
+    def path(self, index):
+        return Path(self.root, self.rel_path(index))
+
+    def info(self, index):
+        """(size, mtime) recorded by the scan, or None"""
+        size = self.sizes[index]
+        return (size, self.mtimes[index]) if size >= 0 else None
+
+    def is_trusted(self, index):
+        return bool(self.flags[index] & TRUSTED)
+
+    def file_dirs(self, skip_trusted=False):
+        """Relative directories that contain files, in scan order"""
+        last = None
+        for index in range(len(self.names)):
+            if skip_trusted and self.flags[index] & TRUSTED:
+                continue
+            dir_index = self.dir_of[index]
+            if dir_index != last:
+                last = dir_index
+                yield self.dirs[dir_index]
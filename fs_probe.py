@@ -0,0 +1,235 @@
+"""
+NAS Sync - Destination capability probe
+
+Measures what the destination file system actually supports, in a scratch
+folder that is removed afterwards:
+
+- timestamp granularity (FAT keeps 2 s, ext3 1 s, NTFS 100 ns, ext4 1 ns)
+- case sensitivity
+- hard links, atomic replace of an existing file, sparse files
+- median latency of stat, create and rename
+
+Results are cached per destination in ~/.nassync/capabilities.json and
+turned into engine strategies by choose_strategy():
+
+- mtime tolerance: the granularity instead of a fixed 2 seconds
+- temp files: updates are written to a temporary file and renamed over the
+  old copy when replacing is atomic, so an interrupted copy never leaves a
+  half-written file where a good one was
+- case folding: names are matched case-insensitively on case-insensitive
+  destinations (mirror mode would otherwise delete a file renamed only in
+  case right after copying it)
+- dedup: hard link support is reported; the engine does not deduplicate yet
+"""
+
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+CAPABILITIES_VERSION = 1
+
+# Re-probe after this many days (firmware updates, remounts with other options)
+MAX_AGE_DAYS = 30
+
+LATENCY_SAMPLES = 10
+
+# Smallest steps a file system can store, in seconds: ns, NTFS, us, ms, 1 s, FAT
+GRANULARITIES = (1e-9, 1e-7, 1e-6, 1e-3, 1.0, 2.0)
+
+SPARSE_SIZE = 1024 * 1024
+
+
+def _median_ms(samples):
+    samples = sorted(samples)
+    return round(samples[len(samples) // 2] * 1000, 3) if samples else None
+
+
+def probe_granularity(path):
+    """Smallest mtime step the file system keeps, in seconds"""
+    # Odd second plus a fraction with a distinct digit at every decimal place
+    base_ns = (int(time.time()) // 2 * 2 - 1) * 10 ** 9 + 123456789
+    os.utime(path, ns=(base_ns, base_ns))
+    error_ns = abs(os.stat(path).st_mtime_ns - base_ns)
+
+    for granularity in GRANULARITIES:
+        if error_ns < granularity * 1e9:
+            return granularity
+    return float(error_ns // 10 ** 9 + 1)
+
+
+def _probe_hardlinks(scratch):
+    source = scratch / 'link_source'
+    source.write_bytes(b'x')
+    try:
+        os.link(str(source), str(scratch / 'link_target'))
+        return os.stat(str(source)).st_nlink == 2
+    except (OSError, AttributeError, NotImplementedError):
+        return False
+
+
+def _probe_atomic_replace(scratch):
+    target = scratch / 'replace_target'
+    temp = scratch / 'replace_temp'
+    target.write_bytes(b'old')
+    temp.write_bytes(b'new')
+    try:
+        os.replace(str(temp), str(target))
+        return target.read_bytes() == b'new' and not temp.exists()
+    except OSError:
+        return False
+
+
+def _probe_sparse(scratch):
+    """True/False, or None where the OS does not report allocated blocks"""
+    path = scratch / 'sparse'
+    with open(path, 'wb') as f:
+        f.seek(SPARSE_SIZE - 1)
+        f.write(b'x')
+    blocks = getattr(os.stat(str(path)), 'st_blocks', None)
+    if blocks is None:
+        return None
+    return blocks * 512 < SPARSE_SIZE // 2
+
+
+def probe_destination(destination, samples=LATENCY_SAMPLES):
+    """Measure the capabilities of the file system holding destination"""
+    root = Path(destination)
+    scratch = root / f".nassync_probe_{uuid.uuid4().hex[:8]}"
+    scratch.mkdir()
+
+    try:
+        create, stat, rename = [], [], []
+        for i in range(samples):
+            path = scratch / f"file{i}"
+            started = time.perf_counter()
+            with open(path, 'wb') as f:
+                f.write(b'x')
+            create.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            os.stat(str(path))
+            stat.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            os.rename(str(path), str(scratch / f"renamed{i}"))
+            rename.append(time.perf_counter() - started)
+
+        (scratch / 'CaseProbe').write_bytes(b'x')
+        case_sensitive = not (scratch / 'caseprobe').exists()
+
+        return {
+            'version': CAPABILITIES_VERSION,
+            'destination': str(destination),
+            'probed_at': datetime.now().isoformat(timespec='seconds'),
+            'mtime_granularity': probe_granularity(str(scratch / 'renamed0')),
+            'case_sensitive': case_sensitive,
+            'hardlinks': _probe_hardlinks(scratch),
+            'atomic_replace': _probe_atomic_replace(scratch),
+            'sparse_files': _probe_sparse(scratch),
+            'latency_ms': {
+                'stat': _median_ms(stat),
+                'create': _median_ms(create),
+                'rename': _median_ms(rename),
+            },
+        }
+    finally:
+        shutil.rmtree(str(scratch), ignore_errors=True)
+
+
+def choose_strategy(capabilities):
+    """Fastest safe engine settings for a probed destination"""
+    granularity = capabilities.get('mtime_granularity')
+    return {
+        # Float mtimes cannot resolve much below a millisecond
+        'mtime_tolerance': max(granularity, 0.001) if granularity is not None else 2.0,
+        'temp_files': 'replace' if capabilities.get('atomic_replace') else 'direct',
+        'case_fold': capabilities.get('case_sensitive') is False,
+        'dedup': 'hardlink' if capabilities.get('hardlinks') else 'none',
+    }
+
+
+def describe(capabilities):
+    """One-line summary for logs"""
+    latency = capabilities.get('latency_ms') or {}
+    sparse = capabilities.get('sparse_files')
+    return (f"mtime step {capabilities.get('mtime_granularity')}s, "
+            f"{'case-sensitive' if capabilities.get('case_sensitive') else 'case-insensitive'}, "
+            f"hard links {'yes' if capabilities.get('hardlinks') else 'no'}, "
+            f"atomic replace {'yes' if capabilities.get('atomic_replace') else 'no'}, "
+            f"sparse files {'unknown' if sparse is None else ('yes' if sparse else 'no')}, "
+            f"stat {latency.get('stat')} ms, create {latency.get('create')} ms, "
+            f"rename {latency.get('rename')} ms")
+
+
+class CapabilityCache:
+    """Probe results by destination path, stored in ~/.nassync/capabilities.json"""
+
+    def __init__(self, cache_file=None, max_age_days=MAX_AGE_DAYS):
+        self.cache_file = Path(cache_file) if cache_file else \
+            Path.home() / '.nassync' / 'capabilities.json'
+        self.max_age = timedelta(days=max_age_days)
+
+    def _load(self):
+        if not self.cache_file.exists():
+            return {}
+        try:
+            with open(self.cache_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading capabilities: {e}")
+            return {}
+
+    def _key(self, destination):
+        return os.path.normcase(os.path.abspath(str(destination)))
+
+    def get(self, destination):
+        """Cached capabilities that are still fresh, or None"""
+        entry = self._load().get(self._key(destination))
+        if not entry or entry.get('version') != CAPABILITIES_VERSION:
+            return None
+        try:
+            probed_at = datetime.fromisoformat(entry['probed_at'])
+        except (KeyError, ValueError):
+            return None
+        return entry if datetime.now() - probed_at < self.max_age else None
+
+    def put(self, destination, capabilities):
+        data = self._load()
+        data[self._key(destination)] = capabilities
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.cache_file.with_suffix('.tmp')
+            with open(temp_file, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(temp_file, self.cache_file)
+        except Exception as e:
+            print(f"Error saving capabilities: {e}")
+
+
+def get_capabilities(destination, refresh=False, log=None, cache=None):
+    """Cached capabilities of destination, probing it when needed
+
+    Returns None when the destination cannot be probed (missing, read-only).
+    """
+    cache = cache or CapabilityCache()
+    if not refresh:
+        cached = cache.get(destination)
+        if cached:
+            return cached
+
+    try:
+        capabilities = probe_destination(destination)
+    except OSError as e:
+        if log:
+            log(f"Could not probe destination capabilities: {str(e)}", "WARNING")
+        return None
+
+    cache.put(destination, capabilities)
+    if log:
+        log(f"Probed destination: {describe(capabilities)}", "INFO")
+    return capabilities
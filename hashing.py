@@ -0,0 +1,101 @@
+"""
+NAS Sync - Hashing pipeline
+
+Verify mode hashes the source and the destination copy of every file that
+looks unchanged. Done one file at a time in the sync thread that leaves all
+but one core idle and waits for every NAS read in turn. HashPool runs the
+digests on a thread pool instead (hashlib releases the GIL while hashing
+large buffers, so threads use several cores without the cost of sending
+data to worker processes), with both sides of a file hashed at once and a
+bounded number of files hashed ahead of the loop that consumes the results.
+"""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+CHUNK_SIZE = 1024 * 1024
+
+# More parallel reads than this mostly queue up on a home NAS
+MAX_AUTO_WORKERS = 8
+
+# Both sides of files up to this size are hashed in one task (less overhead)
+SMALL_FILE_SIZE = 256 * 1024
+
+
+_buffers = threading.local()
+
+
+def hash_file(file_path, chunk_size=CHUNK_SIZE):
+    """MD5 hex digest and size of a file"""
+    # One reusable read buffer per thread: allocating a fresh 1 MB chunk per
+    # read costs more than hashing a small file
+    buffer = getattr(_buffers, 'buffer', None)
+    if buffer is None or len(buffer) != chunk_size:
+        buffer = _buffers.buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+
+    digest = hashlib.md5()
+    size = 0
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            digest.update(view[:count])
+            size += count
+    return digest.hexdigest(), size
+
+
+def default_workers():
+    """One thread per core, capped at what a NAS serves usefully"""
+    return max(2, min(os.cpu_count() or 2, MAX_AUTO_WORKERS))
+
+
+class HashPool:
+    """Thread pool that hashes files for the compare and verify steps
+
+    `digest(path, *args)` is called on the pool threads and returns the value
+    to compare (None when the file could not be read). `read_ahead` is the
+    number of file pairs the caller should keep in flight.
+    """
+
+    def __init__(self, digest, workers=None, read_ahead=None):
+        self.digest = digest
+        self.workers = max(1, int(workers or default_workers()))
+        # Each pair queues two digests, so this keeps every thread busy
+        self.read_ahead = read_ahead or self.workers
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix='hash')
+
+    def submit(self, file_path, *args):
+        return self._executor.submit(self.digest, file_path, *args)
+
+    def _digest_pair(self, source_file, dest_file, args):
+        return self.digest(source_file, *args), self.digest(dest_file, *args)
+
+    def submit_pair(self, source_file, dest_file, size=None, args=()):
+        """Start hashing both sides of a file; pass the futures to pair_result()
+
+        Large files get one task per side so both are read at the same time.
+        `args` are passed on to digest().
+        """
+        if size is not None and 0 <= size <= SMALL_FILE_SIZE:
+            return [self._executor.submit(self._digest_pair, source_file, dest_file, args)]
+        return [self.submit(source_file, *args), self.submit(dest_file, *args)]
+
+    @staticmethod
+    def pair_result(futures):
+        """(source digest, destination digest) of a submit_pair() call"""
+        if len(futures) == 1:
+            return futures[0].result()
+        return futures[0].result(), futures[1].result()
+
+    def digests(self, source_file, dest_file, size=None, args=()):
+        """Digests of both sides of a file"""
+        return self.pair_result(self.submit_pair(source_file, dest_file, size, args))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
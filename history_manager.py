@@ -1,24 +1,139 @@
 import json
 import os
+import sqlite3
 from datetime import datetime
 from pathlib import Path
 
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    job TEXT NOT NULL DEFAULT 'default',
+    source TEXT,
+    destination TEXT,
+    success INTEGER NOT NULL DEFAULT 0,
+    copied INTEGER NOT NULL DEFAULT 0,
+    updated INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    duration REAL NOT NULL DEFAULT 0,
+    run_id INTEGER,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_job ON history(job, id);
+CREATE INDEX IF NOT EXISTS idx_history_success ON history(success, id);
+"""
+
+COLUMNS = ('id', 'timestamp', 'job', 'source', 'destination', 'success', 'copied',
+           'updated', 'deleted', 'errors', 'skipped', 'duration', 'run_id', 'details')
+
+
+# Runs kept in history.db (config key history_max_entries); the JSON file
+# history.db replaced kept 1000
+MAX_HISTORY_ENTRIES = 100000
+
+
 class HistoryManager:
     """Manage sync history records"""
 
-    def __init__(self):
+    def __init__(self, max_entries=MAX_HISTORY_ENTRIES):
         self.history_dir = Path.home() / '.nassync'
+        self.history_db = self.history_dir / 'history.db'
         self.history_file = self.history_dir / 'history.json'
         self.history_dir.mkdir(exist_ok=True)
 
-        self.max_history_entries = 1000
+        self.max_history_entries = max(1, int(max_entries or MAX_HISTORY_ENTRIES))
 
-    def add_entry(self, source, destination, result):
-        """Add a sync history entry"""
-        history = self.load_history()
+        self._init_db()
+        self._migrate_json_history()
+
+    def _connect(self):
+        conn = sqlite3.connect(str(self.history_db), timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        try:
+            conn = self._connect()
+            try:
+                conn.executescript(SCHEMA)
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error initializing history: {e}")
+
+    def _migrate_json_history(self):
+        """Import entries from the legacy history.json file once"""
+        if not self.history_file.exists():
+            return
+
+        try:
+            with open(self.history_file, 'r') as f:
+                legacy = json.load(f)
+
+            # Legacy file is newest-first; insert oldest first so ids follow time
+            self._insert(*reversed(legacy))
+
+            os.replace(self.history_file, self.history_file.with_suffix('.json.migrated'))
+        except Exception as e:
+            print(f"Error migrating history: {e}")
 
+    def _row_to_entry(self, row):
+        entry = dict(row)
+        entry['success'] = bool(entry['success'])
+        details = entry.pop('details', None)
+        if details:
+            try:
+                entry.update(json.loads(details))
+            except ValueError:
+                pass
+        return entry
+
+    def _entry_row(self, entry):
+        """Split an entry into indexed columns and a JSON details blob"""
+        known = {key: entry.get(key) for key in COLUMNS if key not in ('id', 'details')}
+        extra = {key: value for key, value in entry.items()
+                 if key not in COLUMNS and value is not None}
+
+        known['job'] = known.get('job') or 'default'
+        known['success'] = 1 if known.get('success') else 0
+        for key in ('copied', 'updated', 'deleted', 'errors', 'skipped', 'duration'):
+            known[key] = known.get(key) or 0
+        known['details'] = json.dumps(extra) if extra else None
+        return known
+
+    def _insert(self, *entries):
+        """Insert entries in one transaction and return the last id"""
+        entry_id = None
+        conn = self._connect()
+        try:
+            with conn:
+                for entry in entries:
+                    row = self._entry_row(entry)
+                    cursor = conn.execute(
+                        f"INSERT INTO history ({', '.join(row)}) "
+                        f"VALUES ({', '.join('?' for _ in row)})",
+                        list(row.values())
+                    )
+                    entry_id = cursor.lastrowid
+
+                if entry_id is not None:
+                    conn.execute(
+                        "DELETE FROM history WHERE id <= ?",
+                        (entry_id - self.max_history_entries,)
+                    )
+            return entry_id
+        finally:
+            conn.close()
+
+    def add_entry(self, source, destination, result, job='default'):
+        """Add a sync history entry and return it"""
         entry = {
             'timestamp': datetime.now().isoformat(),
+            'job': job,
             'source': source,
             'destination': destination,
             'success': result.get('success', False),
@@ -27,77 +142,181 @@ class HistoryManager:
             'deleted': result.get('deleted', 0),
             'errors': result.get('errors', 0),
             'skipped': result.get('skipped', 0),
-            'duration': result.get('duration', 0)
+            'duration': result.get('duration', 0),
+            'run_id': result.get('run_id'),
+            'phases': result.get('phases')
         }
 
-        history.insert(0, entry)
+        try:
+            entry['id'] = self._insert(entry)
+        except Exception as e:
+            print(f"Error saving history: {e}")
+
+        return entry
 
-        if len(history) > self.max_history_entries:
-            history = history[:self.max_history_entries]
+    def _build_filters(self, start_date=None, end_date=None, status=None, job=None):
+        """Translate filter arguments into a WHERE clause"""
+        clauses = []
+        params = []
 
-        self.save_history(history)
+        if start_date:
+            clauses.append("timestamp >= ?")
+            params.append(start_date.isoformat())
 
-    def load_history(self):
-        """Load sync history from file"""
-        if not self.history_file.exists():
-            return []
+        if end_date:
+            clauses.append("timestamp <= ?")
+            params.append(end_date.isoformat())
+
+        if status == 'success':
+            clauses.append("success = 1")
+        elif status == 'failed':
+            clauses.append("success = 0")
+
+        if job:
+            clauses.append("job = ?")
+            params.append(job)
+
+        return clauses, params
+
+    def get_page(self, before_id=None, limit=200, start_date=None, end_date=None,
+                 status=None, job=None):
+        """Get one page of entries, newest first, continuing below `before_id`"""
+        clauses, params = self._build_filters(start_date, end_date, status, job)
+
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
 
         try:
-            with open(self.history_file, 'r') as f:
-                return json.load(f)
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    f"SELECT * FROM history {where} ORDER BY id DESC LIMIT ?", params
+                ).fetchall()
+            finally:
+                conn.close()
+            return [self._row_to_entry(row) for row in rows]
         except Exception as e:
             print(f"Error loading history: {e}")
             return []
 
-    def save_history(self, history):
-        """Save sync history to file"""
+    def count_entries(self, start_date=None, end_date=None, status=None, job=None):
+        """Count entries matching the filters"""
+        clauses, params = self._build_filters(start_date, end_date, status, job)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
         try:
-            with open(self.history_file, 'w') as f:
-                json.dump(history, f, indent=2)
+            conn = self._connect()
+            try:
+                return conn.execute(f"SELECT COUNT(*) FROM history {where}", params).fetchone()[0]
+            finally:
+                conn.close()
         except Exception as e:
-            print(f"Error saving history: {e}")
+            print(f"Error counting history: {e}")
+            return 0
+
+    def get_entry(self, entry_id):
+        """Get a single entry by id"""
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT * FROM history WHERE id = ?", (entry_id,)).fetchone()
+            finally:
+                conn.close()
+            return self._row_to_entry(row) if row else None
+        except Exception as e:
+            print(f"Error loading history entry: {e}")
+            return None
+
+    def get_jobs(self):
+        """Get the names of all jobs that have history"""
+        try:
+            conn = self._connect()
+            try:
+                return [row[0] for row in conn.execute(
+                    "SELECT DISTINCT job FROM history ORDER BY job")]
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error loading history jobs: {e}")
+            return []
+
+    def get_expected_durations(self, jobs, runs=5):
+        """Average duration of each job's most recent runs, by job name"""
+        durations = {}
+        try:
+            conn = self._connect()
+            try:
+                for job in jobs:
+                    row = conn.execute(
+                        "SELECT AVG(duration) FROM (SELECT duration FROM history "
+                        "WHERE job = ? AND duration > 0 ORDER BY id DESC LIMIT ?)",
+                        (job, runs)
+                    ).fetchone()
+                    if row and row[0] is not None:
+                        durations[job] = row[0]
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error loading job durations: {e}")
+        return durations
+
+    def load_history(self):
+        """Load all sync history entries, newest first"""
+        return self.get_page(limit=self.max_history_entries)
 
     def get_recent_entries(self, count=10):
         """Get most recent history entries"""
-        history = self.load_history()
-        return history[:count]
+        return self.get_page(limit=count)
 
-    def get_statistics(self):
+    def get_statistics(self, job=None):
         """Get overall sync statistics"""
-        history = self.load_history()
+        clauses, params = self._build_filters(job=job)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT COUNT(*) AS total, COALESCE(SUM(success), 0) AS successful, "
+                    "COALESCE(SUM(copied), 0) AS copied, COALESCE(SUM(updated), 0) AS updated, "
+                    "COALESCE(SUM(deleted), 0) AS deleted, MAX(timestamp) AS last_sync "
+                    f"FROM history {where}", params
+                ).fetchone()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error loading history statistics: {e}")
+            row = None
+
+        total_syncs = row['total'] if row else 0
+        successful_syncs = row['successful'] if row else 0
 
-        if not history:
-            return {
-                'total_syncs': 0,
-                'successful_syncs': 0,
-                'failed_syncs': 0,
-                'total_files_copied': 0,
-                'total_files_updated': 0,
-                'total_files_deleted': 0,
-                'last_sync': None,
-                'success_rate': 0
-            }
-
-        total_syncs = len(history)
-        successful_syncs = sum(1 for e in history if e.get('success'))
-        failed_syncs = total_syncs - successful_syncs
-
-        stats = {
+        return {
             'total_syncs': total_syncs,
             'successful_syncs': successful_syncs,
-            'failed_syncs': failed_syncs,
-            'total_files_copied': sum(e.get('copied', 0) for e in history),
-            'total_files_updated': sum(e.get('updated', 0) for e in history),
-            'total_files_deleted': sum(e.get('deleted', 0) for e in history),
-            'last_sync': history[0].get('timestamp') if history else None,
+            'failed_syncs': total_syncs - successful_syncs,
+            'total_files_copied': row['copied'] if row else 0,
+            'total_files_updated': row['updated'] if row else 0,
+            'total_files_deleted': row['deleted'] if row else 0,
+            'last_sync': row['last_sync'] if row else None,
             'success_rate': (successful_syncs / total_syncs * 100) if total_syncs > 0 else 0
         }
 
-        return stats
-
     def clear_history(self):
         """Clear all history"""
-        self.save_history([])
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM history")
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error clearing history: {e}")
 
     def export_history(self, filepath):
         """Export history to file"""
@@ -110,6 +329,7 @@ class HistoryManager:
 
                 for entry in history:
                     f.write(f"Timestamp: {entry['timestamp']}\n")
+                    f.write(f"Job: {entry.get('job', 'default')}\n")
                     f.write(f"Source: {entry['source']}\n")
                     f.write(f"Destination: {entry['destination']}\n")
                     f.write(f"Status: {'Success' if entry['success'] else 'Failed'}\n")
@@ -125,24 +345,9 @@ class HistoryManager:
 
     def get_filtered_history(self, start_date=None, end_date=None, success_only=False):
         """Get filtered history entries"""
-        history = self.load_history()
-        filtered = []
-
-        for entry in history:
-            try:
-                entry_date = datetime.fromisoformat(entry['timestamp'])
-
-                if start_date and entry_date < start_date:
-                    continue
-
-                if end_date and entry_date > end_date:
-                    continue
-
-                if success_only and not entry.get('success'):
-                    continue
-
-                filtered.append(entry)
-            except:
-                continue
-
-        return filtered
+        return self.get_page(
+            limit=self.max_history_entries,
+            start_date=start_date,
+            end_date=end_date,
+            status='success' if success_only else None
+        )
@@ -0,0 +1,223 @@
+"""
+NAS Sync - Job scheduler
+
+Runs several sync jobs at once without letting them fight over the NAS:
+
+- at most `device_concurrency` jobs write to the same device or share
+- all running jobs draw from one shared bandwidth budget
+- jobs start in priority order, then shortest expected duration first
+- long jobs never take the last free slot of a device, so small jobs
+  are not stuck behind a huge one
+"""
+
+import os
+import threading
+import time
+
+
+PRIORITIES = {'high': 0, 'normal': 1, 'low': 2}
+
+# Jobs expected to run longer than this are treated as long jobs
+LONG_JOB_SECONDS = 600
+
+
+def device_key(path):
+    """Identify the device or network share a path lives on"""
+    text = str(path)
+
+    # UNC paths and SMB/NFS style mounts: one key per server share
+    if text.startswith('\\\\') or text.startswith('//'):
+        parts = [part for part in text.replace('\\', '/').split('/') if part]
+        return 'share:' + '/'.join(parts[:2]).lower()
+
+    # Otherwise the device of the nearest existing parent
+    probe = os.path.abspath(text)
+    while not os.path.exists(probe):
+        parent = os.path.dirname(probe)
+        if parent == probe:
+            break
+        probe = parent
+
+    try:
+        return f"dev:{os.stat(probe).st_dev}"
+    except OSError:
+        return 'path:' + (os.path.splitdrive(probe)[0] or probe)
+
+
+class BandwidthBudget:
+    """Bandwidth limit in MB/s shared by every running job"""
+
+    def __init__(self, limit_mbps=None):
+        self.rate = limit_mbps * 1024 * 1024 if limit_mbps else None
+        self._lock = threading.Lock()
+        self._free_at = 0.0
+
+    def consume(self, nbytes):
+        """Wait until nbytes fit into the budget"""
+        if not self.rate or not nbytes:
+            return
+
+        # Chunks reserve consecutive slots, so concurrent jobs share the link fairly
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._free_at)
+            self._free_at = start + nbytes / self.rate
+            wait = self._free_at - now
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+class JobScheduler:
+    """Run sync jobs with per-device concurrency and a shared bandwidth budget
+
+    `run_job(job, bandwidth)` performs one job and returns its result dict;
+    the scheduler only decides when each job may start.
+    """
+
+    def __init__(self, run_job, max_parallel=2, device_concurrency=2, bandwidth_mbps=None,
+                 expected_durations=None, log=None):
+        self.run_job = run_job
+        self.max_parallel = max(1, int(max_parallel or 1))
+        self.device_concurrency = max(1, int(device_concurrency or 1))
+        self.bandwidth = BandwidthBudget(bandwidth_mbps) if bandwidth_mbps else None
+        self.expected_durations = expected_durations or {}
+        self.log = log or (lambda message, level="INFO": None)
+
+        self.pending = []
+        self.running = {}
+        self.results = {}
+        self.stopped = False
+        self.paused = False
+
+        self._device_jobs = {}
+        self._device_long_jobs = {}
+        self._sequence = 0
+        self._cond = threading.Condition()
+
+    def expected_duration(self, job):
+        """Seconds the job took recently; unknown jobs count as short"""
+        return self.expected_durations.get(job['name']) or 0
+
+    def submit(self, job):
+        """Queue a job unless it is already queued or running, or the scheduler stopped"""
+        with self._cond:
+            name = job['name']
+            if self.stopped or name in self.running or any(item[-1]['name'] == name for item in self.pending):
+                return False
+
+            self._sequence += 1
+            rank = (PRIORITIES.get(job.get('priority'), PRIORITIES['normal']),
+                    self.expected_duration(job), self._sequence)
+            self.pending.append((rank, device_key(job['destination']), job))
+            self.pending.sort(key=lambda item: item[0])
+            self._cond.notify_all()
+            return True
+
+    def stop(self):
+        """Drop queued jobs; running jobs are stopped by their owner"""
+        with self._cond:
+            self.stopped = True
+            self.pending = []
+            self._cond.notify_all()
+
+    def pause(self):
+        """Start no queued jobs until resume(); running jobs are paused by their owner"""
+        with self._cond:
+            self.paused = True
+
+    def resume(self):
+        with self._cond:
+            self.paused = False
+            self._cond.notify_all()
+
+    def _can_start(self, device, is_long):
+        if self._device_jobs.get(device, 0) >= self.device_concurrency:
+            return False
+        # Keep one slot of each device for short jobs
+        if is_long and self._device_long_jobs.get(device, 0) >= max(1, self.device_concurrency - 1):
+            return False
+        return True
+
+    def _take_next(self):
+        """Remove and return the best queued job that may start now"""
+        if len(self.running) >= self.max_parallel:
+            return None
+
+        for index, (rank, device, job) in enumerate(self.pending):
+            is_long = rank[1] >= LONG_JOB_SECONDS
+            if self._can_start(device, is_long):
+                del self.pending[index]
+                self._device_jobs[device] = self._device_jobs.get(device, 0) + 1
+                if is_long:
+                    self._device_long_jobs[device] = self._device_long_jobs.get(device, 0) + 1
+                self.running[job['name']] = (device, is_long)
+                return job
+        return None
+
+    def _worker(self, job):
+        result = None
+        try:
+            result = self.run_job(job, self.bandwidth)
+        except Exception as e:
+            self.log(f"Job {job['name']} failed: {str(e)}", "ERROR")
+            result = {'success': False, 'copied': 0, 'updated': 0, 'deleted': 0,
+                      'errors': 1, 'skipped': 0}
+        finally:
+            with self._cond:
+                device, is_long = self.running.pop(job['name'])
+                self._device_jobs[device] -= 1
+                if is_long:
+                    self._device_long_jobs[device] -= 1
+                self.results[job['name']] = result
+                self._cond.notify_all()
+
+    def run(self, jobs=()):
+        """Queue jobs and block until every queued job has finished
+
+        Returns the results of this run by job name.
+        """
+        for job in jobs:
+            self.submit(job)
+
+        with self._cond:
+            while self.pending or self.running:
+                job = None if self.stopped or self.paused else self._take_next()
+                if job:
+                    self.log(f"Starting job {job['name']}", "INFO")
+                    threading.Thread(target=self._worker, args=(job,), daemon=True).start()
+                    continue
+                self._cond.wait()
+
+            results = self.results
+            self.results = {}
+            return results
+
+
+def create_scheduler(config, run_job, expected_durations=None, log=None):
+    """Build a scheduler from the shared (non-job) settings"""
+    bandwidth = config.get('bandwidth_value') if config.get('bandwidth_limit') else None
+    return JobScheduler(
+        run_job,
+        max_parallel=config.get('max_parallel_jobs', 2),
+        device_concurrency=config.get('device_concurrency', 2),
+        bandwidth_mbps=bandwidth,
+        expected_durations=expected_durations,
+        log=log
+    )
+
+
+def combine_results(results):
+    """Merge per-job results into one summary result"""
+    combined = {'success': bool(results), 'copied': 0, 'updated': 0, 'deleted': 0,
+                'errors': 0, 'skipped': 0, 'jobs': results}
+
+    for result in results.values():
+        combined['success'] = combined['success'] and bool(result.get('success'))
+        for key in ('copied', 'updated', 'deleted', 'errors', 'skipped'):
+            combined[key] += result.get(key, 0) or 0
+        for flag in ('stopped', 'aborted'):
+            if result.get(flag):
+                combined[flag] = True
+
+    return combined
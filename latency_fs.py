@@ -0,0 +1,315 @@
+"""
+NAS Sync - High-latency filesystem simulator
+
+Wraps the filesystem calls SyncEngine makes (stat, open, scandir, mkdir,
+unlink, rename, ...) for every path below a root directory, adding per-op
+latency, a shared throughput cap and optional error injection. Paths outside
+the root are untouched, so a local source can be synced to a "slow NAS"
+directory on the same disk.
+
+    with SimulatedFS('/tmp/nas', profile='linkstation') as fs:
+        SyncEngine(config, log, progress).sync()
+    print(fs.counts)
+"""
+
+import builtins
+import errno
+import io
+import os
+import random
+import shutil
+import threading
+import time
+
+
+# Per-operation latency in milliseconds and link throughput in MB/s
+LATENCY_PROFILES = {
+    'local': {
+        'latency': {},
+        'throughput': None,
+    },
+    'lan': {
+        'latency': {'stat': 0.3, 'open': 0.5, 'scandir': 1.0, 'mkdir': 0.5,
+                    'unlink': 0.5, 'rmdir': 0.5, 'rename': 0.5, 'setattr': 0.3},
+        'throughput': 110,
+    },
+    'linkstation': {
+        'latency': {'stat': 2.0, 'open': 4.0, 'scandir': 8.0, 'mkdir': 5.0,
+                    'unlink': 4.0, 'rmdir': 4.0, 'rename': 5.0, 'setattr': 2.0},
+        'throughput': 60,
+    },
+    'wifi': {
+        'latency': {'stat': 6.0, 'open': 10.0, 'scandir': 20.0, 'mkdir': 12.0,
+                    'unlink': 10.0, 'rmdir': 10.0, 'rename': 12.0, 'setattr': 6.0},
+        'throughput': 15,
+    },
+    'vpn': {
+        'latency': {'stat': 35.0, 'open': 60.0, 'scandir': 80.0, 'mkdir': 60.0,
+                    'unlink': 60.0, 'rmdir': 60.0, 'rename': 60.0, 'setattr': 35.0},
+        'throughput': 5,
+    },
+}
+
+OPERATIONS = ('stat', 'open', 'scandir', 'mkdir', 'unlink', 'rmdir', 'rename',
+              'setattr', 'read', 'write')
+
+
+class SimulatedFS:
+    """Context manager that makes a directory tree behave like a slow NAS"""
+
+    def __init__(self, root, profile=None, latency=None, throughput=None,
+                 error_rates=None, concurrency=None, scale=1.0, seed=0):
+        self.root = os.path.abspath(os.fspath(root))
+
+        base = LATENCY_PROFILES.get(profile, LATENCY_PROFILES['local']) if profile else \
+            LATENCY_PROFILES['local']
+        latency_ms = dict(base['latency'])
+        latency_ms.update(latency or {})
+
+        self.latency = {op: value * scale / 1000.0 for op, value in latency_ms.items()}
+        self.throughput = throughput if throughput is not None else base['throughput']
+        self.error_rates = dict(error_rates or {})
+
+        # Limit the number of operations the "NAS" serves at once
+        self._slots = threading.BoundedSemaphore(concurrency) if concurrency else None
+
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._link_free_at = 0.0
+
+        self.counts = {op: 0 for op in OPERATIONS}
+        self.errors_injected = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.simulated_seconds = 0.0
+
+        self._originals = {}
+
+    # -- helpers ---------------------------------------------------------
+
+    def applies(self, path):
+        """Check if a path is inside the simulated root"""
+        if isinstance(path, int):
+            return False
+        try:
+            path = os.fspath(path)
+        except TypeError:
+            return False
+        if isinstance(path, bytes):
+            path = os.fsdecode(path)
+        path = os.path.abspath(path)
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    def charge(self, op, path=None):
+        """Count an operation, inject errors and sleep for its latency"""
+        with self._lock:
+            self.counts[op] = self.counts.get(op, 0) + 1
+            rate = self.error_rates.get(op, 0)
+            fail = rate and self._rng.random() < rate
+            if fail:
+                self.errors_injected += 1
+
+        delay = self.latency.get(op, 0)
+        if delay:
+            if self._slots:
+                with self._slots:
+                    time.sleep(delay)
+            else:
+                time.sleep(delay)
+            with self._lock:
+                self.simulated_seconds += delay
+
+        if fail:
+            raise OSError(errno.EIO, f"Injected {op} error", os.fspath(path) if path else None)
+
+    def transfer(self, nbytes, direction):
+        """Hold the caller until the shared link could have moved nbytes"""
+        with self._lock:
+            if direction == 'read':
+                self.bytes_read += nbytes
+            else:
+                self.bytes_written += nbytes
+
+            if not self.throughput or not nbytes:
+                return
+
+            now = time.monotonic()
+            start = max(now, self._link_free_at)
+            self._link_free_at = start + nbytes / (self.throughput * 1024 * 1024)
+            wait = self._link_free_at - now
+
+        if wait > 0:
+            time.sleep(wait)
+            with self._lock:
+                self.simulated_seconds += wait
+
+    def summary(self):
+        """Counters collected while the simulator was active"""
+        return {
+            'ops': {op: count for op, count in self.counts.items() if count},
+            'errors_injected': self.errors_injected,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'simulated_seconds': round(self.simulated_seconds, 4),
+        }
+
+    # -- patching --------------------------------------------------------
+
+    def _wrap_path_call(self, name, op, path_args=1):
+        original = getattr(os, name)
+        self._originals[(os, name)] = original
+        fs = self
+
+        def wrapper(*args, **kwargs):
+            if any(fs.applies(arg) for arg in args[:path_args]):
+                fs.charge(op, args[0])
+            return original(*args, **kwargs)
+
+        wrapper.__name__ = name
+        setattr(os, name, wrapper)
+
+    def _wrap_scandir(self):
+        original = os.scandir
+        self._originals[(os, 'scandir')] = original
+        fs = self
+
+        def scandir(path='.'):
+            if fs.applies(path):
+                fs.charge('scandir', path)
+                return _ScandirProxy(original(path), fs)
+            return original(path)
+
+        os.scandir = scandir
+
+    def _wrap_open(self):
+        original = builtins.open
+        self._originals[(builtins, 'open')] = original
+        self._originals[(io, 'open')] = io.open
+        fs = self
+
+        def open_(file, mode='r', *args, **kwargs):
+            if fs.applies(file):
+                fs.charge('open', file)
+                return _FileProxy(original(file, mode, *args, **kwargs), fs)
+            return original(file, mode, *args, **kwargs)
+
+        builtins.open = open_
+        io.open = open_
+
+    def __enter__(self):
+        self._wrap_path_call('stat', 'stat')
+        self._wrap_path_call('lstat', 'stat')
+        self._wrap_path_call('listdir', 'scandir')
+        self._wrap_path_call('mkdir', 'mkdir')
+        self._wrap_path_call('unlink', 'unlink')
+        self._wrap_path_call('remove', 'unlink')
+        self._wrap_path_call('rmdir', 'rmdir')
+        self._wrap_path_call('rename', 'rename', path_args=2)
+        self._wrap_path_call('replace', 'rename', path_args=2)
+        self._wrap_path_call('utime', 'setattr')
+        self._wrap_path_call('chmod', 'setattr')
+        self._wrap_scandir()
+        self._wrap_open()
+
+        # Route copies through read()/write() so the throughput cap applies
+        self._originals[(shutil, '_USE_CP_SENDFILE')] = getattr(shutil, '_USE_CP_SENDFILE', False)
+        self._originals[(shutil, '_HAS_FCOPYFILE')] = getattr(shutil, '_HAS_FCOPYFILE', False)
+        shutil._USE_CP_SENDFILE = False
+        shutil._HAS_FCOPYFILE = False
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for (module, name), original in self._originals.items():
+            setattr(module, name, original)
+        self._originals = {}
+        return False
+
+
+class _ScandirProxy:
+    """scandir iterator whose entries charge a round trip for stat()"""
+
+    def __init__(self, iterator, fs):
+        self._iterator = iterator
+        self._fs = fs
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return _DirEntryProxy(next(self._iterator), self._fs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self._iterator.close()
+
+
+class _DirEntryProxy:
+    """DirEntry whose first stat() call is charged like a network stat"""
+
+    def __init__(self, entry, fs):
+        self._entry = entry
+        self._fs = fs
+        self._stat_charged = False
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def __fspath__(self):
+        return self._entry.path
+
+    def stat(self, *, follow_symlinks=True):
+        if not self._stat_charged:
+            self._fs.charge('stat', self._entry.path)
+            self._stat_charged = True
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def is_dir(self, *, follow_symlinks=True):
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, *, follow_symlinks=True):
+        return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+
+class _FileProxy:
+    """File object that applies the link throughput cap to reads and writes"""
+
+    def __init__(self, f, fs):
+        self._f = f
+        self._fs = fs
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __iter__(self):
+        return iter(self._f)
+
+    def __enter__(self):
+        self._f.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._f.__exit__(*exc)
+
+    def read(self, *args):
+        data = self._f.read(*args)
+        self._fs.charge('read')
+        self._fs.transfer(len(data), 'read')
+        return data
+
+    def readinto(self, buffer):
+        count = self._f.readinto(buffer)
+        self._fs.charge('read')
+        self._fs.transfer(count or 0, 'read')
+        return count
+
+    def write(self, data):
+        count = self._f.write(data)
+        self._fs.charge('write')
+        self._fs.transfer(len(data), 'write')
+        return count
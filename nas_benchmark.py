@@ -0,0 +1,411 @@
+"""
+NAS Sync - NAS throughput and latency benchmark
+
+"Test Connection" only proves a path is writable. NasBenchmark measures
+what the destination can actually do, in a scratch folder that is removed
+afterwards:
+
+- sequential write and read throughput for several block sizes
+- small-file create and delete rate
+- stat and folder listing latency at several concurrency levels
+
+Runs are kept in ~/.nassync/nas_benchmarks.db, so a new run can be
+compared with earlier ones on the same path (a NAS with a failing disk or
+a renegotiated 100 Mbit link shows up as a drop), and the results suggest
+engine settings: folders listed at once and the copy buffer size.
+
+Works on any path, including a local folder. Where the OS cache cannot be
+dropped (everything but Linux), read figures are marked as cached.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+
+BLOCK_SIZES = (64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024)
+CONCURRENCY_LEVELS = (1, 2, 4, 8, 16)
+DEFAULT_SIZE_MB = 64
+
+SMALL_FILES = 256
+SMALL_FILE_SIZE = 4096
+LISTING_DIRS = 16
+MIN_LATENCY_OPS = 64
+
+# A result counts as degraded below/above these fractions of the earlier median
+DEGRADED_THROUGHPUT = 0.7
+DEGRADED_LATENCY = 1.5
+BASELINE_RUNS = 5
+
+
+class BenchmarkStopped(Exception):
+    pass
+
+
+def _drop_cache(fd):
+    """Evict a file from the OS cache so it is read from the device; False if not possible"""
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        return True
+    except OSError:
+        return False
+
+
+def sequential_write(path, size, block_size):
+    """Write size bytes in block_size writes, flushed to the device; MB/s and cache dropped"""
+    block = memoryview(os.urandom(block_size))
+    started = time.perf_counter()
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0))
+    try:
+        written = 0
+        while written < size:
+            written += os.write(fd, block[:min(block_size, size - written)])
+        os.fsync(fd)
+        elapsed = time.perf_counter() - started
+        dropped = _drop_cache(fd)
+    finally:
+        os.close(fd)
+    return written / (1024 * 1024) / max(elapsed, 1e-9), dropped
+
+
+def sequential_read(path, block_size):
+    """Read a file in block_size reads; MB/s"""
+    buffer = bytearray(block_size)
+    started = time.perf_counter()
+    total = 0
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                break
+            total += count
+    return total / (1024 * 1024) / max(time.perf_counter() - started, 1e-9)
+
+
+def _percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
+
+
+def measure_latency(operation, items, concurrency, min_ops=MIN_LATENCY_OPS):
+    """Run operation(item) from `concurrency` threads; median/p95 latency and ops/s"""
+    count = max(len(items), min_ops)
+    work = [items[i % len(items)] for i in range(count)]
+
+    def timed(item):
+        started = time.perf_counter()
+        operation(item)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bench') as pool:
+            samples = list(pool.map(timed, work))
+    else:
+        samples = [timed(item) for item in work]
+    elapsed = time.perf_counter() - started
+
+    return {
+        'concurrency': concurrency,
+        'median_ms': round(_percentile(samples, 0.5) * 1000, 3),
+        'p95_ms': round(_percentile(samples, 0.95) * 1000, 3),
+        'ops_per_sec': round(count / max(elapsed, 1e-9), 1),
+    }
+
+
+def _list(path):
+    with os.scandir(path) as entries:
+        for entry in entries:
+            entry.is_dir()
+
+
+def recommend(result):
+    """Engine settings suggested by a benchmark result"""
+    recommended = {}
+
+    # Smallest buffer within 5% of the best average of write and read speed
+    sequential = result.get('sequential') or []
+    if sequential:
+        speeds = [((row['write_mbps'] + row['read_mbps']) / 2, row['block_kb'])
+                  for row in sequential]
+        best = max(speed for speed, _ in speeds)
+        recommended['copy_buffer_kb'] = min(block_kb for speed, block_kb in speeds
+                                            if speed >= best * 0.95)
+
+    # Fewest parallel listings within 10% of the best listing rate
+    listing = result.get('scandir') or []
+    if listing:
+        best = max(row['ops_per_sec'] for row in listing)
+        recommended['scan_threads'] = min(row['concurrency'] for row in listing
+                                          if row['ops_per_sec'] >= best * 0.9)
+    return recommended
+
+
+class NasBenchmark:
+    """Benchmark one destination path"""
+
+    def __init__(self, path, size_mb=DEFAULT_SIZE_MB, block_sizes=BLOCK_SIZES,
+                 concurrency=CONCURRENCY_LEVELS, small_files=SMALL_FILES, log=None,
+                 should_stop=None):
+        self.path = Path(path)
+        self.size = int(size_mb * 1024 * 1024)
+        self.block_sizes = block_sizes
+        self.concurrency = concurrency
+        self.small_files = small_files
+        self.log = log or (lambda message, level="INFO": None)
+        self.should_stop = should_stop or (lambda: False)
+
+    def _check_stop(self):
+        if self.should_stop():
+            raise BenchmarkStopped("Benchmark stopped")
+
+    def run(self):
+        """Run all measurements and return the result dict"""
+        if not self.path.is_dir():
+            raise OSError(f"Not a folder: {self.path}")
+
+        scratch = self.path / f".nassync_bench_{uuid.uuid4().hex[:8]}"
+        scratch.mkdir()
+        result = {
+            'path': str(self.path),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'size_mb': round(self.size / (1024 * 1024), 1),
+            'reads_cached': False,
+        }
+        started = time.perf_counter()
+        try:
+            result['sequential'] = self._sequential(scratch, result)
+            files, dirs = self._create_small_files(scratch, result)
+
+            result['stat'] = []
+            result['scandir'] = []
+            for level in self.concurrency:
+                self._check_stop()
+                self.log(f"Benchmark: stat and listing latency, {level} at once", "INFO")
+                result['stat'].append(measure_latency(os.stat, files, level))
+                result['scandir'].append(measure_latency(_list, dirs, level))
+
+            self._delete_small_files(files, result)
+        finally:
+            shutil.rmtree(str(scratch), ignore_errors=True)
+
+        result['duration'] = round(time.perf_counter() - started, 2)
+        result['recommended'] = recommend(result)
+        return result
+
+    def _sequential(self, scratch, result):
+        rows = []
+        for block_size in self.block_sizes:
+            self._check_stop()
+            self.log(f"Benchmark: sequential write/read, {block_size // 1024} KB blocks", "INFO")
+            path = str(scratch / f"seq_{block_size}")
+            write_mbps, dropped = sequential_write(path, self.size, block_size)
+            self._check_stop()
+            read_mbps = sequential_read(path, block_size)
+            os.remove(path)
+
+            result['reads_cached'] = result['reads_cached'] or not dropped
+            rows.append({
+                'block_kb': block_size // 1024,
+                'write_mbps': round(write_mbps, 1),
+                'read_mbps': round(read_mbps, 1),
+            })
+        return rows
+
+    def _create_small_files(self, scratch, result):
+        self._check_stop()
+        self.log(f"Benchmark: creating {self.small_files} small files", "INFO")
+        dirs = []
+        for i in range(LISTING_DIRS):
+            directory = scratch / f"dir{i:02d}"
+            directory.mkdir()
+            dirs.append(str(directory))
+
+        data = os.urandom(SMALL_FILE_SIZE)
+        files = []
+        started = time.perf_counter()
+        for i in range(self.small_files):
+            path = os.path.join(dirs[i % LISTING_DIRS], f"file{i:05d}")
+            with open(path, 'wb') as f:
+                f.write(data)
+            files.append(path)
+        elapsed = time.perf_counter() - started
+
+        result['small_files'] = {
+            'count': self.small_files,
+            'size_kb': SMALL_FILE_SIZE // 1024,
+            'create_per_sec': round(self.small_files / max(elapsed, 1e-9), 1),
+        }
+        return files, dirs
+
+    def _delete_small_files(self, files, result):
+        self._check_stop()
+        started = time.perf_counter()
+        for path in files:
+            os.remove(path)
+        elapsed = time.perf_counter() - started
+        result['small_files']['delete_per_sec'] = round(len(files) / max(elapsed, 1e-9), 1)
+
+
+def _key_metrics(result):
+    """Headline figures compared between runs: (name, value, higher is better)"""
+    metrics = []
+    sequential = result.get('sequential') or []
+    if sequential:
+        metrics.append(('write MB/s', max(row['write_mbps'] for row in sequential), True))
+        if not result.get('reads_cached'):
+            metrics.append(('read MB/s', max(row['read_mbps'] for row in sequential), True))
+    small = result.get('small_files') or {}
+    if small.get('create_per_sec'):
+        metrics.append(('file creates/s', small['create_per_sec'], True))
+    for name in ('stat', 'scandir'):
+        rows = [row for row in result.get(name) or [] if row['concurrency'] == 1]
+        if rows:
+            metrics.append((f"{name} ms", rows[0]['median_ms'], False))
+    return metrics
+
+
+def find_degradation(result, previous):
+    """Warnings for figures clearly worse than the median of earlier runs"""
+    warnings = []
+    if not previous:
+        return warnings
+
+    earlier = {}
+    for run in previous:
+        for name, value, _ in _key_metrics(run):
+            earlier.setdefault(name, []).append(value)
+
+    for name, value, higher_is_better in _key_metrics(result):
+        values = earlier.get(name)
+        if not values:
+            continue
+        baseline = _percentile(values, 0.5)
+        if baseline <= 0:
+            continue
+        if higher_is_better and value < baseline * DEGRADED_THROUGHPUT:
+            warnings.append(f"{name} {value:g} is {100 - value / baseline * 100:.0f}% below "
+                            f"the usual {baseline:g}")
+        elif not higher_is_better and value > baseline * DEGRADED_LATENCY:
+            warnings.append(f"{name} {value:g} is {value / baseline:.1f}x the usual {baseline:g}")
+    return warnings
+
+
+def summarize(result):
+    """Short multi-line text for logs and the GUI"""
+    lines = []
+    for row in result.get('sequential') or []:
+        lines.append(f"{row['block_kb']:>5} KB blocks: write {row['write_mbps']:g} MB/s, "
+                     f"read {row['read_mbps']:g} MB/s")
+    if result.get('reads_cached'):
+        lines.append("  (reads may have come from the OS cache)")
+    small = result.get('small_files') or {}
+    if small:
+        lines.append(f"Small files: {small.get('create_per_sec', 0):g} created/s, "
+                     f"{small.get('delete_per_sec', 0):g} deleted/s")
+    for name, label in (('stat', 'stat'), ('scandir', 'listing')):
+        rows = result.get(name) or []
+        if rows:
+            lines.append(f"{label}: " + ", ".join(
+                f"{row['concurrency']}x {row['median_ms']:g} ms ({row['ops_per_sec']:g}/s)"
+                for row in rows))
+    recommended = result.get('recommended') or {}
+    if recommended:
+        lines.append("Recommended: " + ", ".join(
+            f"{key} {value}" for key, value in sorted(recommended.items())))
+    return "\n".join(lines)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    path TEXT NOT NULL,
+    results TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_path ON runs(path, id);
+"""
+
+
+class BenchmarkHistory:
+    """Benchmark results per path, stored in ~/.nassync/nas_benchmarks.db"""
+
+    def __init__(self, db_path=None, max_runs_per_path=100):
+        self.db_path = Path(db_path) if db_path else \
+            Path.home() / '.nassync' / 'nas_benchmarks.db'
+        self.max_runs_per_path = max_runs_per_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            conn = self._connect()
+            try:
+                conn.executescript(SCHEMA)
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error initializing benchmark history: {e}")
+
+    def _connect(self):
+        return sqlite3.connect(str(self.db_path), timeout=30)
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(str(path)))
+
+    def add(self, result):
+        """Store a result, keeping the newest runs per path"""
+        key = self._key(result['path'])
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("INSERT INTO runs (timestamp, path, results) VALUES (?, ?, ?)",
+                                 (result['timestamp'], key, json.dumps(result)))
+                    conn.execute(
+                        "DELETE FROM runs WHERE path = ? AND id NOT IN "
+                        "(SELECT id FROM runs WHERE path = ? ORDER BY id DESC LIMIT ?)",
+                        (key, key, self.max_runs_per_path)
+                    )
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error saving benchmark: {e}")
+
+    def recent(self, path, limit=BASELINE_RUNS):
+        """Newest results for a path, newest first"""
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT results FROM runs WHERE path = ? ORDER BY id DESC LIMIT ?",
+                    (self._key(path), limit)
+                ).fetchall()
+            finally:
+                conn.close()
+            return [json.loads(row[0]) for row in rows]
+        except Exception as e:
+            print(f"Error loading benchmarks: {e}")
+            return []
+
+
+def run_benchmark(path, size_mb=DEFAULT_SIZE_MB, log=None, should_stop=None, save=True,
+                  history=None):
+    """Benchmark path, compare it with earlier runs and store the result
+
+    The result gets a 'warnings' list describing degradation.
+    """
+    history = history or BenchmarkHistory()
+    previous = history.recent(path)
+
+    result = NasBenchmark(path, size_mb, log=log, should_stop=should_stop).run()
+    result['warnings'] = find_degradation(result, previous)
+    if save:
+        history.add(result)
+    return result
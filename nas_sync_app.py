@@ -1,25 +1,32 @@
+import sys
+import time
+
+# Startup timing is opt-in and has to hook imports before anything else loads
+STARTUP_STARTED = time.perf_counter()
+IMPORT_TIMER = None
+if '--startup-timing' in sys.argv:
+    from startup_timing import ImportTimer
+    IMPORT_TIMER = ImportTimer()
+    IMPORT_TIMER.install()
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
-import time
 from datetime import datetime, timedelta
 import os
-import sys
 from sync_engine import SyncEngine
-from config_manager import ConfigManager
+from config_manager import ConfigManager, DEFAULT_JOB, get_jobs
+from fingerprint import DEFAULT_VERIFY_POLICY
+from job_scheduler import PRIORITIES, create_scheduler, combine_results
+from cron_scheduler import CATCH_UP_POLICIES, CronScheduler, schedule_from_config
+from dir_cache import LISTING_CACHE_MODES
 from history_manager import HistoryManager
+from transfer_ledger import TransferLedger, QUERIES, format_row, format_bytes
+from phase_stats import PHASES
+from profiling import PROFILE_MODES, resolve_profile_mode
+from transfer_order import ORDERS
+from pack_store import COMPRESSIONS
 from pathlib import Path
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import webbrowser
-
-try:
-    from tray_icon import TrayIcon, TRAY_AVAILABLE
-except ImportError:
-    TRAY_AVAILABLE = False
-    TrayIcon = None
-    print("Tray icon not available - install pystray and pillow for tray support")
 
 class ModernTheme:
     """Modern color theme for elegant UI"""
@@ -41,38 +48,111 @@ class ModernTheme:
     SHADOW = "#00000010"
 
 class NASyncApp:
-    def __init__(self, root):
+    def __init__(self, root, profile_override=None, startup_timer=None):
         self.root = root
+        self.profile_override = profile_override
+        self.startup_timer = startup_timer
         self.root.title("NAS Sync Manager - powered by stonklab")
         self.root.geometry("1100x750")
         self.root.minsize(1000, 650)
 
         self.config_manager = ConfigManager()
         self.history_manager = HistoryManager()
-        self.sync_engine = None
+        self.transfer_ledger = TransferLedger()
+        self.sync_engines = {}
+        self.job_scheduler = None
+        self.job_progress = {}
         self.sync_thread = None
         self.is_syncing = False
+        self.sync_paused = False
         self.auto_sync_active = False
         self.last_sync_time = None
         self.next_sync_time = None
+        self.auto_scheduler = None
         self.sync_start_time = None
         self.minimize_to_tray = True
 
         self.tray_icon = None
-        if TRAY_AVAILABLE and TrayIcon:
-            self.tray_icon = TrayIcon(self)
+
+        # Rarely used tabs are built the first time they are selected
+        self.lazy_tabs = {}
+        self.history_tab_built = False
+        self.bandwidth_spinbox = None
+        self.retention_spinbox = None
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
         self.setup_styles()
+        self.create_variables()
         self.setup_ui()
+        self.mark_startup("widgets created")
         self.load_config()
+        self.mark_startup("config loaded")
         self.update_stats()
 
-        if self.tray_icon and TRAY_AVAILABLE:
+        # The tray stack (pystray + PIL) loads once the window is up
+        self.root.after(200, self.start_tray)
+
+    def mark_startup(self, name):
+        if self.startup_timer:
+            self.startup_timer.mark(name)
+
+    def start_tray(self):
+        """Load the optional system tray icon"""
+        try:
+            from tray_icon import TrayIcon, TRAY_AVAILABLE
+        except ImportError:
+            print("Tray icon not available - install pystray and pillow for tray support")
+            return
+
+        if TRAY_AVAILABLE:
+            self.tray_icon = TrayIcon(self)
             self.tray_icon.start()
             self.log("System tray icon enabled", "INFO")
 
+    def create_variables(self):
+        """Create settings variables of the lazily built tabs"""
+        # Advanced tab
+        self.bandwidth_limit_var = tk.BooleanVar(value=False)
+        self.bandwidth_value_var = tk.StringVar(value="10")
+        self.retention_enabled_var = tk.BooleanVar(value=False)
+        self.retention_days_var = tk.StringVar(value="30")
+        self.smtp_server_var = tk.StringVar(value="smtp.gmail.com")
+        self.smtp_port_var = tk.StringVar(value="587")
+        self.from_email_var = tk.StringVar()
+        self.to_email_var = tk.StringVar()
+        self.email_password_var = tk.StringVar()
+        self.scheduled_sync_var = tk.BooleanVar(value=False)
+        self.schedule_times_var = tk.StringVar(value="09:00,18:00")
+        self.schedule_jitter_var = tk.StringVar(value="60")
+        self.catch_up_var = tk.StringVar(value="once")
+        self.profile_mode_var = tk.StringVar(value="off")
+        self.profile_keep_var = tk.StringVar(value="10")
+        self.max_parallel_jobs_var = tk.StringVar(value="2")
+        self.device_concurrency_var = tk.StringVar(value="2")
+        self.listing_cache_var = tk.StringVar(value="on")
+        self.scan_threads_var = tk.StringVar(value="8")
+        self.resume_var = tk.BooleanVar(value=True)
+        self.copy_buffer_var = tk.StringVar(value="1024")
+        self.auto_tune_var = tk.BooleanVar(value=True)
+        self.max_transfers_var = tk.StringVar(value="8")
+        self.transfer_workers_var = tk.StringVar(value="2")
+        self.range_streams_var = tk.StringVar(value="0")
+        self.range_min_var = tk.StringVar(value="512")
+        self.pack_var = tk.BooleanVar(value=False)
+        self.pack_max_var = tk.StringVar(value="128")
+        self.pack_compression_var = tk.StringVar(value="none")
+        self.bench_size_var = tk.StringVar(value="64")
+        self.bench_result_var = tk.StringVar(value="No benchmark run yet")
+        self.bench_recommended = None
+
+        # Jobs: settings of every job, the one shown in the Configuration tab
+        self.jobs = []
+        self.current_job = DEFAULT_JOB
+        self.job_var = tk.StringVar(value=DEFAULT_JOB)
+        self.job_priority_var = tk.StringVar(value="normal")
+        self.job_enabled_var = tk.BooleanVar(value=True)
+
     def setup_styles(self):
         """Configure modern styling"""
         style = ttk.Style()
@@ -149,16 +229,28 @@ class NASyncApp:
         # Tabs
         self.create_overview_tab()
         self.create_config_tab()
-        self.create_advanced_tab()
+        self.add_lazy_tab("  Advanced  ", self.create_advanced_tab)
         self.create_logs_tab()
-        self.create_history_tab()
-        self.create_about_tab()
-        
-    def create_about_tab(self):
+        self.add_lazy_tab("  History  ", self.create_history_tab)
+        self.add_lazy_tab("  About  ", self.create_about_tab, padding="20")
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+
+    def add_lazy_tab(self, text, builder, padding="15"):
+        """Add an empty tab whose content is built on first selection"""
+        tab = ttk.Frame(self.notebook, style='Main.TFrame', padding=padding)
+        self.notebook.add(tab, text=text)
+        self.lazy_tabs[str(tab)] = (tab, builder)
+
+    def on_tab_changed(self, event=None):
+        """Build a lazy tab the first time it is shown"""
+        pending = self.lazy_tabs.pop(self.notebook.select(), None)
+        if pending:
+            tab, builder = pending
+            builder(tab)
+
+    def create_about_tab(self, tab):
         """Create About tab"""
-
-        tab = ttk.Frame(self.notebook, style='Main.TFrame', padding="20")
-        self.notebook.add(tab, text="  About  ")
+        import webbrowser
 
         tab.columnconfigure(0, weight=1)
 
@@ -286,6 +378,13 @@ class NASyncApp:
                                        relief='flat', cursor='hand2', padx=20, pady=12)
         self.auto_sync_btn.pack(fill=tk.X, pady=(0, 10))
 
+        self.pause_btn = tk.Button(actions_frame, text="⏸ Pause Sync",
+                                   command=self.toggle_pause, bg=ModernTheme.WARNING,
+                                   fg='white', font=('Segoe UI', 10, 'bold'),
+                                   relief='flat', cursor='hand2', padx=20, pady=12,
+                                   state=tk.DISABLED)
+        self.pause_btn.pack(fill=tk.X, pady=(0, 10))
+
         self.stop_btn = tk.Button(actions_frame, text="⏹ Stop Sync",
                                  command=self.stop_sync, bg=ModernTheme.ERROR,
                                  fg='white', font=('Segoe UI', 10, 'bold'),
@@ -353,10 +452,34 @@ class NASyncApp:
         self.notebook.add(tab, text="  Configuration  ")
         tab.columnconfigure(0, weight=1)
 
+        # Job selector
+        job_frame = ttk.LabelFrame(tab, text="Sync Job", style='Card.TLabelframe',
+                                   padding="15")
+        job_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 15))
+
+        ttk.Label(job_frame, text="Job:", style='Card.TLabel').pack(side=tk.LEFT, padx=(0, 8))
+        self.job_combo = ttk.Combobox(job_frame, textvariable=self.job_var, width=20,
+                                      state='readonly')
+        self.job_combo.pack(side=tk.LEFT, padx=(0, 10))
+        self.job_combo.bind('<<ComboboxSelected>>', self.on_job_selected)
+
+        for text, command in (("New", self.add_job), ("Delete", self.delete_job),
+                              ("Sync This Job", lambda: self.sync_now([self.current_job]))):
+            tk.Button(job_frame, text=text, command=command, bg=ModernTheme.BG_ACCENT,
+                      font=('Segoe UI', 8), relief='flat', cursor='hand2',
+                      padx=12, pady=4).pack(side=tk.LEFT, padx=(0, 6))
+
+        ttk.Label(job_frame, text="Priority:", style='Card.TLabel').pack(
+            side=tk.LEFT, padx=(15, 8))
+        ttk.Combobox(job_frame, textvariable=self.job_priority_var, values=list(PRIORITIES),
+                     width=8, state='readonly').pack(side=tk.LEFT)
+        ttk.Checkbutton(job_frame, text="Enabled", variable=self.job_enabled_var).pack(
+            side=tk.LEFT, padx=(15, 0))
+
         # Paths Section
         paths_frame = ttk.LabelFrame(tab, text="Sync Paths", style='Card.TLabelframe',
                                     padding="15")
-        paths_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 15))
+        paths_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(0, 15))
         paths_frame.columnconfigure(1, weight=1)
 
         # NAS quick preset
@@ -403,7 +526,7 @@ class NASyncApp:
         # Sync Options
         options_frame = ttk.LabelFrame(tab, text="Sync Options", style='Card.TLabelframe',
                                       padding="15")
-        options_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(0, 15))
+        options_frame.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=(0, 15))
         options_frame.columnconfigure(1, weight=1)
 
         # Interval
@@ -430,7 +553,7 @@ class NASyncApp:
         # File Filters
         filters_frame = ttk.LabelFrame(tab, text="File Filters", style='Card.TLabelframe',
                                       padding="15")
-        filters_frame.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=(0, 15))
+        filters_frame.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(0, 15))
         filters_frame.columnconfigure(1, weight=1)
 
         ttk.Label(filters_frame, text="Include Patterns:", style='Card.TLabel').grid(
@@ -449,15 +572,43 @@ class NASyncApp:
         ttk.Label(filters_frame, text="e.g., *.tmp,~*,.git",
                  style='Subtitle.TLabel').grid(row=1, column=2, sticky=tk.W)
 
+        ttk.Label(filters_frame, text="Copy First:", style='Card.TLabel').grid(
+            row=2, column=0, sticky=tk.W, pady=8)
+        self.priority_patterns_var = tk.StringVar(value="")
+        ttk.Entry(filters_frame, textvariable=self.priority_patterns_var, width=50).grid(
+            row=2, column=1, sticky=(tk.W, tk.E), padx=8)
+        ttk.Label(filters_frame, text="e.g., *.docx,Documents/*",
+                 style='Subtitle.TLabel').grid(row=2, column=2, sticky=tk.W)
+
+        ttk.Label(filters_frame, text="Then Copy:", style='Card.TLabel').grid(
+            row=3, column=0, sticky=tk.W, pady=8)
+        self.transfer_order_var = tk.StringVar(value="scan")
+        ttk.Combobox(filters_frame, textvariable=self.transfer_order_var, values=list(ORDERS),
+                     width=10, state='readonly').grid(row=3, column=1, sticky=tk.W, padx=8)
+        ttk.Label(filters_frame, text="newest or smallest first; physical for HDD sources",
+                 style='Subtitle.TLabel').grid(row=3, column=2, sticky=tk.W)
+
         # Additional Options
         extra_frame = ttk.LabelFrame(tab, text="Additional Options", style='Card.TLabelframe',
                                     padding="15")
-        extra_frame.grid(row=3, column=0, sticky=(tk.W, tk.E))
+        extra_frame.grid(row=4, column=0, sticky=(tk.W, tk.E))
 
         self.verify_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(extra_frame, text="Verify files after copy (MD5 hash)",
                        variable=self.verify_var).pack(anchor=tk.W, pady=5)
 
+        policy_frame = ttk.Frame(extra_frame, style='Card.TFrame')
+        policy_frame.pack(anchor=tk.W, fill=tk.X, padx=(20, 0))
+        ttk.Label(policy_frame, text="Verify policy:", style='Card.TLabel').grid(
+            row=0, column=0, sticky=tk.W)
+        self.verify_policy_var = tk.StringVar(value=DEFAULT_VERIFY_POLICY)
+        ttk.Entry(policy_frame, textvariable=self.verify_policy_var, width=50).grid(
+            row=0, column=1, sticky=(tk.W, tk.E), padx=8)
+        ttk.Label(policy_frame,
+                  text="pattern=sample|full|metadata, first match wins; other files get a "
+                       "full hash. sample checks head, tail and spaced blocks of large files",
+                  style='Subtitle.TLabel').grid(row=1, column=0, columnspan=2, sticky=tk.W)
+
         self.subfolders_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(extra_frame, text="Include subfolders (recursive)",
                        variable=self.subfolders_var).pack(anchor=tk.W, pady=5)
@@ -470,12 +621,10 @@ class NASyncApp:
         save_btn = tk.Button(tab, text="💾 Save Configuration", command=self.save_config,
                            bg=ModernTheme.SUCCESS, fg='white', font=('Segoe UI', 10, 'bold'),
                            relief='flat', cursor='hand2', padx=20, pady=10)
-        save_btn.grid(row=4, column=0, pady=(15, 0))
+        save_btn.grid(row=5, column=0, pady=(15, 0))
 
-    def create_advanced_tab(self):
+    def create_advanced_tab(self, tab):
         """Create advanced settings tab"""
-        tab = ttk.Frame(self.notebook, style='Main.TFrame', padding="15")
-        self.notebook.add(tab, text="  Advanced  ")
         tab.columnconfigure(0, weight=1)
         tab.columnconfigure(1, weight=1)
 
@@ -486,7 +635,6 @@ class NASyncApp:
                             pady=(0, 15), padx=(0, 8))
         bandwidth_frame.columnconfigure(1, weight=1)
 
-        self.bandwidth_limit_var = tk.BooleanVar(value=False)
         ttk.Checkbutton(bandwidth_frame, text="Enable bandwidth limiting",
                        variable=self.bandwidth_limit_var,
                        command=self.toggle_bandwidth).grid(
@@ -494,7 +642,6 @@ class NASyncApp:
 
         ttk.Label(bandwidth_frame, text="Max Speed:", style='Card.TLabel').grid(
             row=1, column=0, sticky=tk.W, pady=5)
-        self.bandwidth_value_var = tk.StringVar(value="10")
         self.bandwidth_spinbox = ttk.Spinbox(bandwidth_frame, from_=1, to=1000,
                                             textvariable=self.bandwidth_value_var,
                                             width=10, state=tk.DISABLED)
@@ -509,7 +656,6 @@ class NASyncApp:
                            pady=(0, 15), padx=(8, 0))
         retention_frame.columnconfigure(1, weight=1)
 
-        self.retention_enabled_var = tk.BooleanVar(value=False)
         ttk.Checkbutton(retention_frame, text="Enable automatic cleanup",
                        variable=self.retention_enabled_var,
                        command=self.toggle_retention).grid(
@@ -517,7 +663,6 @@ class NASyncApp:
 
         ttk.Label(retention_frame, text="Keep files for:", style='Card.TLabel').grid(
             row=1, column=0, sticky=tk.W, pady=5)
-        self.retention_days_var = tk.StringVar(value="30")
         self.retention_spinbox = ttk.Spinbox(retention_frame, from_=1, to=365,
                                             textvariable=self.retention_days_var,
                                             width=10, state=tk.DISABLED)
@@ -533,31 +678,26 @@ class NASyncApp:
 
         ttk.Label(email_frame, text="SMTP Server:", style='Card.TLabel').grid(
             row=0, column=0, sticky=tk.W, pady=5)
-        self.smtp_server_var = tk.StringVar(value="smtp.gmail.com")
         ttk.Entry(email_frame, textvariable=self.smtp_server_var, width=30).grid(
             row=0, column=1, sticky=(tk.W, tk.E), padx=8)
 
         ttk.Label(email_frame, text="SMTP Port:", style='Card.TLabel').grid(
             row=0, column=2, sticky=tk.W, pady=5, padx=(15, 0))
-        self.smtp_port_var = tk.StringVar(value="587")
         ttk.Entry(email_frame, textvariable=self.smtp_port_var, width=10).grid(
             row=0, column=3, sticky=tk.W, padx=8)
 
         ttk.Label(email_frame, text="From Email:", style='Card.TLabel').grid(
             row=1, column=0, sticky=tk.W, pady=5)
-        self.from_email_var = tk.StringVar()
         ttk.Entry(email_frame, textvariable=self.from_email_var, width=30).grid(
             row=1, column=1, sticky=(tk.W, tk.E), padx=8)
 
         ttk.Label(email_frame, text="To Email:", style='Card.TLabel').grid(
             row=1, column=2, sticky=tk.W, pady=5, padx=(15, 0))
-        self.to_email_var = tk.StringVar()
         ttk.Entry(email_frame, textvariable=self.to_email_var, width=30).grid(
             row=1, column=3, sticky=(tk.W, tk.E), padx=8)
 
         ttk.Label(email_frame, text="Password:", style='Card.TLabel').grid(
             row=2, column=0, sticky=tk.W, pady=5)
-        self.email_password_var = tk.StringVar()
         ttk.Entry(email_frame, textvariable=self.email_password_var, show="*", width=30).grid(
             row=2, column=1, sticky=(tk.W, tk.E), padx=8)
 
@@ -573,20 +713,197 @@ class NASyncApp:
         schedule_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E))
         schedule_frame.columnconfigure(1, weight=1)
 
-        self.scheduled_sync_var = tk.BooleanVar(value=False)
         ttk.Checkbutton(schedule_frame, text="Sync only at specific times",
                        variable=self.scheduled_sync_var).grid(
                            row=0, column=0, columnspan=2, sticky=tk.W, pady=(0, 10))
 
         ttk.Label(schedule_frame, text="Sync Times:", style='Subtitle.TLabel').grid(
             row=1, column=0, sticky=tk.W)
-        ttk.Label(schedule_frame, text="(comma-separated, 24h format, e.g., 09:00,13:00,18:00)",
+        ttk.Label(schedule_frame, text="(24h times, e.g., 09:00,13:00,18:00, or a cron "
+                                       "expression such as */30 8-18 * * 1-5)",
                  style='Subtitle.TLabel').grid(row=1, column=1, sticky=tk.W, padx=8)
 
-        self.schedule_times_var = tk.StringVar(value="09:00,18:00")
         ttk.Entry(schedule_frame, textvariable=self.schedule_times_var, width=50).grid(
             row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=5)
 
+        timing_frame = ttk.Frame(schedule_frame, style='Card.TFrame')
+        timing_frame.grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+
+        ttk.Label(timing_frame, text="Random delay up to", style='Subtitle.TLabel').pack(
+            side=tk.LEFT)
+        ttk.Spinbox(timing_frame, from_=0, to=3600, textvariable=self.schedule_jitter_var,
+                    width=6).pack(side=tk.LEFT, padx=5)
+        ttk.Label(timing_frame, text="seconds", style='Subtitle.TLabel').pack(side=tk.LEFT)
+
+        ttk.Label(timing_frame, text="Missed runs (sleep/off):", style='Subtitle.TLabel').pack(
+            side=tk.LEFT, padx=(20, 5))
+        ttk.Combobox(timing_frame, textvariable=self.catch_up_var,
+                     values=list(CATCH_UP_POLICIES), width=6, state='readonly').pack(
+                         side=tk.LEFT)
+        ttk.Label(timing_frame, text="(once = run on wake-up, skip = wait for next time)",
+                  style='Subtitle.TLabel').pack(side=tk.LEFT, padx=5)
+
+        # Profiling
+        profiling_frame = ttk.LabelFrame(tab, text="Profiling (Diagnostics)",
+                                         style='Card.TLabelframe', padding="15")
+        profiling_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(15, 0))
+
+        ttk.Label(profiling_frame, text="Profile sync runs:", style='Card.TLabel').grid(
+            row=0, column=0, sticky=tk.W, pady=5)
+        ttk.Combobox(profiling_frame, textvariable=self.profile_mode_var,
+                     values=list(PROFILE_MODES), width=10, state='readonly').grid(
+                         row=0, column=1, sticky=tk.W, padx=8)
+
+        ttk.Label(profiling_frame, text="Keep last:", style='Card.TLabel').grid(
+            row=0, column=2, sticky=tk.W, padx=(15, 0))
+        ttk.Spinbox(profiling_frame, from_=1, to=100, textvariable=self.profile_keep_var,
+                    width=6).grid(row=0, column=3, sticky=tk.W, padx=8)
+        ttk.Label(profiling_frame, text="runs", style='Subtitle.TLabel').grid(
+            row=0, column=4, sticky=tk.W)
+
+        ttk.Label(profiling_frame,
+                  text="Writes .prof and memory reports to ~/.nassync/profiles/ "
+                       "(also: --profile MODE or NASSYNC_PROFILE)",
+                  style='Subtitle.TLabel').grid(row=1, column=0, columnspan=5, sticky=tk.W)
+
+        # Job scheduling
+        jobs_frame = ttk.LabelFrame(tab, text="Job Scheduling", style='Card.TLabelframe',
+                                    padding="15")
+        jobs_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(15, 0))
+
+        ttk.Label(jobs_frame, text="Jobs in parallel:", style='Card.TLabel').grid(
+            row=0, column=0, sticky=tk.W, pady=5)
+        ttk.Spinbox(jobs_frame, from_=1, to=16, textvariable=self.max_parallel_jobs_var,
+                    width=6).grid(row=0, column=1, sticky=tk.W, padx=8)
+
+        ttk.Label(jobs_frame, text="Jobs per NAS device/share:", style='Card.TLabel').grid(
+            row=0, column=2, sticky=tk.W, padx=(15, 0))
+        ttk.Spinbox(jobs_frame, from_=1, to=16, textvariable=self.device_concurrency_var,
+                    width=6).grid(row=0, column=3, sticky=tk.W, padx=8)
+
+        ttk.Label(jobs_frame,
+                  text="Jobs share the bandwidth limit; short and high-priority jobs start first",
+                  style='Subtitle.TLabel').grid(row=1, column=0, columnspan=4, sticky=tk.W)
+
+        # Source scanning
+        scan_frame = ttk.LabelFrame(tab, text="Folder Scanning", style='Card.TLabelframe',
+                                    padding="15")
+        scan_frame.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(15, 0))
+
+        ttk.Label(scan_frame, text="Folder listing cache:", style='Card.TLabel').grid(
+            row=0, column=0, sticky=tk.W, pady=5)
+        ttk.Combobox(scan_frame, textvariable=self.listing_cache_var,
+                     values=list(LISTING_CACHE_MODES), width=8, state='readonly').grid(
+                         row=0, column=1, sticky=tk.W, padx=8)
+        ttk.Label(scan_frame,
+                  text="on = re-list only folders whose contents changed; trust = also skip "
+                       "comparing files in unchanged folders (misses in-place edits)",
+                  style='Subtitle.TLabel').grid(row=1, column=0, columnspan=2, sticky=tk.W)
+
+        ttk.Label(scan_frame, text="Folders listed at once:", style='Card.TLabel').grid(
+            row=2, column=0, sticky=tk.W, pady=(10, 5))
+        ttk.Spinbox(scan_frame, from_=1, to=64, textvariable=self.scan_threads_var,
+                    width=8).grid(row=2, column=1, sticky=tk.W, padx=8, pady=(10, 5))
+        ttk.Label(scan_frame,
+                  text="More parallel listings speed up scans of large folder trees on "
+                       "the NAS; use 1 for very slow devices",
+                  style='Subtitle.TLabel').grid(row=3, column=0, columnspan=2, sticky=tk.W)
+
+        ttk.Checkbutton(scan_frame,
+                        text="Resume interrupted syncs where they stopped instead of rescanning",
+                        variable=self.resume_var).grid(row=4, column=0, columnspan=2,
+                                                       sticky=tk.W, pady=(10, 0))
+
+        # NAS benchmark and transfer tuning
+        bench_frame = ttk.LabelFrame(tab, text="NAS Performance", style='Card.TLabelframe',
+                                     padding="15")
+        bench_frame.grid(row=6, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(15, 0))
+        bench_frame.columnconfigure(5, weight=1)
+
+        ttk.Label(bench_frame, text="Test file size:", style='Card.TLabel').grid(
+            row=0, column=0, sticky=tk.W, pady=5)
+        ttk.Spinbox(bench_frame, from_=8, to=1024, textvariable=self.bench_size_var,
+                    width=6).grid(row=0, column=1, sticky=tk.W, padx=8)
+        ttk.Label(bench_frame, text="MB", style='Subtitle.TLabel').grid(
+            row=0, column=2, sticky=tk.W)
+
+        self.bench_button = tk.Button(bench_frame, text="Run Benchmark",
+                                      command=self.run_nas_benchmark,
+                                      bg=ModernTheme.ACCENT_PRIMARY, fg='white',
+                                      font=('Segoe UI', 8), relief='flat', cursor='hand2',
+                                      padx=15, pady=6)
+        self.bench_button.grid(row=0, column=3, padx=(15, 0))
+        self.bench_apply_button = tk.Button(bench_frame, text="Apply Recommended",
+                                            command=self.apply_benchmark_settings,
+                                            bg=ModernTheme.ACCENT_PRIMARY, fg='white',
+                                            font=('Segoe UI', 8), relief='flat',
+                                            cursor='hand2', padx=15, pady=6,
+                                            state=tk.DISABLED)
+        self.bench_apply_button.grid(row=0, column=4, padx=(8, 0))
+
+        ttk.Label(bench_frame, text="Copy buffer:", style='Card.TLabel').grid(
+            row=1, column=0, sticky=tk.W, pady=5)
+        ttk.Spinbox(bench_frame, from_=64, to=16384, increment=64,
+                    textvariable=self.copy_buffer_var, width=6).grid(
+                        row=1, column=1, sticky=tk.W, padx=8)
+        ttk.Label(bench_frame, text="KB", style='Subtitle.TLabel').grid(
+            row=1, column=2, sticky=tk.W)
+
+        ttk.Checkbutton(bench_frame, text="Auto-tune parallel transfers and buffer, up to",
+                        variable=self.auto_tune_var).grid(
+                            row=1, column=3, columnspan=2, sticky=tk.W, padx=(15, 0))
+        ttk.Spinbox(bench_frame, from_=1, to=32, textvariable=self.max_transfers_var,
+                    width=4).grid(row=1, column=5, sticky=tk.W, padx=8)
+
+        ttk.Label(bench_frame, text="Range streams:", style='Card.TLabel').grid(
+            row=2, column=0, sticky=tk.W, pady=5)
+        ttk.Spinbox(bench_frame, from_=0, to=16, textvariable=self.range_streams_var,
+                    width=6).grid(row=2, column=1, sticky=tk.W, padx=8)
+        ttk.Label(bench_frame, text="for files from", style='Subtitle.TLabel').grid(
+            row=2, column=2, sticky=tk.W)
+        ttk.Spinbox(bench_frame, from_=16, to=1048576, increment=128,
+                    textvariable=self.range_min_var, width=8).grid(
+                        row=2, column=3, sticky=tk.W, padx=(15, 0))
+        ttk.Label(bench_frame, text="MB (0 = one stream per file)",
+                  style='Subtitle.TLabel').grid(row=2, column=4, columnspan=2, sticky=tk.W,
+                                                padx=8)
+
+        ttk.Label(bench_frame, text="Parallel transfers:", style='Card.TLabel').grid(
+            row=3, column=0, sticky=tk.W, pady=5)
+        ttk.Spinbox(bench_frame, from_=1, to=32, textvariable=self.transfer_workers_var,
+                    width=6).grid(row=3, column=1, sticky=tk.W, padx=8)
+        ttk.Label(bench_frame, text="fixed without auto-tune, where auto-tune starts "
+                                    "for a new destination",
+                  style='Subtitle.TLabel').grid(row=3, column=2, columnspan=4, sticky=tk.W)
+
+        ttk.Checkbutton(bench_frame, text="Pack files up to", variable=self.pack_var).grid(
+            row=4, column=0, sticky=tk.W, pady=5)
+        ttk.Spinbox(bench_frame, from_=4, to=4096, increment=32,
+                    textvariable=self.pack_max_var, width=6).grid(
+                        row=4, column=1, sticky=tk.W, padx=8)
+        ttk.Label(bench_frame, text="KB", style='Subtitle.TLabel').grid(
+            row=4, column=2, sticky=tk.W)
+        ttk.Label(bench_frame, text="Compression:", style='Card.TLabel').grid(
+            row=4, column=3, sticky=tk.W, padx=(15, 0))
+        ttk.Combobox(bench_frame, textvariable=self.pack_compression_var,
+                     values=list(COMPRESSIONS), width=6, state='readonly').grid(
+                         row=4, column=4, sticky=tk.W, padx=8)
+        ttk.Label(bench_frame,
+                  text="Small files go into large pack files on the NAS (.nassync_packs); "
+                       "restore them with: nassync.py pack restore",
+                  style='Subtitle.TLabel').grid(row=5, column=0, columnspan=6, sticky=tk.W)
+
+        ttk.Label(bench_frame, textvariable=self.bench_result_var, style='Subtitle.TLabel',
+                  justify=tk.LEFT).grid(row=6, column=0, columnspan=6, sticky=tk.W,
+                                        pady=(10, 0))
+        ttk.Label(bench_frame,
+                  text="Measures the destination folder: throughput, small-file rate and "
+                       "latency. Results are kept to spot a slowing NAS.",
+                  style='Subtitle.TLabel').grid(row=7, column=0, columnspan=6, sticky=tk.W)
+
+        self.toggle_bandwidth()
+        self.toggle_retention()
+
     def create_logs_tab(self):
         """Create logs tab"""
         tab = ttk.Frame(self.notebook, style='Main.TFrame', padding="15")
@@ -628,12 +945,10 @@ class NASyncApp:
         self.log_text.tag_config("WARNING", foreground=ModernTheme.WARNING)
         self.log_text.tag_config("INFO", foreground=ModernTheme.TEXT_SECONDARY)
 
-    def create_history_tab(self):
+    def create_history_tab(self, tab):
         """Create sync history tab"""
-        tab = ttk.Frame(self.notebook, style='Main.TFrame', padding="15")
-        self.notebook.add(tab, text="  History  ")
         tab.columnconfigure(0, weight=1)
-        tab.rowconfigure(1, weight=1)
+        tab.rowconfigure(3, weight=1)
 
         # History stats
         stats_frame = ttk.LabelFrame(tab, text="Overall Statistics", style='Card.TLabelframe',
@@ -688,17 +1003,67 @@ class NASyncApp:
                                      padx=15, pady=6)
         refresh_hist_btn.pack(side=tk.RIGHT, padx=(0, 10))
 
+        insights_btn = tk.Button(controls_frame, text="File Insights",
+                                 command=self.show_transfer_insights, bg=ModernTheme.BG_ACCENT,
+                                 font=('Segoe UI', 8), relief='flat', cursor='hand2',
+                                 padx=15, pady=6)
+        insights_btn.pack(side=tk.RIGHT, padx=(0, 10))
+
+        # History filters (evaluated by the history store, not in the UI)
+        filters_frame = ttk.Frame(tab, style='Main.TFrame')
+        filters_frame.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+
+        ttk.Label(filters_frame, text="From:", style='Subtitle.TLabel',
+                  background=ModernTheme.BG_SECONDARY).pack(side=tk.LEFT)
+        self.history_from_var = tk.StringVar()
+        ttk.Entry(filters_frame, textvariable=self.history_from_var, width=12).pack(
+            side=tk.LEFT, padx=(5, 10))
+
+        ttk.Label(filters_frame, text="To:", style='Subtitle.TLabel',
+                  background=ModernTheme.BG_SECONDARY).pack(side=tk.LEFT)
+        self.history_to_var = tk.StringVar()
+        ttk.Entry(filters_frame, textvariable=self.history_to_var, width=12).pack(
+            side=tk.LEFT, padx=(5, 10))
+
+        ttk.Label(filters_frame, text="Status:", style='Subtitle.TLabel',
+                  background=ModernTheme.BG_SECONDARY).pack(side=tk.LEFT)
+        self.history_status_var = tk.StringVar(value="All")
+        ttk.Combobox(filters_frame, textvariable=self.history_status_var,
+                     values=["All", "Success", "Failed"], width=9,
+                     state='readonly').pack(side=tk.LEFT, padx=(5, 10))
+
+        ttk.Label(filters_frame, text="Job:", style='Subtitle.TLabel',
+                  background=ModernTheme.BG_SECONDARY).pack(side=tk.LEFT)
+        self.history_job_var = tk.StringVar(value="All")
+        self.history_job_combo = ttk.Combobox(filters_frame, textvariable=self.history_job_var,
+                                              values=["All"], width=15, state='readonly',
+                                              postcommand=self.update_history_jobs)
+        self.history_job_combo.pack(side=tk.LEFT, padx=(5, 10))
+
+        tk.Button(filters_frame, text="Apply Filter", command=self.refresh_history,
+                  bg=ModernTheme.BG_ACCENT, font=('Segoe UI', 8), relief='flat',
+                  cursor='hand2', padx=15, pady=4).pack(side=tk.LEFT)
+
+        ttk.Label(filters_frame, text="(dates as YYYY-MM-DD)", style='Subtitle.TLabel',
+                  background=ModernTheme.BG_SECONDARY).pack(side=tk.LEFT, padx=(10, 0))
+
+        self.history_count_label = ttk.Label(filters_frame, text="", style='Subtitle.TLabel',
+                                             background=ModernTheme.BG_SECONDARY)
+        self.history_count_label.pack(side=tk.RIGHT)
+
         # History table
         history_frame = ttk.Frame(tab, style='Card.TFrame', relief='solid', borderwidth=1)
-        history_frame.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        history_frame.grid(row=3, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         history_frame.columnconfigure(0, weight=1)
         history_frame.rowconfigure(0, weight=1)
 
-        columns = ("timestamp", "status", "copied", "updated", "deleted", "errors", "duration")
+        columns = ("timestamp", "job", "status", "copied", "updated", "deleted", "errors",
+                   "duration")
         self.history_tree = ttk.Treeview(history_frame, columns=columns, show='headings',
                                         height=15)
 
         self.history_tree.heading("timestamp", text="Date & Time")
+        self.history_tree.heading("job", text="Job")
         self.history_tree.heading("status", text="Status")
         self.history_tree.heading("copied", text="Copied")
         self.history_tree.heading("updated", text="Updated")
@@ -707,6 +1072,7 @@ class NASyncApp:
         self.history_tree.heading("duration", text="Duration")
 
         self.history_tree.column("timestamp", width=150)
+        self.history_tree.column("job", width=100)
         self.history_tree.column("status", width=80)
         self.history_tree.column("copied", width=80)
         self.history_tree.column("updated", width=80)
@@ -714,56 +1080,312 @@ class NASyncApp:
         self.history_tree.column("errors", width=80)
         self.history_tree.column("duration", width=100)
 
-        scrollbar = ttk.Scrollbar(history_frame, orient=tk.VERTICAL,
-                                 command=self.history_tree.yview)
-        self.history_tree.configure(yscrollcommand=scrollbar.set)
+        self.history_tree.tag_configure('error', foreground=ModernTheme.ERROR)
+
+        self.history_scrollbar = ttk.Scrollbar(history_frame, orient=tk.VERTICAL,
+                                               command=self.history_tree.yview)
+        self.history_tree.configure(yscrollcommand=self.on_history_scroll)
 
         self.history_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=2, pady=2)
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.history_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+        self.history_tree.bind('<<TreeviewSelect>>', self.on_history_select)
+
+        # Performance breakdown of the selected run
+        perf_frame = ttk.LabelFrame(tab, text="Performance", style='Card.TLabelframe',
+                                    padding="10")
+        perf_frame.grid(row=4, column=0, sticky=(tk.W, tk.E), pady=(10, 0))
+        perf_frame.columnconfigure(0, weight=1)
+
+        self.perf_title = ttk.Label(perf_frame, text="Select a run to see where its time went",
+                                    style='Subtitle.TLabel')
+        self.perf_title.grid(row=0, column=0, sticky=tk.W, pady=(0, 5))
+
+        perf_columns = ("phase", "time", "share", "ops", "bytes", "rate")
+        self.perf_tree = ttk.Treeview(perf_frame, columns=perf_columns, show='headings',
+                                      height=len(PHASES))
+        for column, title, width in (("phase", "Phase", 120), ("time", "Time", 90),
+                                     ("share", "% of Run", 80), ("ops", "Operations", 90),
+                                     ("bytes", "Bytes", 100), ("rate", "Rate", 110)):
+            self.perf_tree.heading(column, text=title)
+            self.perf_tree.column(column, width=width)
+        self.perf_tree.grid(row=1, column=0, sticky=(tk.W, tk.E))
+
+        # Paging state: rows are fetched lazily, newest first, off the UI thread
+        self.history_page_size = 200
+        self.history_oldest_id = None
+        self.history_exhausted = False
+        self.history_loading = False
+        self.history_generation = 0
+        self.history_tab_built = True
 
         self.refresh_history()
 
-    def refresh_history(self):
-        """Refresh history display"""
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
+    def get_history_filters(self):
+        """Read the History tab filter controls"""
+        filters = {}
+
+        for key, var, end_of_day in (('start_date', self.history_from_var, False),
+                                     ('end_date', self.history_to_var, True)):
+            value = var.get().strip()
+            if not value:
+                continue
+            try:
+                date = datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                continue
+            if end_of_day:
+                date = date + timedelta(days=1) - timedelta(microseconds=1)
+            filters[key] = date
+
+        status = self.history_status_var.get()
+        if status in ("Success", "Failed"):
+            filters['status'] = status.lower()
+
+        job = self.history_job_var.get()
+        if job and job != "All":
+            filters['job'] = job
 
-        stats = self.history_manager.get_statistics()
+        return filters
 
+    def history_entry_matches(self, entry, filters):
+        """Check a new entry against the active filters without querying the store"""
+        timestamp = entry.get('timestamp', '')
+        if 'start_date' in filters and timestamp < filters['start_date'].isoformat():
+            return False
+        if 'end_date' in filters and timestamp > filters['end_date'].isoformat():
+            return False
+        if filters.get('status') == 'success' and not entry.get('success'):
+            return False
+        if filters.get('status') == 'failed' and entry.get('success'):
+            return False
+        if 'job' in filters and entry.get('job', 'default') != filters['job']:
+            return False
+        return True
+
+    def update_history_jobs(self):
+        """Populate the job filter from the history store"""
+        self.history_job_combo.config(values=["All"] + self.history_manager.get_jobs())
+
+    def update_history_stats(self):
+        """Refresh the aggregate statistics and match count in the background"""
+        filters = self.get_history_filters()
+
+        def fetch():
+            stats = self.history_manager.get_statistics()
+            count = self.history_manager.count_entries(**filters)
+            self.root.after(0, lambda: self.show_history_stats(stats, count))
+
+        threading.Thread(target=fetch, daemon=True).start()
+
+    def show_history_stats(self, stats, count):
         self.history_stat_labels['total_syncs'].config(text=str(stats['total_syncs']))
         self.history_stat_labels['successful_syncs'].config(text=str(stats['successful_syncs']))
         self.history_stat_labels['failed_syncs'].config(text=str(stats['failed_syncs']))
         self.history_stat_labels['success_rate'].config(
             text=f"{stats['success_rate']:.1f}%"
         )
+        self.history_count_label.config(text=f"{count} matching runs")
 
-        history = self.history_manager.get_recent_entries(100)
+    def refresh_history(self):
+        """Reload the history view from the first page"""
+        if not self.history_tab_built:
+            return
 
-        for entry in history:
-            try:
-                timestamp = datetime.fromisoformat(entry['timestamp']).strftime("%Y-%m-%d %H:%M:%S")
-            except:
-                timestamp = entry['timestamp']
-
-            status = "Success" if entry.get('success') else "Failed"
-            duration = f"{entry.get('duration', 0):.1f}s"
-
-            values = (
-                timestamp,
-                status,
-                entry.get('copied', 0),
-                entry.get('updated', 0),
-                entry.get('deleted', 0),
-                entry.get('errors', 0),
-                duration
+        self.history_tree.delete(*self.history_tree.get_children())
+        self.history_oldest_id = None
+        self.history_exhausted = False
+        self.history_loading = False
+        self.history_generation += 1
+
+        self.update_history_stats()
+        self.load_history_page()
+
+    def load_history_page(self):
+        """Fetch the next page of entries in the background"""
+        if self.history_exhausted or self.history_loading:
+            return
+
+        self.history_loading = True
+        generation = self.history_generation
+        before_id = self.history_oldest_id
+        filters = self.get_history_filters()
+
+        def fetch():
+            entries = self.history_manager.get_page(
+                before_id=before_id,
+                limit=self.history_page_size,
+                **filters
             )
+            self.root.after(0, lambda: self.show_history_page(entries, generation))
 
-            item_id = self.history_tree.insert("", tk.END, values=values)
+        threading.Thread(target=fetch, daemon=True).start()
 
-            if not entry.get('success'):
-                self.history_tree.item(item_id, tags=('error',))
+    def show_history_page(self, entries, generation):
+        """Append a fetched page unless the view was reset meanwhile"""
+        if generation != self.history_generation:
+            return
 
-        self.history_tree.tag_configure('error', foreground=ModernTheme.ERROR)
+        self.history_loading = False
+        for entry in entries:
+            self.insert_history_row(entry, tk.END)
+
+        if entries:
+            self.history_oldest_id = entries[-1]['id']
+        if len(entries) < self.history_page_size:
+            self.history_exhausted = True
+
+    def on_history_scroll(self, first, last):
+        """Track the scrollbar and fetch more rows near the bottom"""
+        self.history_scrollbar.set(first, last)
+        if float(last) > 0.9 and not self.history_exhausted:
+            self.root.after_idle(self.load_history_page)
+
+    def insert_history_row(self, entry, index):
+        """Insert a single history entry into the tree"""
+        try:
+            timestamp = datetime.fromisoformat(entry['timestamp']).strftime("%Y-%m-%d %H:%M:%S")
+        except:
+            timestamp = entry['timestamp']
+
+        status = "Success" if entry.get('success') else "Failed"
+        duration = f"{entry.get('duration', 0):.1f}s"
+
+        values = (
+            timestamp,
+            entry.get('job', 'default'),
+            status,
+            entry.get('copied', 0),
+            entry.get('updated', 0),
+            entry.get('deleted', 0),
+            entry.get('errors', 0),
+            duration
+        )
+
+        tags = () if entry.get('success') else ('error',)
+        iid = str(entry['id']) if entry.get('id') is not None else ''
+        if iid and self.history_tree.exists(iid):
+            return
+        self.history_tree.insert("", index, iid=iid or None, values=values, tags=tags)
+
+    def add_history_row(self, entry):
+        """Show a newly recorded entry without reloading the view"""
+        if not self.history_tab_built:
+            return
+
+        if self.history_entry_matches(entry, self.get_history_filters()):
+            self.insert_history_row(entry, 0)
+        self.update_history_stats()
+        self.show_performance(entry)
+
+    def on_history_select(self, event=None):
+        """Show the performance breakdown of the selected run"""
+        selection = self.history_tree.selection()
+        if not selection:
+            return
+
+        try:
+            entry = self.history_manager.get_entry(int(selection[0]))
+        except ValueError:
+            entry = None
+
+        if entry:
+            self.show_performance(entry)
+
+    def show_performance(self, entry):
+        """Fill the Performance panel from a history entry"""
+        self.perf_tree.delete(*self.perf_tree.get_children())
+
+        phases = entry.get('phases')
+        timestamp = entry.get('timestamp', '')[:19].replace('T', ' ')
+        if not phases:
+            self.perf_title.config(text=f"No phase timings recorded for run {timestamp}")
+            return
+
+        duration = entry.get('duration', 0) or 0
+        self.perf_title.config(text=f"Run {timestamp} - total {duration:.1f}s")
+
+        for name in PHASES:
+            phase = phases.get(name, {})
+            seconds = phase.get('seconds', 0)
+            size = phase.get('bytes', 0)
+            share = f"{seconds / duration * 100:.1f}%" if duration else ""
+            rate = f"{format_bytes(size / seconds)}/s" if size and seconds else ""
+
+            self.perf_tree.insert("", tk.END, values=(
+                name.title(),
+                f"{seconds:.2f}s",
+                share,
+                phase.get('ops', 0),
+                format_bytes(size) if size else "",
+                rate
+            ))
+
+    def show_transfer_insights(self):
+        """Show per-file ledger queries in a separate window"""
+        window = tk.Toplevel(self.root)
+        window.title("File Insights")
+        window.geometry("850x450")
+        window.configure(bg=ModernTheme.BG_SECONDARY)
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(1, weight=1)
+
+        controls = ttk.Frame(window, style='Main.TFrame', padding="10")
+        controls.grid(row=0, column=0, sticky=(tk.W, tk.E))
+
+        query_names = {title: key for key, title in QUERIES.items()}
+        query_var = tk.StringVar(value=QUERIES['largest'])
+        ttk.Combobox(controls, textvariable=query_var, values=list(query_names),
+                     width=28, state='readonly').pack(side=tk.LEFT, padx=(0, 10))
+
+        ttk.Label(controls, text="Last", style='Subtitle.TLabel',
+                  background=ModernTheme.BG_SECONDARY).pack(side=tk.LEFT)
+        days_var = tk.StringVar(value="7")
+        ttk.Spinbox(controls, from_=0, to=365, textvariable=days_var,
+                    width=6).pack(side=tk.LEFT, padx=5)
+        ttk.Label(controls, text="days (0 = all)", style='Subtitle.TLabel',
+                  background=ModernTheme.BG_SECONDARY).pack(side=tk.LEFT)
+
+        table_frame = ttk.Frame(window, style='Card.TFrame', relief='solid', borderwidth=1)
+        table_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=10, pady=(0, 10))
+        table_frame.columnconfigure(0, weight=1)
+        table_frame.rowconfigure(0, weight=1)
+
+        tree = ttk.Treeview(table_frame, show='headings')
+        scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+        def run_query():
+            try:
+                days = int(days_var.get())
+            except ValueError:
+                days = 7
+
+            try:
+                rows = self.transfer_ledger.run_query(query_names[query_var.get()], days, 100)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to query ledger:\n{str(e)}", parent=window)
+                return
+
+            tree.delete(*tree.get_children())
+            columns = list(rows[0].keys()) if rows else ["path"]
+            tree.configure(columns=columns)
+            for column in columns:
+                tree.heading(column, text=column.replace('_', ' ').title())
+                tree.column(column, width=380 if column in ('root', 'path', 'directory', 'error')
+                            else 90)
+
+            for row in rows:
+                formatted = format_row(row)
+                tree.insert("", tk.END, values=[formatted[column] for column in columns])
+
+        tk.Button(controls, text="Run", command=run_query, bg=ModernTheme.ACCENT_PRIMARY,
+                  fg='white', font=('Segoe UI', 8), relief='flat', cursor='hand2',
+                  padx=15, pady=4).pack(side=tk.LEFT, padx=(10, 0))
+
+        run_query()
 
     def export_history(self):
         """Export history to file"""
@@ -789,6 +1411,96 @@ class NASyncApp:
             self.refresh_history()
             messagebox.showinfo("Success", "History cleared successfully!")
 
+    def job_form(self):
+        """Settings of the job shown in the Configuration tab"""
+        return {
+            'name': self.current_job,
+            'source': self.source_var.get(),
+            'destination': self.dest_var.get(),
+            'mode': self.sync_mode_var.get(),
+            'include': self.include_var.get(),
+            'exclude': self.exclude_var.get(),
+            'verify': self.verify_var.get(),
+            'verify_policy': self.verify_policy_var.get(),
+            'subfolders': self.subfolders_var.get(),
+            'transfer_order': self.transfer_order_var.get(),
+            'priority_patterns': self.priority_patterns_var.get(),
+            'priority': self.job_priority_var.get(),
+            'enabled': self.job_enabled_var.get()
+        }
+
+    def store_current_job(self):
+        """Copy the Configuration tab back into the jobs list"""
+        form = self.job_form()
+        for job in self.jobs:
+            if job['name'] == self.current_job:
+                job.update(form)
+                return
+        self.jobs.append(form)
+
+    def show_job(self, job):
+        """Fill the Configuration tab with a job's settings"""
+        self.current_job = job['name']
+        self.job_var.set(job['name'])
+        self.source_var.set(job.get('source', ''))
+        self.dest_var.set(job.get('destination', ''))
+        self.sync_mode_var.set(job.get('mode', 'mirror'))
+        self.include_var.set(job.get('include', '*'))
+        self.exclude_var.set(job.get('exclude', '*.tmp,~*,.DS_Store,Thumbs.db'))
+        self.verify_var.set(job.get('verify', True))
+        self.verify_policy_var.set(job.get('verify_policy', DEFAULT_VERIFY_POLICY))
+        self.subfolders_var.set(job.get('subfolders', True))
+        self.transfer_order_var.set(job.get('transfer_order', 'scan'))
+        self.priority_patterns_var.set(job.get('priority_patterns', ''))
+        self.job_priority_var.set(job.get('priority', 'normal'))
+        self.job_enabled_var.set(job.get('enabled', True))
+        self.job_combo.config(values=[item['name'] for item in self.jobs])
+
+    def on_job_selected(self, event=None):
+        name = self.job_var.get()
+        if name == self.current_job:
+            return
+
+        self.store_current_job()
+        for job in self.jobs:
+            if job['name'] == name:
+                self.show_job(job)
+                break
+
+    def add_job(self):
+        """Create a new job with default settings"""
+        from tkinter import simpledialog
+
+        name = simpledialog.askstring("New Job", "Name of the new sync job:", parent=self.root)
+        if not name or not name.strip():
+            return
+
+        name = name.strip()
+        if any(job['name'] == name for job in self.jobs):
+            messagebox.showerror("Error", f"A job named '{name}' already exists.")
+            return
+
+        self.store_current_job()
+        job = {key: value for key, value in self.job_form().items()
+               if key not in ('source', 'destination')}
+        job['name'] = name
+        self.jobs.append(job)
+        self.show_job(job)
+        self.log(f"Job '{name}' created - set its folders and save the configuration", "INFO")
+
+    def delete_job(self):
+        """Remove the job shown in the Configuration tab"""
+        if len(self.jobs) <= 1:
+            messagebox.showerror("Error", "At least one job is required.")
+            return
+
+        if not messagebox.askyesno("Delete Job", f"Delete job '{self.current_job}'?\n"
+                                   "Its history is kept."):
+            return
+
+        self.jobs = [job for job in self.jobs if job['name'] != self.current_job]
+        self.show_job(self.jobs[0])
+
     def detect_network_drives(self):
         """Detect available network drives (Windows) or mounted shares"""
         drives = []
@@ -826,11 +1538,15 @@ class NASyncApp:
 
     def toggle_bandwidth(self):
         """Toggle bandwidth limiting option"""
+        if not self.bandwidth_spinbox:
+            return
         state = tk.NORMAL if self.bandwidth_limit_var.get() else tk.DISABLED
         self.bandwidth_spinbox.config(state=state)
 
     def toggle_retention(self):
         """Toggle retention policy option"""
+        if not self.retention_spinbox:
+            return
         state = tk.NORMAL if self.retention_enabled_var.get() else tk.DISABLED
         self.retention_spinbox.config(state=state)
 
@@ -852,7 +1568,19 @@ class NASyncApp:
 
                 self.log("Connection test successful!", "SUCCESS")
                 self.update_connection_status(True)
-                messagebox.showinfo("Success", "NAS connection successful!")
+
+                # Refresh the cached capabilities the sync engine picks its strategies from
+                from fs_probe import choose_strategy, get_capabilities
+                capabilities = get_capabilities(dest, refresh=True, log=self.log)
+                details = ""
+                if capabilities:
+                    strategy = choose_strategy(capabilities)
+                    latency = capabilities['latency_ms']
+                    details = (f"\n\nTimestamp precision: {capabilities['mtime_granularity']:g}s\n"
+                               f"Case-sensitive names: {'yes' if capabilities['case_sensitive'] else 'no'}\n"
+                               f"Safe replace of updated files: {'yes' if strategy['temp_files'] == 'replace' else 'no'}\n"
+                               f"Latency: stat {latency['stat']} ms, create {latency['create']} ms")
+                messagebox.showinfo("Success", "NAS connection successful!" + details)
             else:
                 self.log("Connection test failed: Path not accessible", "ERROR")
                 self.update_connection_status(False)
@@ -865,6 +1593,62 @@ class NASyncApp:
             self.update_connection_status(False)
             messagebox.showerror("Error", f"Connection failed:\n{str(e)}")
 
+    def run_nas_benchmark(self):
+        """Benchmark the destination in the background"""
+        dest = self.dest_var.get()
+        if not dest:
+            messagebox.showwarning("No Destination", "Please set a destination path first.")
+            return
+
+        try:
+            size_mb = max(1, int(self.bench_size_var.get()))
+        except ValueError:
+            size_mb = 64
+
+        self.bench_button.config(state=tk.DISABLED)
+        self.bench_result_var.set("Running benchmark...")
+        self.log(f"Benchmarking {dest}...", "INFO")
+
+        def work():
+            from nas_benchmark import run_benchmark
+
+            try:
+                result, error = run_benchmark(dest, size_mb, log=self.log), None
+            except Exception as e:
+                result, error = None, str(e)
+            self.root.after(0, lambda: self.show_benchmark(result, error))
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def show_benchmark(self, result, error):
+        from nas_benchmark import summarize
+
+        self.bench_button.config(state=tk.NORMAL)
+        if error:
+            self.log(f"Benchmark failed: {error}", "ERROR")
+            self.bench_result_var.set(f"Benchmark failed: {error}")
+            return
+
+        text = summarize(result)
+        for warning in result['warnings']:
+            self.log(f"NAS slower than usual: {warning}", "WARNING")
+            text += f"\nSlower than usual: {warning}"
+        self.bench_result_var.set(text)
+        self.log(f"Benchmark finished in {result['duration']:g}s", "SUCCESS")
+
+        self.bench_recommended = result.get('recommended') or None
+        self.bench_apply_button.config(
+            state=tk.NORMAL if self.bench_recommended else tk.DISABLED)
+
+    def apply_benchmark_settings(self):
+        """Use the settings suggested by the last benchmark (saved with Save Settings)"""
+        recommended = self.bench_recommended or {}
+        if 'scan_threads' in recommended:
+            self.scan_threads_var.set(str(recommended['scan_threads']))
+        if 'copy_buffer_kb' in recommended:
+            self.copy_buffer_var.set(str(recommended['copy_buffer_kb']))
+        self.log("Applied benchmark recommendations; save settings to keep them", "INFO")
+
     def update_connection_status(self, connected):
         """Update connection status indicator"""
         if connected:
@@ -888,6 +1672,10 @@ class NASyncApp:
             return
 
         try:
+            import smtplib
+            from email.mime.text import MIMEText
+            from email.mime.multipart import MIMEMultipart
+
             msg = MIMEMultipart()
             msg['From'] = self.from_email_var.get()
             msg['To'] = self.to_email_var.get()
@@ -964,49 +1752,71 @@ class NASyncApp:
                     text=self.last_sync_time.strftime("%H:%M:%S")
                 )
 
+            if self.auto_scheduler:
+                self.next_sync_time = self.auto_scheduler.next_run_time()
+
             if self.next_sync_time and self.auto_sync_active:
+                time_format = "%H:%M:%S" if self.next_sync_time.date() == datetime.now().date() \
+                    else "%a %H:%M"
                 self.stat_cards['next_sync'].config(
-                    text=self.next_sync_time.strftime("%H:%M:%S")
+                    text=self.next_sync_time.strftime(time_format)
                 )
             elif not self.auto_sync_active:
                 self.stat_cards['next_sync'].config(text="Not Scheduled")
 
         self.root.after(1000, self.update_stats)
 
-    def validate_paths(self):
-        source = self.source_var.get()
-        dest = self.dest_var.get()
+    def validate_paths(self, jobs=None):
+        for job in jobs if jobs is not None else [self.job_form()]:
+            source = job.get('source')
+            dest = job.get('destination')
+            prefix = f"Job '{job['name']}': " if len(self.jobs) > 1 else ""
 
-        if not source or not dest:
-            messagebox.showerror("Error", "Please select both source and destination folders.")
-            return False
+            if not source or not dest:
+                messagebox.showerror("Error", f"{prefix}Please select both source and "
+                                              f"destination folders.")
+                return False
 
-        if not os.path.exists(source):
-            messagebox.showerror("Error", f"Source folder does not exist:\n{source}")
-            return False
+            if not os.path.exists(source):
+                messagebox.showerror("Error", f"{prefix}Source folder does not exist:\n{source}")
+                return False
 
-        if not os.path.isdir(source):
-            messagebox.showerror("Error", "Source must be a folder.")
-            return False
+            if not os.path.isdir(source):
+                messagebox.showerror("Error", f"{prefix}Source must be a folder.")
+                return False
 
         return True
 
-    def sync_now(self):
-        if not self.validate_paths():
+    def selected_jobs(self, names=None):
+        """Complete configurations of the named jobs, or of all enabled jobs"""
+        jobs = get_jobs(self.get_current_config())
+        if names:
+            return [job for job in jobs if job['name'] in names]
+        return [job for job in jobs if job.get('enabled', True)]
+
+    def sync_now(self, job_names=None):
+        jobs = self.selected_jobs(job_names)
+        if not jobs:
+            messagebox.showwarning("Warning", "No enabled jobs to sync.")
+            return
+
+        if not self.validate_paths(jobs):
             return
 
         if self.is_syncing:
             messagebox.showwarning("Warning", "Sync is already in progress.")
             return
 
-        self.sync_thread = threading.Thread(target=self.run_sync, daemon=True)
+        self.sync_thread = threading.Thread(target=self.run_sync, args=(jobs,), daemon=True)
         self.sync_thread.start()
 
-    def run_sync(self):
+    def run_sync(self, jobs):
         self.is_syncing = True
+        self.sync_paused = False
         self.sync_start_time = time.time()
         self.sync_now_btn.config(state=tk.DISABLED)
         self.auto_sync_btn.config(state=tk.DISABLED)
+        self.pause_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.NORMAL)
         self.status_text.config(text="Syncing in progress...")
         self.stat_cards['sync_status'].config(text="Syncing...",
@@ -1021,10 +1831,18 @@ class NASyncApp:
 
         try:
             config = self.get_current_config()
-            self.sync_engine = SyncEngine(config, self.log, self.update_progress)
+            names = [job['name'] for job in jobs]
+            self.job_progress = {name: 0 for name in names}
+            self.job_scheduler = create_scheduler(
+                config, self.run_job, self.history_manager.get_expected_durations(names),
+                self.log
+            )
 
-            self.log("Starting sync operation to NAS...", "INFO")
-            result = self.sync_engine.sync()
+            if len(jobs) > 1:
+                self.log(f"Starting {len(jobs)} sync jobs: {', '.join(names)}", "INFO")
+            else:
+                self.log("Starting sync operation to NAS...", "INFO")
+            result = combine_results(self.job_scheduler.run(jobs))
 
             sync_duration = time.time() - self.sync_start_time
             result['duration'] = sync_duration
@@ -1101,75 +1919,177 @@ class NASyncApp:
 
         finally:
             self.is_syncing = False
+            self.sync_paused = False
             self.sync_now_btn.config(state=tk.NORMAL)
             self.auto_sync_btn.config(state=tk.NORMAL)
+            self.pause_btn.config(text="⏸ Pause Sync", bg=ModernTheme.WARNING, state=tk.DISABLED)
             self.stop_btn.config(state=tk.DISABLED)
             self.progress_var.set(100)
-
-            if result:
-                self.history_manager.add_entry(
-                    self.source_var.get(),
-                    self.dest_var.get(),
-                    result
-                )
-                self.refresh_history()
+            self.job_scheduler = None
 
             if self.tray_icon and not result.get('success'):
                 self.tray_icon.update_icon("idle")
                 self.tray_icon.update_tooltip("Ready")
 
+    def run_job(self, job, bandwidth=None):
+        """Run one job for the scheduler and record it in the history"""
+        name = job['name']
+        config = dict(job)
+        config['profile_mode'] = resolve_profile_mode(config['profile_mode'],
+                                                      self.profile_override)
+
+        started = time.time()
+        engine = SyncEngine(config, self.log, lambda value: self.update_job_progress(name, value),
+                            ledger=self.transfer_ledger, bandwidth=bandwidth)
+        self.sync_engines[name] = engine
+        if self.sync_paused:
+            engine.pause()
+        try:
+            result = engine.sync()
+        except Exception as e:
+            self.log(f"Sync error in job {name}: {str(e)}", "ERROR")
+            result = {'success': False, 'copied': 0, 'updated': 0, 'deleted': 0,
+                      'errors': 1, 'skipped': 0}
+        finally:
+            self.sync_engines.pop(name, None)
+
+        result['duration'] = time.time() - started
+        if len(self.job_progress) > 1:
+            self.log(f"Job {name} finished: copied {result['copied']}, "
+                     f"updated {result['updated']}, errors {result['errors']}",
+                     "SUCCESS" if result['success'] else "ERROR")
+
+        entry = self.history_manager.add_entry(config['source'], config['destination'],
+                                               result, job=name)
+        self.root.after(0, lambda: self.add_history_row(entry))
+        return result
+
+    def update_job_progress(self, name, value):
+        """Show the average progress of all jobs in the current run"""
+        self.job_progress[name] = value
+        self.update_progress(sum(self.job_progress.values()) / len(self.job_progress))
+
     def toggle_auto_sync(self):
         if not self.auto_sync_active:
-            if not self.validate_paths():
+            if not self.validate_paths(self.selected_jobs()):
+                return
+
+            config = self.get_current_config()
+            try:
+                trigger, run_now = schedule_from_config(config)
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid sync schedule:\n{e}")
                 return
 
             self.auto_sync_active = True
             self.auto_sync_btn.config(text="⏸ Stop Auto-Sync", bg=ModernTheme.WARNING)
-            self.log("Auto-sync activated", "INFO")
+            self.log(f"Auto-sync activated ({trigger})", "INFO")
             self.stat_cards['sync_status'].config(text="Auto-Sync Active",
                                                  foreground=ModernTheme.ACCENT_PRIMARY)
 
-            self.auto_sync_thread = threading.Thread(target=self.auto_sync_loop, daemon=True)
+            # Manual syncs count as running, so scheduled runs never overlap them
+            self.auto_scheduler = CronScheduler(
+                self.log,
+                jitter=int(config.get('schedule_jitter') or 0),
+                catch_up=config.get('catch_up', 'once'),
+                busy=lambda: self.is_syncing
+            )
+            self.auto_scheduler.add('auto-sync', trigger, self.scheduled_sync, run_now=run_now)
+            self.auto_sync_thread = threading.Thread(target=self.auto_scheduler.run, daemon=True)
             self.auto_sync_thread.start()
         else:
             self.auto_sync_active = False
+            if self.auto_scheduler:
+                self.auto_scheduler.stop()
+                self.auto_scheduler = None
             self.auto_sync_btn.config(text="▶ Start Auto-Sync", bg='#10B981')
             self.log("Auto-sync deactivated", "INFO")
             self.stat_cards['sync_status'].config(text="Ready",
                                                  foreground=ModernTheme.SUCCESS)
             self.next_sync_time = None
 
-    def auto_sync_loop(self):
-        while self.auto_sync_active:
-            try:
-                interval = int(self.interval_var.get()) * 60
-            except ValueError:
-                interval = 1800
+    def scheduled_sync(self):
+        """Run all enabled jobs from the auto-sync scheduler"""
+        jobs = self.selected_jobs()
+        if not jobs:
+            self.log("Auto-sync: no enabled jobs", "WARNING")
+            return
+
+        self.run_sync(jobs)
 
-            self.next_sync_time = datetime.now() + timedelta(seconds=interval)
+    def toggle_pause(self):
+        """Pause or resume the running jobs; queued jobs wait while paused"""
+        if not self.is_syncing:
+            return
 
-            if not self.is_syncing:
-                self.sync_now()
+        self.sync_paused = not self.sync_paused
+        if self.job_scheduler:
+            if self.sync_paused:
+                self.job_scheduler.pause()
+            else:
+                self.job_scheduler.resume()
+        for engine in list(self.sync_engines.values()):
+            if self.sync_paused:
+                engine.pause()
+            else:
+                engine.resume()
 
-            for _ in range(interval):
-                if not self.auto_sync_active:
-                    break
-                time.sleep(1)
+        if self.sync_paused:
+            self.pause_btn.config(text="▶ Resume Sync", bg='#10B981')
+            self.status_text.config(text="Sync paused")
+            self.stat_cards['sync_status'].config(text="Paused", foreground=ModernTheme.WARNING)
+        else:
+            self.pause_btn.config(text="⏸ Pause Sync", bg=ModernTheme.WARNING)
+            self.status_text.config(text="Syncing in progress...")
+            self.stat_cards['sync_status'].config(text="Syncing...",
+                                                 foreground=ModernTheme.ACCENT_PRIMARY)
+        if self.tray_icon:
+            self.tray_icon.update_tooltip("Paused" if self.sync_paused else
+                                          f"Syncing... {int(self.progress_var.get())}%")
 
     def stop_sync(self):
-        if self.sync_engine:
-            self.sync_engine.stop()
+        if self.job_scheduler:
+            self.job_scheduler.stop()
+
+        engines = list(self.sync_engines.values())
+        for engine in engines:
+            engine.stop()
+        if engines:
             self.log("Stop requested...", "WARNING")
 
     def update_progress(self, value):
         self.progress_var.set(value)
         self.progress_label.config(text=f"{int(value)}% Complete")
 
-        if self.tray_icon and self.is_syncing:
+        if self.tray_icon and self.is_syncing and not self.sync_paused:
             self.tray_icon.update_tooltip(f"Syncing... {int(value)}%")
 
     def get_current_config(self):
-        return {
+        self.store_current_job()
+
+        # A single job named 'default' keeps the flat layout of older versions
+        if len(self.jobs) == 1 and self.jobs[0]['name'] == DEFAULT_JOB:
+            jobs = []
+        else:
+            jobs = [dict(job) for job in self.jobs]
+
+        # Laid over config.json: settings the GUI does not show are kept
+        return self.config_manager.merged_config({
+            'jobs': jobs,
+            'max_parallel_jobs': int(self.max_parallel_jobs_var.get()),
+            'device_concurrency': int(self.device_concurrency_var.get()),
+            'listing_cache': self.listing_cache_var.get(),
+            'scan_threads': int(self.scan_threads_var.get()),
+            'resume_interrupted': self.resume_var.get(),
+            'copy_buffer_kb': int(self.copy_buffer_var.get()),
+            'auto_tune': self.auto_tune_var.get(),
+            'max_transfer_workers': int(self.max_transfers_var.get()),
+            'transfer_workers': int(self.transfer_workers_var.get()),
+            'range_copy_streams': int(self.range_streams_var.get()),
+            'range_copy_min_mb': int(self.range_min_var.get()),
+            'pack_small_files': self.pack_var.get(),
+            'pack_max_kb': int(self.pack_max_var.get()),
+            'pack_compression': self.pack_compression_var.get(),
             'source': self.source_var.get(),
             'destination': self.dest_var.get(),
             'interval': int(self.interval_var.get()),
@@ -1177,7 +2097,10 @@ class NASyncApp:
             'include': self.include_var.get(),
             'exclude': self.exclude_var.get(),
             'verify': self.verify_var.get(),
+            'verify_policy': self.verify_policy_var.get(),
             'subfolders': self.subfolders_var.get(),
+            'transfer_order': self.transfer_order_var.get(),
+            'priority_patterns': self.priority_patterns_var.get(),
             'bandwidth_limit': self.bandwidth_limit_var.get(),
             'bandwidth_value': int(self.bandwidth_value_var.get()) if self.bandwidth_limit_var.get() else None,
             'retention_enabled': self.retention_enabled_var.get(),
@@ -1189,8 +2112,12 @@ class NASyncApp:
             'email_password': self.email_password_var.get(),
             'notifications': self.notifications_var.get(),
             'scheduled_sync': self.scheduled_sync_var.get(),
-            'schedule_times': self.schedule_times_var.get()
-        }
+            'schedule_times': self.schedule_times_var.get(),
+            'schedule_jitter': int(self.schedule_jitter_var.get()),
+            'catch_up': self.catch_up_var.get(),
+            'profile_mode': self.profile_mode_var.get(),
+            'profile_keep': int(self.profile_keep_var.get())
+        })
 
     def save_config(self):
         config = self.get_current_config()
@@ -1201,6 +2128,8 @@ class NASyncApp:
     def load_config(self):
         config = self.config_manager.load_config()
         if config:
+            self.history_manager.max_history_entries = max(
+                1, int(config.get('history_max_entries') or self.history_manager.max_history_entries))
             self.source_var.set(config.get('source', ''))
             self.dest_var.set(config.get('destination', ''))
             self.interval_var.set(str(config.get('interval', 30)))
@@ -1208,7 +2137,10 @@ class NASyncApp:
             self.include_var.set(config.get('include', '*'))
             self.exclude_var.set(config.get('exclude', '*.tmp,~*,.DS_Store,Thumbs.db'))
             self.verify_var.set(config.get('verify', True))
+            self.verify_policy_var.set(config.get('verify_policy', DEFAULT_VERIFY_POLICY))
             self.subfolders_var.set(config.get('subfolders', True))
+            self.transfer_order_var.set(config.get('transfer_order', 'scan'))
+            self.priority_patterns_var.set(config.get('priority_patterns', ''))
             self.bandwidth_limit_var.set(config.get('bandwidth_limit', False))
             self.bandwidth_value_var.set(str(config.get('bandwidth_value', 10)))
             self.retention_enabled_var.set(config.get('retention_enabled', False))
@@ -1221,14 +2153,41 @@ class NASyncApp:
             self.notifications_var.set(config.get('notifications', False))
             self.scheduled_sync_var.set(config.get('scheduled_sync', False))
             self.schedule_times_var.set(config.get('schedule_times', '09:00,18:00'))
+            self.schedule_jitter_var.set(str(config.get('schedule_jitter', 60)))
+            self.catch_up_var.set(config.get('catch_up', 'once'))
+            self.profile_mode_var.set(config.get('profile_mode', 'off'))
+            self.profile_keep_var.set(str(config.get('profile_keep', 10)))
+            self.max_parallel_jobs_var.set(str(config.get('max_parallel_jobs', 2)))
+            self.device_concurrency_var.set(str(config.get('device_concurrency', 2)))
+            self.listing_cache_var.set(config.get('listing_cache', 'on'))
+            self.scan_threads_var.set(str(config.get('scan_threads', 8)))
+            self.resume_var.set(config.get('resume_interrupted', True))
+            self.copy_buffer_var.set(str(config.get('copy_buffer_kb', 1024)))
+            self.auto_tune_var.set(config.get('auto_tune', True))
+            self.max_transfers_var.set(str(config.get('max_transfer_workers', 8)))
+            self.transfer_workers_var.set(str(config.get('transfer_workers', 2)))
+            self.range_streams_var.set(str(config.get('range_copy_streams', 0)))
+            self.range_min_var.set(str(config.get('range_copy_min_mb', 512)))
+            self.pack_var.set(config.get('pack_small_files', False))
+            self.pack_max_var.set(str(config.get('pack_max_kb', 128)))
+            self.pack_compression_var.set(config.get('pack_compression', 'none'))
             self.log("Configuration loaded", "INFO")
 
             self.toggle_bandwidth()
             self.toggle_retention()
 
+        # Keep the keys the tab edits plus any other overrides set in config.json
+        config = config or {}
+        form_keys = list(self.job_form())
+        self.jobs = []
+        for raw, job in zip(config.get('jobs') or [{}], get_jobs(config)):
+            keys = form_keys + [key for key in raw if key not in form_keys]
+            self.jobs.append({key: job[key] for key in keys if key in job})
+        self.show_job(self.jobs[0])
+
     def on_closing(self):
         """Handle window close event"""
-        if self.minimize_to_tray and self.tray_icon and TRAY_AVAILABLE:
+        if self.minimize_to_tray and self.tray_icon:
             self.root.withdraw()
             if self.tray_icon:
                 self.tray_icon.show_notification(
@@ -1256,9 +2215,37 @@ class NASyncApp:
         sys.exit(0)
 
 def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="NAS Sync Manager")
+    parser.add_argument('--profile', choices=PROFILE_MODES,
+                        help="Profile every sync run (overrides config and NASSYNC_PROFILE)")
+    parser.add_argument('--startup-timing', action='store_true',
+                        help="Print time-to-first-paint checkpoints and the slowest imports")
+    args = parser.parse_args()
+
+    timer = None
+    if args.startup_timing:
+        from startup_timing import StartupTimer
+        timer = StartupTimer(STARTUP_STARTED)
+        timer.mark("imports done")
 
     root = tk.Tk()
-    app = NASyncApp(root)
+    app = NASyncApp(root, profile_override=args.profile, startup_timer=timer)
+
+    if timer:
+        def first_paint():
+            timer.mark("first paint")
+            if IMPORT_TIMER:
+                IMPORT_TIMER.uninstall()
+            report = timer.report(IMPORT_TIMER)
+            print(report)
+            for line in report.splitlines():
+                app.log(line, "INFO")
+
+        # Idle callbacks run after Tk has drawn the pending widgets
+        root.after_idle(lambda: root.after_idle(first_paint))
+
     root.mainloop()
 
 if __name__ == "__main__":
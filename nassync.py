@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+NAS Sync - Headless command line interface
+
+Runs the sync engine with the settings saved by the GUI, without importing
+tkinter or any other GUI module. Suitable for cron and systemd.
+
+Usage:
+  python nassync.py run [--json] [--quiet]       one-shot sync of all enabled jobs
+  python nassync.py run --job Photos             sync selected jobs only
+  python nassync.py run --order newest           copy the most recent changes first
+  python nassync.py daemon [--cron EXPR]         sync on a schedule until stopped
+  python nassync.py history [--limit N]          show recent runs
+  python nassync.py ledger largest --days 7      query the per-file ledger
+  python nassync.py probe [PATH] [--refresh]     show destination capabilities
+  python nassync.py bench [PATH] [--size-mb N]   measure NAS throughput and latency
+  python nassync.py pack list '*.py'             list packed small files
+  python nassync.py pack restore --target DIR    restore packed files without a sync
+
+Exit codes:
+  0  sync completed without errors
+  1  sync completed but some files failed
+  2  configuration or usage error
+  3  sync aborted by an unexpected error
+  130 interrupted (Ctrl+C / SIGTERM) before completion
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+from config_manager import ConfigManager, get_jobs
+from transfer_order import ORDERS
+
+
+EXIT_OK = 0
+EXIT_SYNC_ERRORS = 1
+EXIT_CONFIG_ERROR = 2
+EXIT_FAILED = 3
+EXIT_INTERRUPTED = 130
+
+LEVELS = ("INFO", "SUCCESS", "WARNING", "ERROR")
+
+
+class ConsoleLogger:
+    """Log callback for SyncEngine that writes plain lines to a stream"""
+
+    def __init__(self, stream, min_level="INFO"):
+        self.stream = stream
+        self.min_index = LEVELS.index(min_level) if min_level in LEVELS else 0
+        self._lock = threading.Lock()
+
+    def __call__(self, message, level="INFO"):
+        index = LEVELS.index(level) if level in LEVELS else 0
+        if index < self.min_index:
+            return
+
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            self.stream.write(f"[{timestamp}] [{level}] {message}\n")
+            self.stream.flush()
+
+
+class HeadlessRunner:
+    """Run sync jobs from saved settings and record them like the GUI does"""
+
+    def __init__(self, config, log, profile_override=None, jobs=None):
+        self.config = config
+        self.log = log
+        self.profile_override = profile_override
+        self.jobs = jobs if jobs is not None else select_jobs(config)
+        self.engines = {}
+        self.scheduler = None
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def validate(self):
+        """Return an error message if the configuration cannot be synced"""
+        if not self.jobs:
+            return "No enabled jobs to run (check the jobs list or use --job/--all)"
+
+        for job in self.jobs:
+            source = job.get('source')
+            destination = job.get('destination')
+
+            if not source or not destination:
+                return (f"Job {job['name']}: source and destination must be configured "
+                        f"(run the GUI or edit config.json)")
+            if not os.path.isdir(source):
+                return f"Job {job['name']}: source folder does not exist: {source}"
+        return None
+
+    def stop(self):
+        self.stop_event.set()
+        if self.scheduler:
+            self.scheduler.stop()
+        with self._lock:
+            for engine in self.engines.values():
+                engine.stop()
+
+    def run_job(self, job, bandwidth=None):
+        """Run one job and return its result dict"""
+        from history_manager import HistoryManager
+        from profiling import resolve_profile_mode
+        from sync_engine import SyncEngine
+        from transfer_ledger import TransferLedger
+
+        config = dict(job)
+        config['profile_mode'] = resolve_profile_mode(config.get('profile_mode'),
+                                                      self.profile_override)
+
+        started = time.time()
+        engine = SyncEngine(config, self.log, lambda value: None,
+                            ledger=TransferLedger(), bandwidth=bandwidth)
+        with self._lock:
+            self.engines[job['name']] = engine
+        try:
+            result = engine.sync()
+        except Exception as e:
+            self.log(f"Sync error: {str(e)}", "ERROR")
+            result = {'success': False, 'copied': 0, 'updated': 0, 'deleted': 0,
+                      'errors': 1, 'skipped': 0, 'aborted': True}
+        finally:
+            with self._lock:
+                self.engines.pop(job['name'], None)
+
+        result['duration'] = time.time() - started
+        result['stopped'] = engine.should_stop
+
+        HistoryManager(config.get('history_max_entries')).add_entry(
+            config['source'], config['destination'], result, job=job['name'])
+        return result
+
+    def run_once(self):
+        """Run all selected jobs through the scheduler and return the combined result"""
+        from history_manager import HistoryManager
+        from job_scheduler import create_scheduler, combine_results
+
+        started = time.time()
+        durations = HistoryManager().get_expected_durations([job['name'] for job in self.jobs])
+        self.scheduler = create_scheduler(self.config, self.run_job, durations, self.log)
+        if self.stop_event.is_set():
+            self.scheduler.stop()
+
+        result = combine_results(self.scheduler.run(self.jobs))
+        result['duration'] = time.time() - started
+        if self.stop_event.is_set():
+            result['stopped'] = True
+        self.scheduler = None
+        return result
+
+
+def select_jobs(config, names=None, include_disabled=False):
+    """Pick the jobs to run: named ones, or all (enabled) jobs"""
+    jobs = get_jobs(config)
+    if names:
+        return [job for job in jobs if job['name'] in names]
+    if include_disabled:
+        return jobs
+    return [job for job in jobs if job.get('enabled', True)]
+
+
+def exit_code_for(result):
+    if result.get('stopped'):
+        return EXIT_INTERRUPTED
+    if result.get('aborted'):
+        return EXIT_FAILED
+    return EXIT_OK if result.get('success') else EXIT_SYNC_ERRORS
+
+
+def print_result(result, as_json):
+    if as_json:
+        print(json.dumps(result, indent=2, default=str))
+        return
+
+    jobs = result.get('jobs') or {}
+    if len(jobs) > 1:
+        for name, job_result in jobs.items():
+            job_status = "OK    " if job_result.get('success') else "FAILED"
+            print(f"  {name:16} {job_status}  copied {job_result.get('copied', 0)}, "
+                  f"updated {job_result.get('updated', 0)}, errors {job_result.get('errors', 0)} "
+                  f"in {job_result.get('duration', 0):.1f}s")
+
+    status = "Success" if result.get('success') else "Completed with errors"
+    print(f"{status}: copied {result.get('copied', 0)}, updated {result.get('updated', 0)}, "
+          f"deleted {result.get('deleted', 0)}, skipped {result.get('skipped', 0)}, "
+          f"errors {result.get('errors', 0)} in {result.get('duration', 0):.1f}s")
+
+
+def install_signal_handlers(runner, scheduler=None):
+    def handle(signum, frame):
+        runner.log(f"Received signal {signum}, stopping...", "WARNING")
+        if scheduler:
+            scheduler.stop()
+        runner.stop()
+
+    signal.signal(signal.SIGINT, handle)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, handle)
+
+
+def load_runner(args, log):
+    config = ConfigManager(args.config).load_config_with_defaults()
+    jobs = select_jobs(config, getattr(args, 'job', None), getattr(args, 'all', False))
+
+    for job in jobs:
+        if getattr(args, 'source', None):
+            job['source'] = args.source
+        if getattr(args, 'destination', None):
+            job['destination'] = args.destination
+        if getattr(args, 'order', None):
+            job['transfer_order'] = args.order
+        if getattr(args, 'fresh', False):
+            job['resume_interrupted'] = False
+
+    runner = HeadlessRunner(config, log, profile_override=getattr(args, 'profile', None),
+                            jobs=jobs)
+
+    unknown = set(getattr(args, 'job', None) or ()) - {job['name'] for job in jobs}
+    if unknown:
+        runner.jobs = []
+        log(f"Unknown job(s): {', '.join(sorted(unknown))}", "ERROR")
+    return runner
+
+
+def cmd_run(args):
+    log = ConsoleLogger(sys.stderr if args.json else sys.stdout,
+                        "WARNING" if args.quiet else "INFO")
+    runner = load_runner(args, log)
+
+    error = runner.validate()
+    if error:
+        log(error, "ERROR")
+        return EXIT_CONFIG_ERROR
+
+    install_signal_handlers(runner)
+    result = runner.run_once()
+    print_result(result, args.json)
+    return exit_code_for(result)
+
+
+def cmd_daemon(args):
+    log = ConsoleLogger(sys.stdout, "WARNING" if args.quiet else "INFO")
+    runner = load_runner(args, log)
+
+    error = runner.validate()
+    if error:
+        log(error, "ERROR")
+        return EXIT_CONFIG_ERROR
+
+    from cron_scheduler import CronScheduler, IntervalTrigger, parse_schedule, schedule_from_config
+
+    try:
+        if args.cron:
+            trigger, run_now = parse_schedule(args.cron), False
+        elif args.interval:
+            trigger, run_now = IntervalTrigger(args.interval * 60), True
+        else:
+            trigger, run_now = schedule_from_config(runner.config)
+    except ValueError as e:
+        log(f"Invalid schedule: {e}", "ERROR")
+        return EXIT_CONFIG_ERROR
+
+    jitter = args.jitter if args.jitter is not None else runner.config.get('schedule_jitter', 60)
+    scheduler = CronScheduler(log, jitter=jitter, catch_up=runner.config.get('catch_up', 'once'))
+    install_signal_handlers(runner, scheduler)
+
+    state = {'code': EXIT_OK}
+
+    def sync():
+        result = runner.run_once()
+        print_result(result, args.json)
+        state['code'] = exit_code_for(result)
+
+    log(f"Daemon started, syncing {trigger}", "INFO")
+    scheduler.add('sync', trigger, sync, run_now=run_now)
+    scheduler.run()
+    scheduler.join()
+
+    log("Daemon stopped", "INFO")
+    return EXIT_OK if state['code'] == EXIT_INTERRUPTED else state['code']
+
+
+def cmd_jobs(args):
+    from history_manager import HistoryManager
+    from job_scheduler import device_key
+
+    config = ConfigManager(args.config).load_config_with_defaults()
+    jobs = get_jobs(config)
+    durations = HistoryManager().get_expected_durations([job['name'] for job in jobs])
+
+    for job in jobs:
+        state = "enabled " if job.get('enabled', True) else "disabled"
+        expected = durations.get(job['name'])
+        expected = f"~{expected:.0f}s" if expected is not None else "new"
+        print(f"{job['name']:16} {state}  {job.get('priority', 'normal'):6}  {expected:>7}  "
+              f"{job.get('source')} -> {job.get('destination')} [{device_key(job.get('destination') or '.')}]")
+    return EXIT_OK
+
+
+def cmd_history(args):
+    from history_manager import HistoryManager
+
+    entries = HistoryManager().get_page(limit=args.limit, job=args.job)
+    if args.json:
+        print(json.dumps(entries, indent=2, default=str))
+        return EXIT_OK
+
+    for entry in entries:
+        status = "OK    " if entry.get('success') else "FAILED"
+        print(f"{entry['timestamp'][:19].replace('T', ' ')}  {status}  "
+              f"{entry.get('job', 'default'):12}  copied {entry.get('copied', 0):6}  "
+              f"updated {entry.get('updated', 0):6}  deleted {entry.get('deleted', 0):6}  "
+              f"errors {entry.get('errors', 0):4}  {entry.get('duration', 0):8.1f}s")
+    return EXIT_OK
+
+
+def cmd_ledger(args):
+    from transfer_ledger import run_cli
+    return run_cli(args)
+
+
+def cmd_probe(args):
+    from fs_probe import choose_strategy, describe, get_capabilities
+
+    if args.paths:
+        paths = args.paths
+    else:
+        config = ConfigManager(args.config).load_config_with_defaults()
+        paths = sorted({job['destination'] for job in get_jobs(config)
+                        if job.get('destination')})
+    if not paths:
+        print("No destination configured; pass a path", file=sys.stderr)
+        return EXIT_CONFIG_ERROR
+
+    log = ConsoleLogger(sys.stderr, "WARNING")
+    results = {}
+    for path in paths:
+        capabilities = get_capabilities(path, refresh=args.refresh, log=log)
+        if capabilities:
+            results[path] = dict(capabilities, strategy=choose_strategy(capabilities))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for path, capabilities in results.items():
+            strategy = capabilities['strategy']
+            print(f"{path}\n  {describe(capabilities)}\n"
+                  f"  probed {capabilities['probed_at']}; mtime tolerance "
+                  f"{strategy['mtime_tolerance']:g}s, temp files {strategy['temp_files']}, "
+                  f"case folding {'on' if strategy['case_fold'] else 'off'}, "
+                  f"dedup {strategy['dedup']}")
+    return EXIT_OK if len(results) == len(paths) else EXIT_SYNC_ERRORS
+
+
+def cmd_bench(args):
+    from nas_benchmark import BenchmarkStopped, run_benchmark, summarize
+
+    path = args.path
+    if not path:
+        config = ConfigManager(args.config).load_config_with_defaults()
+        jobs = select_jobs(config)
+        path = jobs[0].get('destination') if jobs else None
+    if not path:
+        print("No destination configured; pass a path", file=sys.stderr)
+        return EXIT_CONFIG_ERROR
+
+    log = ConsoleLogger(sys.stderr, "INFO" if not args.json else "WARNING")
+    try:
+        result = run_benchmark(path, args.size_mb, log=log, save=not args.no_save)
+    except BenchmarkStopped:
+        return EXIT_INTERRUPTED
+    except OSError as e:
+        log(f"Benchmark failed: {e}", "ERROR")
+        return EXIT_FAILED
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['path']} ({result['duration']:g}s)")
+        print(summarize(result))
+        for warning in result['warnings']:
+            print(f"WARNING: {warning}")
+    return EXIT_SYNC_ERRORS if result['warnings'] else EXIT_OK
+
+
+def cmd_pack(args):
+    from pack_store import run_cli
+
+    destination = args.destination
+    if not destination:
+        config = ConfigManager(args.config).load_config_with_defaults()
+        jobs = select_jobs(config)
+        destination = jobs[0].get('destination') if jobs else None
+    if not destination:
+        print("No destination configured; pass --destination", file=sys.stderr)
+        return EXIT_CONFIG_ERROR
+
+    return run_cli(args, destination, log=ConsoleLogger(sys.stderr, "WARNING"))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='nassync', description="NAS Sync headless command line")
+    parser.add_argument('--config', help="Path to config.json (default: ~/.nassync/config.json)")
+    subparsers = parser.add_subparsers(dest='command')
+
+    def add_sync_options(sub):
+        sub.add_argument('--job', action='append', metavar='NAME',
+                         help="Run only this job (repeatable; default: all enabled jobs)")
+        sub.add_argument('--all', action='store_true', help="Also run disabled jobs")
+        sub.add_argument('--source', help="Override the source folder of the selected jobs")
+        sub.add_argument('--destination', help="Override the destination of the selected jobs")
+        sub.add_argument('--order', choices=ORDERS,
+                         help="Order of new and changed files (default: from the config)")
+        sub.add_argument('--fresh', action='store_true',
+                         help="Scan everything instead of resuming an interrupted run")
+        sub.add_argument('--json', action='store_true', help="Print the result as JSON")
+        sub.add_argument('--quiet', action='store_true', help="Only log warnings and errors")
+        sub.add_argument('--profile', choices=('off', 'cpu', 'memory', 'both'),
+                         help="Profile the sync run (see ~/.nassync/profiles/)")
+
+    run_parser = subparsers.add_parser('run', help="Run one sync and exit")
+    add_sync_options(run_parser)
+    run_parser.set_defaults(func=cmd_run)
+
+    daemon_parser = subparsers.add_parser('daemon', help="Sync repeatedly until stopped")
+    add_sync_options(daemon_parser)
+    daemon_parser.add_argument('--interval', type=int,
+                               help="Minutes between syncs (default: configured schedule)")
+    daemon_parser.add_argument('--cron', metavar='EXPR',
+                               help="Cron expression or daily times, e.g. '0 2 * * *' or 09:00,18:00")
+    daemon_parser.add_argument('--jitter', type=int, metavar='SECONDS',
+                               help="Random delay added to each run (default: configured)")
+    daemon_parser.set_defaults(func=cmd_daemon)
+
+    jobs_parser = subparsers.add_parser('jobs', help="List the configured jobs")
+    jobs_parser.set_defaults(func=cmd_jobs)
+
+    history_parser = subparsers.add_parser('history', help="Show recent sync runs")
+    history_parser.add_argument('--limit', type=int, default=20, help="Number of runs to show")
+    history_parser.add_argument('--job', help="Only show runs of this job")
+    history_parser.add_argument('--json', action='store_true', help="Print entries as JSON")
+    history_parser.set_defaults(func=cmd_history)
+
+    from transfer_ledger import add_arguments as add_ledger_arguments
+
+    ledger_parser = subparsers.add_parser('ledger', help="Query the per-file transfer ledger")
+    add_ledger_arguments(ledger_parser)
+    ledger_parser.set_defaults(func=cmd_ledger)
+
+    probe_parser = subparsers.add_parser('probe', help="Probe destination file systems")
+    probe_parser.add_argument('paths', nargs='*', metavar='PATH',
+                              help="Destination folders (default: all job destinations)")
+    probe_parser.add_argument('--refresh', action='store_true',
+                              help="Probe again instead of using cached results")
+    probe_parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    probe_parser.set_defaults(func=cmd_probe)
+
+    bench_parser = subparsers.add_parser('bench', help="Benchmark a NAS path")
+    bench_parser.add_argument('path', nargs='?', metavar='PATH',
+                              help="Folder to test (default: first enabled job's destination)")
+    bench_parser.add_argument('--size-mb', type=int, default=64,
+                              help="Size of the sequential test file per block size")
+    bench_parser.add_argument('--no-save', action='store_true',
+                              help="Do not add the result to the benchmark history")
+    bench_parser.add_argument('--json', action='store_true', help="Print the result as JSON")
+    bench_parser.set_defaults(func=cmd_bench)
+
+    from pack_store import add_arguments as add_pack_arguments
+
+    pack_parser = subparsers.add_parser('pack', help="List or restore packed small files")
+    add_pack_arguments(pack_parser)
+    pack_parser.set_defaults(func=cmd_pack)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        return EXIT_CONFIG_ERROR
+
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,619 @@
+"""
+NAS Sync - Pack files for small files
+
+Over SMB every file costs several round trips (create, write, set times,
+close), so a million small files (source trees, thumbnails, mail) copy at
+a few hundred KB/s however fast the link is. With packing on, files up to
+a size limit are appended to large pack files in .nassync_packs/ on the
+destination instead, in long sequential writes:
+
+  pack-000001.pack  records of a magic number, header length, JSON header
+                    (path, size, mtime, compression, length, CRC-32) and
+                    the data, stored as is or zlib/lzma compressed
+  index.jsonl.gz    the remote index: where the latest copy of each file is
+
+A changed file is appended again and its old record becomes dead space.
+Packs that are mostly dead space are compacted: their live records move
+to the current pack and the old pack is removed.
+
+The sync reads and updates a local copy of the index, an SQLite file in
+~/.nassync/packs/, committed with each pack write. The remote index is
+written at the end of the run (the local one is rebuilt from it when it is
+missing or older), so packed files can be listed and restored on another
+computer. Listing needs only the index; restoring reads just the records
+it needs, without unpacking anything else.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import sqlite3
+import struct
+import sys
+import time
+import zlib
+from datetime import datetime
+from fnmatch import fnmatch
+from pathlib import Path
+
+
+PACK_DIR = '.nassync_packs'
+INDEX_NAME = 'index.jsonl.gz'
+PACK_VERSION = 1
+
+COMPRESSIONS = ('none', 'zlib', 'lzma')
+
+RECORD_MAGIC = b'NSP1'
+_RECORD = struct.Struct('<4sI')     # magic, header length
+
+PACK_SIZE = 256 * 1024 * 1024
+WRITE_BUFFER = 4 * 1024 * 1024
+
+# Packs with at least this share of dead space are compacted
+COMPACT_RATIO = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS packs (
+    id INTEGER PRIMARY KEY,
+    size INTEGER NOT NULL,
+    dead INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    pack INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    record INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    compression TEXT NOT NULL,
+    crc INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_pack ON entries(pack);
+CREATE TEMP TABLE IF NOT EXISTS seen (path TEXT PRIMARY KEY);
+"""
+
+# offset and length locate the stored data, record is the whole record
+ENTRY_COLUMNS = ('path', 'pack', 'offset', 'length', 'record', 'size', 'mtime',
+                 'compression', 'crc')
+_INSERT_ENTRY = (f"INSERT OR REPLACE INTO entries ({', '.join(ENTRY_COLUMNS)}) "
+                 f"VALUES ({', '.join('?' * len(ENTRY_COLUMNS))})")
+
+
+def compress(data, method):
+    if method == 'zlib':
+        return zlib.compress(data, 6)
+    if method == 'lzma':
+        return lzma.compress(data)
+    return data
+
+
+def decompress(data, method):
+    if method == 'zlib':
+        return zlib.decompress(data)
+    if method == 'lzma':
+        return lzma.decompress(data)
+    return data
+
+
+def pack_path(rel_path):
+    """Index key of a relative path: '/' separators on every platform"""
+    return rel_path.replace(os.sep, '/')
+
+
+class PackStore:
+    """Pack files and index of one destination
+
+    Only one thread uses it (the sync thread, or the command line).
+    """
+
+    def __init__(self, destination, compression='none', pack_size=PACK_SIZE,
+                 index_dir=None, log=None):
+        self.destination = Path(destination)
+        self.pack_dir = self.destination / PACK_DIR
+        self.remote_index = self.pack_dir / INDEX_NAME
+        self.compression = compression if compression in COMPRESSIONS else 'none'
+        self.pack_size = pack_size
+        self.log = log or (lambda message, level="INFO": None)
+
+        index_dir = Path(index_dir) if index_dir else Path.home() / '.nassync' / 'packs'
+        key = os.path.normcase(os.path.abspath(str(destination)))
+        self.index_file = index_dir / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.db"
+
+        self.conn = None
+        self.generation = 0
+        self.dirty = False      # changed since the remote index was written
+        self._touched = False   # generation already raised by this run
+
+        self._pack_id = None
+        self._pack_file = None
+        self._pack_end = 0      # bytes on disk in the current pack
+        self._buffer = bytearray()
+        self._rows = []         # index rows of the records in the buffer
+        self._checks = []       # per row: read back after writing (verify mode)
+        self._seen = []
+        self.failed = []        # paths whose record did not read back intact
+
+    # Index
+
+    def open(self):
+        """Open the local index, reloading it from the NAS when that copy is newer"""
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.index_file), timeout=30)
+        self.conn.executescript(SCHEMA)
+
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        local = int(row[0]) if row else None
+        header = self._remote_header()
+        remote = header['generation'] if header else None
+
+        if remote is not None and (local is None or remote > local):
+            self._load_remote()
+        elif local is not None and remote is None and not self._pack_files():
+            # The packs were removed from the NAS: start over
+            with self.conn:
+                self.conn.execute("DELETE FROM entries")
+                self.conn.execute("DELETE FROM packs")
+                self.conn.execute("DELETE FROM meta")
+            local = None
+        elif local is not None and (remote is None or local > remote):
+            self.dirty = True   # the last run could not write the remote index
+        self.generation = max(local or 0, remote or 0)
+        return self
+
+    def _remote_header(self):
+        try:
+            with gzip.open(self.remote_index, 'rt', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.log(f"Pack index on the NAS is unreadable: {e}", "WARNING")
+            return None
+        if header.get('version') != PACK_VERSION:
+            self.log(f"Pack index on the NAS has unknown version {header.get('version')}",
+                     "WARNING")
+            return None
+        return header
+
+    def _load_remote(self):
+        with gzip.open(self.remote_index, 'rt', encoding='utf-8') as f, self.conn:
+            header = json.loads(f.readline())
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("DELETE FROM packs")
+            self.conn.executemany("INSERT INTO packs (id, size, dead) VALUES (?, ?, ?)",
+                                  header['packs'])
+            batch = []
+            for line in f:
+                batch.append(json.loads(line))
+                if len(batch) >= 5000:
+                    self.conn.executemany(_INSERT_ENTRY, batch)
+                    batch = []
+            self.conn.executemany(_INSERT_ENTRY, batch)
+            self._set_generation(header['generation'])
+        self.log(f"Pack index loaded from the NAS: {header['files']} files", "INFO")
+
+    def _set_generation(self, generation):
+        self.generation = generation
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)",
+                          (str(generation),))
+
+    def _touch(self):
+        """Called in each transaction that changes the index"""
+        self.dirty = True
+        if not self._touched:
+            self._touched = True
+            self._set_generation(self.generation + 1)
+
+    def write_remote_index(self):
+        """Replace the index on the NAS with the local one"""
+        packs = self.conn.execute("SELECT id, size, dead FROM packs ORDER BY id").fetchall()
+        files = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        header = {
+            'version': PACK_VERSION,
+            'generation': self.generation,
+            'written': datetime.now().isoformat(timespec='seconds'),
+            'files': files,
+            'packs': packs,
+        }
+        temp_file = self.remote_index.with_name(INDEX_NAME + '.tmp')
+        self.pack_dir.mkdir(parents=True, exist_ok=True)
+        with gzip.open(temp_file, 'wt', encoding='utf-8', compresslevel=6) as f:
+            f.write(json.dumps(header, separators=(',', ':')) + '\n')
+            rows = self.conn.execute(f"SELECT {', '.join(ENTRY_COLUMNS)} FROM entries")
+            for row in rows:
+                f.write(json.dumps(row, separators=(',', ':')) + '\n')
+        os.replace(temp_file, self.remote_index)
+        self.dirty = False
+
+    def lookup(self, rel_path):
+        """(size, mtime, crc) of the packed copy of a file, or None"""
+        return self.conn.execute("SELECT size, mtime, crc FROM entries WHERE path = ?",
+                                 (pack_path(rel_path),)).fetchone()
+
+    def _drop(self, where, args=()):
+        """Remove entries, their records becoming dead space; returns their paths"""
+        self.flush()
+        with self.conn:
+            paths = [row[0] for row in
+                     self.conn.execute(f"SELECT path FROM entries WHERE {where}", args)]
+            if not paths:
+                return []
+            self._touch()
+            dead = self.conn.execute(f"SELECT pack, SUM(record) FROM entries WHERE {where} "
+                                     f"GROUP BY pack", args).fetchall()
+            self.conn.executemany("UPDATE packs SET dead = dead + ? WHERE id = ?",
+                                  [(record, pack) for pack, record in dead])
+            self.conn.execute(f"DELETE FROM entries WHERE {where}", args)
+        return paths
+
+    def remove(self, rel_path):
+        """Forget a packed file; True if there was one"""
+        return bool(self._drop("path = ?", (pack_path(rel_path),)))
+
+    def keep(self, rel_path):
+        """Mark a file as still in the source, for remove_unseen()"""
+        self._seen.append((pack_path(rel_path),))
+        if len(self._seen) >= 5000:
+            self._flush_seen()
+
+    def _flush_seen(self):
+        self.conn.executemany("INSERT OR IGNORE INTO seen (path) VALUES (?)", self._seen)
+        self._seen = []
+
+    def remove_unseen(self):
+        """Forget the files keep() was not called for (mirror mode); returns their paths"""
+        self._flush_seen()
+        paths = self._drop("path NOT IN (SELECT path FROM seen)")
+        self.conn.execute("DELETE FROM seen")
+        return paths
+
+    def remove_older(self, cutoff):
+        """Forget files modified before cutoff (retention policy); returns their paths"""
+        return self._drop("mtime < ?", (cutoff,))
+
+    def entries(self, patterns=()):
+        """Index rows as dicts, by path; patterns match the path or the name"""
+        rows = self.conn.execute(f"SELECT {', '.join(ENTRY_COLUMNS)} FROM entries ORDER BY path")
+        for row in rows:
+            entry = dict(zip(ENTRY_COLUMNS, row))
+            if patterns and not any(fnmatch(entry['path'] if '/' in pattern else
+                                            entry['path'].rsplit('/', 1)[-1], pattern)
+                                    for pattern in patterns):
+                continue
+            yield entry
+
+    def summary(self):
+        files, data = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        packs, size, dead = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(dead), 0) FROM packs"
+        ).fetchone()
+        share = dead / size * 100 if size else 0
+        return (f"{files} files ({data / (1024 * 1024):.1f} MB) in {packs} packs of "
+                f"{size / (1024 * 1024):.1f} MB, {share:.0f}% dead space")
+
+    # Packs
+
+    def _pack_name(self, pack_id):
+        return self.pack_dir / f"pack-{pack_id:06d}.pack"
+
+    def _pack_files(self):
+        try:
+            return sorted(path for path in os.listdir(self.pack_dir)
+                          if path.startswith('pack-') and path.endswith('.pack'))
+        except OSError:
+            return []
+
+    def _open_pack(self):
+        """Continue the last pack, or start the next one when it is full"""
+        row = self.conn.execute("SELECT id, size FROM packs ORDER BY id DESC LIMIT 1").fetchone()
+        self.pack_dir.mkdir(parents=True, exist_ok=True)
+        if row and row[1] < self.pack_size:
+            pack_id, size = row
+            try:
+                f = open(self._pack_name(pack_id), 'r+b')
+                # Drop what a cut-off run wrote after the last indexed record
+                f.truncate(size)
+                f.seek(size)
+                self._pack_id, self._pack_file, self._pack_end = pack_id, f, size
+                return
+            except FileNotFoundError:
+                pass
+        # After every pack on the NAS, indexed or not
+        on_disk = [int(name[5:-5]) for name in self._pack_files() if name[5:-5].isdigit()]
+        pack_id = max([row[0] if row else 0] + on_disk) + 1
+        self._pack_id, self._pack_file, self._pack_end = \
+            pack_id, open(self._pack_name(pack_id), 'w+b'), 0
+
+    def _close_pack(self):
+        if self._pack_file:
+            self._pack_file.close()
+        self._pack_id = self._pack_file = None
+
+    def add(self, rel_path, source_path, verify=False):
+        """Append a file to the current pack; returns the bytes added to it
+
+        verify reads the record back once its batch is written; records that
+        do not match are left out of the index and listed in failed.
+        """
+        with open(source_path, 'rb') as f:
+            data = f.read()
+            mtime = os.fstat(f.fileno()).st_mtime
+
+        method = self.compression
+        stored = compress(data, method)
+        if len(stored) >= len(data):
+            method, stored = 'none', data    # incompressible (photos, archives)
+        return self._append(pack_path(rel_path), len(data), mtime, method,
+                            zlib.crc32(data), stored, verify)
+
+    def _append(self, path, size, mtime, method, crc, stored, verify=False):
+        if self._pack_file is None:
+            self._open_pack()
+        elif self._pack_end + len(self._buffer) >= self.pack_size:
+            self.flush()
+            self._close_pack()
+            self._open_pack()
+
+        header = json.dumps({'path': path, 'size': size, 'mtime': mtime,
+                             'compression': method, 'length': len(stored), 'crc': crc},
+                            separators=(',', ':')).encode('utf-8')
+        start = self._pack_end + len(self._buffer)
+        self._buffer += _RECORD.pack(RECORD_MAGIC, len(header))
+        self._buffer += header
+        offset = self._pack_end + len(self._buffer)
+        self._buffer += stored
+        record = self._pack_end + len(self._buffer) - start
+        self._rows.append((path, self._pack_id, offset, len(stored), record, size, mtime,
+                           method, crc))
+        self._checks.append(verify)
+
+        if len(self._buffer) >= WRITE_BUFFER:
+            self.flush()
+        return record
+
+    def flush(self):
+        """Write the buffered records, then index them"""
+        if not self._rows:
+            return
+        f = self._pack_file
+        rows, self._rows = self._rows, []
+        checks, self._checks = self._checks, []
+        buffer, self._buffer = self._buffer, bytearray()
+        start = self._pack_end
+        try:
+            f.write(buffer)
+            f.flush()
+            os.fsync(f.fileno())
+        except OSError:
+            # Back to the last indexed record; the files are packed again next run
+            try:
+                f.seek(self._pack_end)
+                f.truncate()
+            except OSError:
+                pass
+            raise
+        self._pack_end += len(buffer)
+
+        # Indexed only once the data is on the NAS: a cut-off run loses no packed file
+        with self.conn:
+            self._touch()
+            self.conn.execute("INSERT OR IGNORE INTO packs (id, size) VALUES (?, 0)",
+                              (self._pack_id,))
+            for row in rows:
+                old = self.conn.execute("SELECT pack, record FROM entries WHERE path = ?",
+                                        (row[0],)).fetchone()
+                if old:
+                    self.conn.execute("UPDATE packs SET dead = dead + ? WHERE id = ?",
+                                      (old[1], old[0]))
+                self.conn.execute(_INSERT_ENTRY, row)
+            self.conn.execute("UPDATE packs SET size = ? WHERE id = ?",
+                              (self._pack_end, self._pack_id))
+
+        if any(checks):
+            self._check_written(start, [row for row, check in zip(rows, checks) if check])
+
+    def _check_written(self, start, rows):
+        """Read a written batch back in one go and compare each record's checksum"""
+        f = self._pack_file
+        f.seek(start)
+        written = f.read(self._pack_end - start)
+        f.seek(self._pack_end)
+
+        failed = []
+        for path, _, offset, length, _, size, _, method, crc in rows:
+            stored = written[offset - start:offset - start + length]
+            try:
+                intact = zlib.crc32(decompress(stored, method)) == crc
+            except (zlib.error, lzma.LZMAError):
+                intact = False
+            if not intact:
+                failed.append(path)
+
+        # Not indexed: the next run packs them again
+        for path in failed:
+            self.remove(path)
+        self.failed.extend(failed)
+
+    def take_failed(self):
+        """Paths that failed the read-back since the last call"""
+        failed, self.failed = self.failed, []
+        return failed
+
+    def read(self, entry, f=None):
+        """Contents of a packed file; f is an open handle of its pack"""
+        if f is None:
+            with open(self._pack_name(entry['pack']), 'rb') as f:
+                return self.read(entry, f)
+        f.seek(entry['offset'])
+        stored = f.read(entry['length'])
+        if len(stored) != entry['length']:
+            raise OSError(f"Pack {entry['pack']} is truncated")
+        data = decompress(stored, entry['compression'])
+        if zlib.crc32(data) != entry['crc'] or len(data) != entry['size']:
+            raise ValueError(f"Checksum mismatch in pack {entry['pack']}")
+        return data
+
+    def restore(self, target, patterns=(), should_stop=None):
+        """Write packed files under target; returns (files, bytes, errors)
+
+        Records are read in pack order, so each pack is read front to back.
+        """
+        target = Path(target)
+        entries = sorted(self.entries(patterns), key=lambda entry: (entry['pack'],
+                                                                    entry['offset']))
+        restored = size = errors = 0
+        f = open_pack = None
+        try:
+            for entry in entries:
+                if should_stop and should_stop():
+                    break
+                parts = entry['path'].split('/')
+                if '..' in parts or entry['path'].startswith('/') or ':' in parts[0]:
+                    self.log(f"Skipping unsafe path in pack index: {entry['path']}", "ERROR")
+                    errors += 1
+                    continue
+                try:
+                    if open_pack != entry['pack']:
+                        if f:
+                            f.close()
+                        f = open(self._pack_name(entry['pack']), 'rb')
+                        open_pack = entry['pack']
+                    data = self.read(entry, f)
+                    dest = target.joinpath(*parts)
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    temp = dest.with_name(f".{dest.name}.nassync-tmp")
+                    with open(temp, 'wb') as out:
+                        out.write(data)
+                    os.utime(temp, (entry['mtime'], entry['mtime']))
+                    os.replace(temp, dest)
+                    restored += 1
+                    size += len(data)
+                except (OSError, ValueError) as e:
+                    self.log(f"Error restoring {entry['path']}: {e}", "ERROR")
+                    errors += 1
+        finally:
+            if f:
+                f.close()
+        return restored, size, errors
+
+    def compact(self, ratio=COMPACT_RATIO, should_stop=None):
+        """Move the live records of mostly dead packs to the current one
+
+        Returns (packs removed, bytes freed).
+        """
+        self.flush()
+        last = self.conn.execute("SELECT MAX(id) FROM packs").fetchone()[0]
+        candidates = self.conn.execute(
+            "SELECT id, size, dead FROM packs WHERE id != ? AND dead >= size * ? "
+            "ORDER BY id", (last, ratio)).fetchall()
+
+        removed = freed = 0
+        for pack_id, size, dead in candidates:
+            if should_stop and should_stop():
+                break
+            rows = self.conn.execute(
+                f"SELECT {', '.join(ENTRY_COLUMNS)} FROM entries WHERE pack = ? ORDER BY offset",
+                (pack_id,)).fetchall()
+            moved = 0
+            if rows:
+                with open(self._pack_name(pack_id), 'rb') as f:
+                    for row in rows:
+                        f.seek(row[2])
+                        # Copied as stored: no decompressing and compressing again
+                        moved += self._append(row[0], row[5], row[6], row[7], row[8],
+                                              f.read(row[3]))
+                self.flush()
+            with self.conn:
+                self._touch()
+                self.conn.execute("DELETE FROM packs WHERE id = ?", (pack_id,))
+            try:
+                self._pack_name(pack_id).unlink()
+            except FileNotFoundError:
+                pass
+            removed += 1
+            freed += size - moved
+        return removed, freed
+
+    def close(self):
+        """Write what is buffered and, if anything changed, the remote index"""
+        if self.conn is None:
+            return
+        try:
+            self.flush()
+            self._close_pack()
+            if self.dirty:
+                self.write_remote_index()
+        finally:
+            self.conn.close()
+            self.conn = None
+
+
+def add_arguments(parser):
+    parser.add_argument('action', choices=('list', 'restore', 'compact'),
+                        help="List packed files, restore them, or compact the packs")
+    parser.add_argument('patterns', nargs='*', metavar='PATTERN',
+                        help="Only files matching these names or paths ('*.py', 'src/*')")
+    parser.add_argument('--destination', help="Sync destination holding the packs "
+                                              "(default: first enabled job's destination)")
+    parser.add_argument('--target', help="Folder to restore into (restore)")
+    parser.add_argument('--ratio', type=float, default=COMPACT_RATIO,
+                        help="Compact packs with at least this share of dead space")
+    parser.add_argument('--json', action='store_true', help="Print entries as JSON")
+
+
+def run_cli(args, destination, log=None):
+    """Run a pack command from parsed CLI arguments"""
+    if not (Path(destination) / PACK_DIR).is_dir():
+        print(f"No packs in {destination}", file=sys.stderr)
+        return 2
+
+    store = PackStore(destination, log=log).open()
+    try:
+        if args.action == 'list':
+            entries = list(store.entries(args.patterns))
+            if args.json:
+                print(json.dumps(entries, indent=2))
+                return 0
+            for entry in entries:
+                modified = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['mtime']))
+                print(f"{entry['size']:>12}  {modified}  {entry['path']}")
+            print(store.summary())
+            return 0
+
+        if args.action == 'restore':
+            if not args.target:
+                print("restore needs --target", file=sys.stderr)
+                return 2
+            restored, size, errors = store.restore(args.target, args.patterns)
+            print(f"Restored {restored} files ({size / (1024 * 1024):.1f} MB) to {args.target}"
+                  + (f", {errors} errors" if errors else ""))
+            return 1 if errors else 0
+
+        removed, freed = store.compact(args.ratio)
+        print(f"Compacted {removed} packs, {freed / (1024 * 1024):.1f} MB freed; "
+              f"{store.summary()}")
+        return 0
+    finally:
+        store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List and restore NAS Sync packed files")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    if not args.destination:
+        parser.error("--destination is required")
+    return run_cli(args, args.destination)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+PHASES = ('scan', 'compare', 'copy', 'pack', 'hash', 'delete', 'retention')
+
+
+class PhaseStats:
+    """Time, operation and byte counters for each phase of a sync run.
+
+    Time is exclusive: when a phase starts inside another one (hashing during
+    compare, for example) the outer phase's clock pauses until it ends. Work
+    done on several threads at once is summed, so phase totals can exceed the
+    wall-clock duration of the run.
+    """
+
+    def __init__(self):
+        self.phases = {name: {'seconds': 0.0, 'ops': 0, 'bytes': 0} for name in PHASES}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add_time(self, name, seconds):
+        with self._lock:
+            entry = self.phases.setdefault(name, {'seconds': 0.0, 'ops': 0, 'bytes': 0})
+            entry['seconds'] += seconds
+
+    @contextmanager
+    def phase(self, name):
+        """Attribute the time spent in the block to `name`"""
+        stack = self._stack()
+        now = time.monotonic()
+
+        if stack:
+            parent, started = stack[-1]
+            self._add_time(parent, now - started)
+
+        stack.append((name, now))
+        try:
+            yield
+        finally:
+            now = time.monotonic()
+            _, started = stack.pop()
+            self._add_time(name, now - started)
+
+            if stack:
+                stack[-1] = (stack[-1][0], now)
+
+    def count(self, name, ops=1, size=0):
+        """Add operations and bytes to a phase"""
+        with self._lock:
+            entry = self.phases.setdefault(name, {'seconds': 0.0, 'ops': 0, 'bytes': 0})
+            entry['ops'] += ops
+            entry['bytes'] += size
+
+    def as_dict(self):
+        """Snapshot of all counters, rounded for storage"""
+        with self._lock:
+            return {
+                name: {
+                    'seconds': round(entry['seconds'], 4),
+                    'ops': entry['ops'],
+                    'bytes': entry['bytes']
+                }
+                for name, entry in self.phases.items()
+            }
+
+    def summary(self):
+        """One-line description of where the time went"""
+        phases = self.as_dict()
+        parts = [f"{name} {entry['seconds']:.2f}s" for name, entry in phases.items()
+                 if entry['seconds'] >= 0.005 or entry['ops']]
+        return ", ".join(parts) if parts else "no work"
@@ -0,0 +1,133 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+
+PROFILE_MODES = ('off', 'cpu', 'memory', 'both')
+PROFILE_ENV_VAR = 'NASSYNC_PROFILE'
+
+
+def resolve_profile_mode(configured=None, override=None):
+    """Pick the profiling mode: command line, then environment, then config"""
+    for value in (override, os.environ.get(PROFILE_ENV_VAR), configured):
+        if not value:
+            continue
+
+        value = str(value).strip().lower()
+        if value in ('1', 'true', 'yes', 'on'):
+            return 'both'
+        if value in ('0', 'false', 'no'):
+            return 'off'
+        if value in PROFILE_MODES:
+            return value
+
+    return 'off'
+
+
+class SyncProfiler:
+    """Run a callable under cProfile and/or tracemalloc and keep the reports.
+
+    Each run writes `<stamp>_<label>.prof` (CPU, loadable with pstats or
+    snakeviz) and `<stamp>_<label>_memory.txt` (top allocations) into the
+    profile directory. Only the newest `keep` runs are kept.
+    """
+
+    def __init__(self, mode='both', profile_dir=None, keep=10, top_allocations=30):
+        self.mode = mode
+        self.profile_dir = Path(profile_dir) if profile_dir else Path.home() / '.nassync' / 'profiles'
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        self.keep = max(1, int(keep))
+        self.top_allocations = top_allocations
+        self.output_files = []
+
+    @property
+    def cpu(self):
+        return self.mode in ('cpu', 'both')
+
+    @property
+    def memory(self):
+        return self.mode in ('memory', 'both')
+
+    def run(self, func, label='sync'):
+        """Call func() under the profilers and return its result"""
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        base = self.profile_dir / f"{stamp}_{label}"
+        self.output_files = []
+
+        profiler = None
+        started_tracing = False
+
+        if self.memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                started_tracing = True
+
+        if self.cpu:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        try:
+            return func()
+        finally:
+            if profiler:
+                profiler.disable()
+                prof_file = base.with_suffix('.prof')
+                profiler.dump_stats(str(prof_file))
+                self.output_files.append(prof_file)
+
+            if self.memory:
+                self.output_files.append(self._write_memory_report(base, started_tracing))
+
+            self.cleanup()
+
+    def _write_memory_report(self, base, stop_tracing):
+        import tracemalloc
+
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if stop_tracing:
+            tracemalloc.stop()
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+        report_file = Path(f"{base}_memory.txt")
+        with open(report_file, 'w') as f:
+            f.write(f"Traced memory: current {current / 1024 / 1024:.1f} MB, "
+                    f"peak {peak / 1024 / 1024:.1f} MB\n")
+            f.write("=" * 80 + "\n\n")
+
+            f.write(f"Top {self.top_allocations} allocations by line\n")
+            f.write("-" * 80 + "\n")
+            for stat in snapshot.statistics('lineno')[:self.top_allocations]:
+                f.write(f"{stat}\n")
+
+            f.write(f"\nTop {self.top_allocations} allocations by call stack\n")
+            f.write("-" * 80 + "\n")
+            for stat in snapshot.statistics('traceback')[:self.top_allocations]:
+                f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                for line in stat.traceback.format():
+                    f.write(f"{line}\n")
+                f.write("\n")
+
+        return report_file
+
+    def cleanup(self):
+        """Delete all but the newest `keep` profiled runs"""
+        runs = {}
+        for path in self.profile_dir.iterdir():
+            if path.is_file() and (path.suffix == '.prof' or path.name.endswith('_memory.txt')):
+                # Files of one run share the timestamp prefix
+                stamp = '_'.join(path.name.split('_')[:3])
+                runs.setdefault(stamp, []).append(path)
+
+        for stamp in sorted(runs)[:-self.keep]:
+            for path in runs[stamp]:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
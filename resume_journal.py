@@ -0,0 +1,219 @@
+"""
+NAS Sync - Resume journal
+
+A run that is stopped, closed or cut off by sleep used to leave nothing
+behind: the next run scanned and compared everything again to find the
+files that were still missing. ResumeJournal records the work as the run
+goes, in an append-only file of JSON lines written in batches (a few
+writes per second at most, never one per file):
+
+  header   source, destination, filters and start time of the run
+  plan     new, changed and extra files found by the diff
+  done     files copied or deleted
+  cursor   last directory the diff reached (walk order)
+  complete the diff finished; the plan holds all the work of the run
+
+The next run for the same pair reads it back (load()). With a complete
+plan it only handles the files left over, without a scan. Otherwise those
+files go first and the tree is scanned again, trusting unchanged files in
+the directories the diff had already passed. A run that finishes removes
+its journal.
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+from tree_diff import CHANGED, EXTRA, NEW
+
+
+JOURNAL_VERSION = 1
+
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 2.0
+
+
+class ResumeJournal:
+    """Plan and progress of the current run for one source/destination pair
+
+    Only the sync thread writes to it.
+    """
+
+    def __init__(self, source, destination, signature='', journal_dir=None,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.source = os.path.abspath(str(source))
+        self.destination = str(destination)
+        self.signature = signature
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.journal_dir = Path(journal_dir) if journal_dir else \
+            Path.home() / '.nassync' / 'journals'
+        key = hashlib.sha1(f"{self.source}\0{destination}".encode('utf-8')).hexdigest()[:16]
+        self.journal_file = self.journal_dir / f"{key}.jsonl"
+
+        self._pending = []
+        self._count = 0
+        self._last_flush = time.monotonic()
+        self._cursor = None
+        self._written_cursor = None
+
+    def load(self):
+        """State of an interrupted run of this pair, or None
+
+        Returns {'started', 'complete', 'cursor', 'pending': [(status, rel_path)],
+        'done': count}.
+        """
+        if not self.journal_file.exists():
+            return None
+
+        header = None
+        planned = {}
+        done = set()
+        cursor = None
+        complete = False
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break   # cut off mid-line: everything before it counts
+                    kind = record.get('type')
+                    if kind == 'header':
+                        header = record
+                    elif kind == 'plan':
+                        for status, rel_path in record['items']:
+                            planned[rel_path] = status
+                    elif kind == 'done':
+                        done.update(record['items'])
+                    elif kind == 'cursor':
+                        cursor = record['dir']
+                    elif kind == 'complete':
+                        complete = True
+        except Exception as e:
+            print(f"Error loading resume journal: {e}")
+            return None
+
+        if not header or header.get('version') != JOURNAL_VERSION or \
+                header.get('source') != self.source or \
+                header.get('signature') != self.signature:
+            return None
+
+        return {
+            'started': header['started'],
+            'complete': complete,
+            'cursor': cursor,
+            'pending': [(status, rel_path) for rel_path, status in planned.items()
+                        if rel_path not in done],
+            'done': len(done),
+        }
+
+    def begin(self, plan=(), complete=False):
+        """Start the journal of a new run (replacing the previous one)
+
+        plan holds (status, rel_path) known up front, such as the files
+        an interrupted run left; complete says it is all the run will do.
+        """
+        self._pending = []
+        self._count = 0
+        self._cursor = self._written_cursor = None
+        records = [{
+            'type': 'header',
+            'version': JOURNAL_VERSION,
+            'source': self.source,
+            'destination': self.destination,
+            'signature': self.signature,
+            'started': time.time(),
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+        }]
+        plan = [list(item) for item in plan]
+        for start in range(0, len(plan), self.batch_size):
+            records.append({'type': 'plan', 'items': plan[start:start + self.batch_size]})
+        if complete:
+            records.append({'type': 'complete'})
+
+        try:
+            self.journal_dir.mkdir(parents=True, exist_ok=True)
+            temp_file = self.journal_file.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(record, separators=(',', ':')) + '\n'
+                                for record in records))
+                f.flush()
+                os.fsync(f.fileno())
+            # Replaced in one step: the previous journal stays valid until then
+            os.replace(temp_file, self.journal_file)
+        except Exception as e:
+            print(f"Error starting resume journal: {e}")
+
+    def _add(self, kind, item):
+        pending = self._pending
+        if pending and pending[-1]['type'] == kind:
+            pending[-1]['items'].append(item)
+        else:
+            pending.append({'type': kind, 'items': [item]})
+
+        self._count += 1
+        if self._count >= self.batch_size or \
+                time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def plan(self, status, rel_path):
+        self._add('plan', [status, rel_path])
+
+    def done(self, rel_path):
+        self._add('done', rel_path)
+
+    def track(self, items, walk_order=True, complete=True):
+        """Pass diff items through, recording the work they plan
+
+        walk_order items also move the cursor; complete marks the plan as
+        whole once items is exhausted.
+        """
+        for item in items:
+            status, rel_dir, name = item[:3]
+            if status in (NEW, CHANGED, EXTRA):
+                self.plan(status, os.path.join(rel_dir, name) if rel_dir else name)
+            if walk_order:
+                self._cursor = rel_dir
+            yield item
+
+        if complete:
+            self._pending.append({'type': 'complete'})
+            self.flush()
+
+    def flush(self):
+        """Append the queued records to the journal file"""
+        batch = self._pending
+        self._pending = []
+        self._count = 0
+        self._last_flush = time.monotonic()
+
+        if self._cursor != self._written_cursor:
+            # After the plan entries: a cursor only vouches for what was written before it
+            batch.append({'type': 'cursor', 'dir': self._cursor})
+            self._written_cursor = self._cursor
+        if not batch:
+            return
+
+        try:
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(record, separators=(',', ':')) + '\n'
+                                for record in batch))
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            print(f"Error writing resume journal: {e}")
+
+    def finish(self):
+        """The run completed: nothing to resume"""
+        self._pending = []
+        try:
+            self.journal_file.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error removing resume journal: {e}")
@@ -0,0 +1,72 @@
+"""
+NAS Sync - Startup timing
+
+Checkpoint timer for GUI startup plus an optional import timer in the spirit
+of `python -X importtime`. Both are only active when nas_sync_app.py is
+started with --startup-timing.
+"""
+
+import builtins
+import sys
+import time
+
+
+class ImportTimer:
+    """Measure the cumulative time of first-time top-level imports"""
+
+    def __init__(self):
+        self.timings = {}
+        self._original_import = None
+        self._depth = 0
+
+    def install(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        if self._original_import:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, *args, **kwargs):
+        # Only time imports that actually load something, and only the outermost
+        if name in sys.modules or self._depth:
+            return self._original_import(name, *args, **kwargs)
+
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, *args, **kwargs)
+        finally:
+            self._depth -= 1
+            self.timings[name] = self.timings.get(name, 0) + time.perf_counter() - started
+
+    def slowest(self, count=15):
+        return sorted(self.timings.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+class StartupTimer:
+    """Record named checkpoints relative to a start time"""
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.checkpoints = []
+
+    def mark(self, name):
+        self.checkpoints.append((name, time.perf_counter() - self.started))
+
+    def report(self, import_timer=None):
+        lines = ["Startup timing (ms since nas_sync_app import)", "-" * 48]
+        previous = 0.0
+        for name, elapsed in self.checkpoints:
+            lines.append(f"{name:28} {elapsed * 1000:8.1f}  (+{(elapsed - previous) * 1000:.1f})")
+            previous = elapsed
+
+        if import_timer and import_timer.timings:
+            lines.append("")
+            lines.append("Slowest imports (cumulative ms)")
+            lines.append("-" * 48)
+            for name, seconds in import_timer.slowest():
+                lines.append(f"{name:36} {seconds * 1000:8.1f}")
+
+        return "\n".join(lines)
@@ -1,18 +1,39 @@
 import os
+import json
 import shutil
-import hashlib
 from pathlib import Path
 from fnmatch import fnmatch
 import time
+import queue
+import threading
+import zlib
+from collections import deque
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from phase_stats import PhaseStats
+from parallel_walk import ParallelWalker, list_dir, list_dir_stat
+from file_inventory import FileInventory, TRUSTED
+from tree_diff import CHANGED, EXTRA, NEW, SAME, diff_trees, dir_key, source_groups
+from hashing import HashPool, hash_file
+from fingerprint import (DEFAULT_VERIFY_POLICY, VerifyPolicy, parse_verify_policy,
+                         sample_fingerprint)
+from auto_tune import TransferTuner, TuningStore
+from range_copy import CopyStopped, copy_ranges, range_digest
+from transfer_order import TransferOrder
+from pack_store import PACK_DIR, PackStore
 
 class SyncEngine:
-    def __init__(self, config, log_callback, progress_callback):
+    def __init__(self, config, log_callback, progress_callback, ledger=None, bandwidth=None):
         self.config = config
         self.log = log_callback
         self.update_progress = progress_callback
         self.should_stop = False
 
+        # Optional per-file transfer ledger
+        self.ledger = ledger
+        self.run_id = None
+
         self.source = Path(config['source'])
         self.destination = Path(config['destination'])
         self.mode = config['mode']
@@ -25,10 +46,101 @@ class SyncEngine:
         self.bytes_transferred = 0
         self.transfer_start_time = None
 
+        # Chunk size of copies that go through Python (bandwidth limiting)
+        self.copy_buffer = max(64, int(config.get('copy_buffer_kb', 1024))) * 1024
+
+        # Parallel transfers; auto_tune adjusts them and the buffer while copying
+        # and remembers the best settings per destination (see auto_tune.py)
+        self.auto_tune = config.get('auto_tune', True)
+        self.transfer_workers = max(1, int(config.get('transfer_workers', 2)))
+        self.max_transfer_workers = max(1, int(config.get('max_transfer_workers', 8)))
+        # Files of at least range_copy_min_mb are copied as several parallel
+        # byte ranges (see range_copy.py); fewer than 2 streams turns it off
+        self.range_streams = int(config.get('range_copy_streams', 0) or 0)
+        self.range_min_size = config.get('range_copy_min_mb', 512) * 1024 * 1024
+
+        # Order of new and changed files ('scan', 'newest', 'smallest', 'physical')
+        # with files matching priority_patterns first (see transfer_order.py)
+        try:
+            self.transfer_order = TransferOrder(config.get('transfer_order', 'scan'),
+                                                config.get('priority_patterns', ''))
+        except ValueError as e:
+            self.log(f"{str(e)}, copying in scan order", "WARNING")
+            self.transfer_order = TransferOrder('scan', config.get('priority_patterns', ''))
+
+        # Small files are appended to pack files on the destination instead of
+        # being copied one by one (see pack_store.py)
+        self.pack_small_files = config.get('pack_small_files', False)
+        self.pack_max_size = config.get('pack_max_kb', 128) * 1024
+        self.pack_compression = config.get('pack_compression', 'none')
+        self.pack_size = config.get('pack_size_mb', 256) * 1024 * 1024
+        self.pack_compact_ratio = config.get('pack_compact_ratio', 0.5)
+        self.pack_index_dir = config.get('pack_index_dir')
+        self.packs = None
+
+        self.tuning_file = config.get('tuning_file')
+        self.tuner = None
+        self.transfers = None
+        self._stats_lock = threading.Lock()
+
+        # Cleared while paused: work waits at the next chunk or file (see pause())
+        self._running = threading.Event()
+        self._running.set()
+        self._paused_at = None
+
+        # Files from this size are copied in chunks even without throttling or
+        # tuning, so a pause or stop takes effect within one chunk
+        self.chunked_copy_min = 32 * 1024 * 1024
+
+        # Budget shared with other jobs (see job_scheduler.BandwidthBudget)
+        self.bandwidth = bandwidth
+
         # Retention policy
         self.retention_enabled = config.get('retention_enabled', False)
         self.retention_days = config.get('retention_days', 30)
 
+        # Source directory listing cache ('off', 'on' or 'trust', see dir_cache.py)
+        self.listing_cache_mode = config.get('listing_cache', 'on')
+        self.listing_cache_dir = config.get('listing_cache_dir')
+        self.listing_cache = None
+
+        # Journal of each run's plan and progress: an interrupted run is resumed
+        # without a full rescan (see resume_journal.py)
+        self.resume_interrupted = config.get('resume_interrupted', True)
+        self.journal_dir = config.get('journal_dir')
+        self.journal = None
+
+        # Directories listed concurrently by scans (see parallel_walk.py, dest_index.py)
+        self.scan_threads = config.get('scan_threads', 8)
+        self.dest_index = None
+
+        # Verify-mode hashing threads, 0 = one per core (see hashing.py)
+        self.hash_workers = config.get('hash_workers', 0)
+        self.hash_pool = None
+
+        # How verify mode compares contents, per file pattern (see fingerprint.py)
+        try:
+            rules = parse_verify_policy(config.get('verify_policy', DEFAULT_VERIFY_POLICY))
+        except ValueError as e:
+            self.log(f"Ignoring verify policy: {str(e)}", "WARNING")
+            rules = []
+        self.verify_policy = VerifyPolicy(
+            rules,
+            sample_min_size=config.get('sample_min_size_mb', 64) * 1024 * 1024,
+            sample_blocks=config.get('sample_blocks', 16)
+        )
+
+        # Destination capabilities ('auto' probes once and caches, see fs_probe.py)
+        self.fs_probe = config.get('fs_probe', 'auto')
+        self.capabilities = None
+        self.mtime_tolerance = 2.0
+        self.temp_files = 'direct'
+        self.name_fold = None
+
+        # Opt-in profiling ('off', 'cpu', 'memory' or 'both')
+        self.profile_mode = config.get('profile_mode') or 'off'
+        self.profile_keep = config.get('profile_keep', 10)
+
         # Parse include/exclude patterns
         self.include_patterns = [p.strip() for p in config['include'].split(',') if p.strip()]
         self.exclude_patterns = [p.strip() for p in config['exclude'].split(',') if p.strip()]
@@ -41,13 +153,65 @@ class SyncEngine:
             'skipped': 0,
             'bytes_transferred': 0
         }
+        self.phase_stats = PhaseStats()
 
     def stop(self):
         self.should_stop = True
+        self._running.set()     # paused work wakes up to stop
+
+    def pause(self):
+        """Hold the run at the next chunk or file; resume() continues where it was
+
+        The scan results, the pending work and open transfers are kept.
+        """
+        if self._running.is_set() and not self.should_stop:
+            self._paused_at = time.monotonic()
+            self._running.clear()
+            self.log("Sync paused", "WARNING")
+
+    def resume(self):
+        if self._running.is_set():
+            return
+        paused = time.monotonic() - self._paused_at
+        with self._stats_lock:
+            # The bandwidth limit averages over copying time only
+            if self.transfer_start_time is not None:
+                self.transfer_start_time += paused
+        if self.tuner:
+            self.tuner.restart_window()
+        self._running.set()
+        self.log(f"Sync resumed after {paused:.0f}s", "INFO")
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def checkpoint(self):
+        """Wait while paused; True when the run should stop"""
+        if not self._running.is_set():
+            self._running.wait()
+        return self.should_stop
+
+    def count_stat(self, key, amount=1):
+        """Add to a run counter (called from the transfer threads too)"""
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def record_transfer(self, file_path, root, action, size=0, duration=0.0, error=None):
+        """Add a per-file entry to the transfer ledger"""
+        if not self.ledger:
+            return
+
+        try:
+            rel_path = file_path.relative_to(root)
+        except ValueError:
+            rel_path = file_path
+
+        self.ledger.record(self.run_id, rel_path, action, size, duration, error)
 
     def should_include_file(self, file_path):
         """Check if file matches include/exclude patterns"""
-        file_name = file_path.name
+        file_name = os.path.basename(file_path)
 
         # Check exclude patterns first
         for pattern in self.exclude_patterns:
@@ -67,139 +231,629 @@ class SyncEngine:
 
     def get_file_hash(self, file_path):
         """Calculate MD5 hash of a file"""
-        hash_md5 = hashlib.md5()
+        size = 0
         try:
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            with self.phase_stats.phase('hash'):
+                digest, size = hash_file(file_path)
+            return digest
         except Exception as e:
             self.log(f"Error hashing {file_path}: {e}", "ERROR")
             return None
+        finally:
+            self.phase_stats.count('hash', size=size)
 
-    def files_are_different(self, source_file, dest_file):
-        """Check if two files are different"""
-        if not dest_file.exists():
-            return True
+    def file_digest(self, file_path, policy='full'):
+        """Digest to compare under a verify policy: sampled fingerprint or full MD5"""
+        if policy != 'sample':
+            return self.get_file_hash(file_path)
+
+        size = 0
+        try:
+            with self.phase_stats.phase('hash'):
+                digest, size = sample_fingerprint(file_path, self.verify_policy.sample_blocks)
+            return digest
+        except Exception as e:
+            self.log(f"Error sampling {file_path}: {e}", "ERROR")
+            return None
+        finally:
+            self.phase_stats.count('hash', size=size)
+
+    def file_hashes(self, source_file, dest_file, policy='full', size=None):
+        """Digests of both files, computed side by side when the hash pool is running"""
+        if self.hash_pool:
+            return self.hash_pool.digests(source_file, dest_file, size, (policy,))
+        return self.file_digest(source_file, policy), self.file_digest(dest_file, policy)
+
+    def files_are_different(self, source_file, dest_file, dest_info=None, source_info=None,
+                            check_content=True):
+        """Check if two files are different
+
+        dest_info and source_info are (size, mtime) pairs when already known.
+        check_content=False leaves the verify-mode hash comparison to the caller.
+        """
+        if dest_info is None:
+            try:
+                dest_stat = dest_file.stat()
+            except FileNotFoundError:
+                return True
+            dest_info = (dest_stat.st_size, dest_stat.st_mtime)
+
+        if source_info is None:
+            source_stat = source_file.stat()
+            source_info = (source_stat.st_size, source_stat.st_mtime)
 
         # Compare file sizes first (faster)
-        if source_file.stat().st_size != dest_file.stat().st_size:
+        if source_info[0] != dest_info[0]:
             return True
 
         # Compare modification times
-        source_mtime = source_file.stat().st_mtime
-        dest_mtime = dest_file.stat().st_mtime
+        source_mtime = source_info[1]
+        dest_mtime = dest_info[1]
 
-        # If dest is older, update it
-        if dest_mtime < source_mtime - 2:  # 2 second tolerance
+        # If dest is older, update it (tolerance: what the destination can store)
+        if dest_mtime < source_mtime - self.mtime_tolerance:
             return True
 
-        # If verification is enabled, compare hashes
-        if self.verify:
-            source_hash = self.get_file_hash(source_file)
-            dest_hash = self.get_file_hash(dest_file)
+        # If verification is enabled, compare contents as the verify policy says
+        if self.verify and check_content:
+            policy = self.verify_policy.policy_for(source_file.name, source_info[0])
+            if policy == 'metadata':
+                return False
+            source_hash, dest_hash = self.file_hashes(source_file, dest_file, policy,
+                                                      source_info[0])
             return source_hash != dest_hash
 
         return False
 
     def throttle_bandwidth(self, bytes_copied):
         """Throttle bandwidth if limit is enabled"""
+        if self.bandwidth:
+            self.bandwidth.consume(bytes_copied)
+            return
+
         if not self.bandwidth_limit or not self.bandwidth_value:
             return
 
-        self.bytes_transferred += bytes_copied
+        with self._stats_lock:
+            self.bytes_transferred += bytes_copied
+            transferred = self.bytes_transferred
 
-        if self.transfer_start_time is None:
-            self.transfer_start_time = time.time()
-            return
+            if self.transfer_start_time is None:
+                self.transfer_start_time = time.time()
+                return
 
         elapsed_time = time.time() - self.transfer_start_time
         if elapsed_time <= 0:
             return
 
-        current_speed = self.bytes_transferred / elapsed_time / (1024 * 1024)
+        current_speed = transferred / elapsed_time / (1024 * 1024)
         max_speed = self.bandwidth_value
 
         if current_speed > max_speed:
-            sleep_time = (self.bytes_transferred / (max_speed * 1024 * 1024)) - elapsed_time
+            sleep_time = (transferred / (max_speed * 1024 * 1024)) - elapsed_time
             if sleep_time > 0:
                 time.sleep(sleep_time)
 
-    def copy_file(self, source_file, dest_file):
-        """Copy a single file from source to destination with bandwidth throttling"""
+    def copy_data(self, source_file, target):
+        """Copy contents in chunks, then metadata, for throttling and transfer tuning"""
+        tuner = self.tuner if self.auto_tune else None
+        buffer = bytearray(tuner.buffer_size if tuner else self.copy_buffer)
+        view = memoryview(buffer)
+
+        with open(source_file, 'rb', buffering=0) as src, open(target, 'wb') as dst:
+            while True:
+                if self.checkpoint():
+                    raise CopyStopped(f"Stopped copying {source_file}")
+                started = time.monotonic()
+                try:
+                    count = src.readinto(buffer)
+                    if not count:
+                        break
+                    dst.write(view[:count])
+                except OSError:
+                    if tuner:
+                        tuner.record(0, time.monotonic() - started, error=True)
+                    raise
+                if tuner:
+                    # Time spent throttled below is not the NAS being slow
+                    tuner.record(count, time.monotonic() - started)
+                self.throttle_bandwidth(count)
+
+        shutil.copystat(source_file, target)
+
+    def copy_in_ranges(self, source_file, target, size):
+        """Parallel range copy with throttling and tuning; returns the combined digest"""
+        tuner = self.tuner if self.auto_tune else None
+
+        def on_chunk(count, seconds):
+            if tuner:
+                tuner.record(count, seconds)
+            self.throttle_bandwidth(count)
+
+        digest = copy_ranges(source_file, target, size, self.range_streams,
+                             chunk_size=tuner.buffer_size if tuner else self.copy_buffer,
+                             on_chunk=on_chunk, should_stop=self.checkpoint)
+        shutil.copystat(source_file, target)
+        return digest
+
+    def copy_file(self, source_file, dest_file, source_info=None, is_update=None):
+        """Copy a single file from source to destination with bandwidth throttling
+
+        Passing is_update means the caller already compared the two files
+        and found the destination missing (False) or different (True).
+        """
         try:
-            dest_file.parent.mkdir(parents=True, exist_ok=True)
-
-            is_update = dest_file.exists()
-
-            if is_update and not self.files_are_different(source_file, dest_file):
-                self.stats['skipped'] += 1
-                return True
-
-            file_size = source_file.stat().st_size
-
-            if self.bandwidth_limit and self.bandwidth_value:
-                with open(source_file, 'rb') as src, open(dest_file, 'wb') as dst:
-                    chunk_size = 1024 * 1024
-                    while True:
-                        chunk = src.read(chunk_size)
-                        if not chunk:
-                            break
-                        dst.write(chunk)
-                        self.throttle_bandwidth(len(chunk))
-
-                shutil.copystat(source_file, dest_file)
-            else:
-                shutil.copy2(source_file, dest_file)
-
-            self.stats['bytes_transferred'] += file_size
-
-            if self.verify:
-                source_hash = self.get_file_hash(source_file)
-                dest_hash = self.get_file_hash(dest_file)
+            if is_update is None:
+                with self.phase_stats.phase('compare'):
+                    if self.dest_index:
+                        dest_info = self.dest_index.lookup(dest_file)
+                        is_update = dest_info is not None
+                    else:
+                        dest_info = None
+                        is_update = dest_file.exists()
+                    unchanged = is_update and not self.files_are_different(source_file, dest_file,
+                                                                           dest_info, source_info)
+                    self.phase_stats.count('compare')
+
+                if unchanged:
+                    self.count_stat('skipped')
+                    return True
+
+            file_size = source_info[0] if source_info else source_file.stat().st_size
+            transfer_start = time.monotonic()
+
+            with self.phase_stats.phase('copy'):
+                if self.dest_index:
+                    self.dest_index.ensure_dir(dest_file.parent)
+                else:
+                    dest_file.parent.mkdir(parents=True, exist_ok=True)
+
+                # Updates go to a temporary file that replaces the old copy in one
+                # step, so an interrupted copy never destroys the previous version.
+                # Range copies always do: their target has full size from the start
+                # and would pass for complete
+                in_ranges = self.range_streams > 1 and file_size >= self.range_min_size
+                target = dest_file
+                if in_ranges or (is_update and self.temp_files == 'replace'):
+                    target = dest_file.with_name(f".{dest_file.name}.nassync-tmp")
+
+                copy_digest = None
+                try:
+                    if in_ranges:
+                        copy_digest = self.copy_in_ranges(source_file, target, file_size)
+                    elif (self.auto_tune and self.tuner) or self.bandwidth or \
+                            (self.bandwidth_limit and self.bandwidth_value) or \
+                            file_size >= self.chunked_copy_min:
+                        self.copy_data(source_file, target)
+                    else:
+                        shutil.copy2(source_file, target)
+
+                    if target is not dest_file:
+                        os.replace(target, dest_file)
+                except BaseException as e:
+                    # A stopped copy leaves no partial file behind either
+                    if target is not dest_file or isinstance(e, CopyStopped):
+                        try:
+                            target.unlink()
+                        except OSError:
+                            pass
+                    raise
+
+            self.phase_stats.count('copy', size=file_size)
+            self.count_stat('bytes_transferred', file_size)
+
+            policy = self.verify_policy.policy_for(source_file.name, file_size)
+            if self.verify and policy != 'metadata':
+                if copy_digest and policy == 'full':
+                    # Source hashed while copying: only the copy is read back
+                    source_hash = copy_digest
+                    with self.phase_stats.phase('hash'):
+                        dest_hash = range_digest(dest_file, file_size, self.range_streams)
+                    self.phase_stats.count('hash', size=file_size)
+                else:
+                    source_hash, dest_hash = self.file_hashes(source_file, dest_file, policy,
+                                                              file_size)
 
                 if source_hash != dest_hash:
                     self.log(f"Verification failed for {source_file.name}", "ERROR")
-                    self.stats['errors'] += 1
+                    self.count_stat('errors')
+                    self.record_transfer(source_file, self.source, 'error', file_size,
+                                         time.monotonic() - transfer_start,
+                                         "Verification failed")
                     return False
 
+            duration = time.monotonic() - transfer_start
+
             if is_update:
                 self.log(f"Updated: {source_file.name}")
-                self.stats['updated'] += 1
+                self.count_stat('updated')
+                self.record_transfer(source_file, self.source, 'updated', file_size, duration)
             else:
                 self.log(f"Copied: {source_file.name}")
-                self.stats['copied'] += 1
+                self.count_stat('copied')
+                self.record_transfer(source_file, self.source, 'copied', file_size, duration)
 
             return True
 
+        except CopyStopped:
+            self.log(f"Stopped while copying {source_file.name}", "WARNING")
+            return False
         except PermissionError:
             self.log(f"Permission denied: {source_file}", "ERROR")
-            self.stats['errors'] += 1
+            self.count_stat('errors')
+            self.record_transfer(source_file, self.source, 'error', error="Permission denied")
             return False
         except Exception as e:
             self.log(f"Error copying {source_file}: {str(e)}", "ERROR")
-            self.stats['errors'] += 1
+            self.count_stat('errors')
+            self.record_transfer(source_file, self.source, 'error', error=str(e))
             return False
 
-    def get_all_files(self, directory):
-        """Get all files in directory"""
-        files = []
+    def transfer(self, source_file, dest_file, source_info, is_update):
+        """copy_file() in a transfer slot of the tuner (see _sync)"""
+        try:
+            return self.copy_file(source_file, dest_file, source_info, is_update=is_update)
+        finally:
+            if self.tuner:
+                self.tuner.release()
+
+    def create_tuner(self):
+        """Transfer tuner for this run, starting from the best settings seen before"""
+        if not self.auto_tune:
+            if self.transfer_workers <= 1:
+                return None
+            # Fixed parallelism, buffer as configured
+            return TransferTuner(self.transfer_workers, self.copy_buffer,
+                                 min_workers=self.transfer_workers,
+                                 max_workers=self.transfer_workers,
+                                 buffer_sizes=(self.copy_buffer,))
+
+        saved = TuningStore(self.tuning_file).get(self.destination) or {}
+        tuner = TransferTuner(saved.get('workers', self.transfer_workers),
+                              saved.get('buffer_kb', self.copy_buffer // 1024) * 1024,
+                              max_workers=self.max_transfer_workers, log=self.log)
+        self.log(f"Transfer tuning starts with {tuner.describe()}", "INFO")
+        return tuner
+
+    def save_tuning(self):
+        if not (self.auto_tune and self.tuner):
+            return
+        TuningStore(self.tuning_file).put(self.destination, self.tuner)
+        if self.tuner.best:
+            self.log(f"Transfer tuning: best {self.tuner.describe(self.tuner.best_settings())} "
+                     f"at {self.tuner.best[0] / (1024 * 1024):.1f} MB/s", "INFO")
+
+    def get_all_files(self, directory, cache=None, stats=False):
+        """Get all files in directory as a FileInventory
+
+        stats also records every file's size and mtime during the scan.
+        """
+        with self.phase_stats.phase('scan'):
+            files = self._list_files(directory, cache, stats)
+        self.phase_stats.count('scan', ops=len(files))
+        return files
+
+    def open_listing_cache(self):
+        """Load the source listing cache for this source/destination pair"""
+        if not self.subfolders or self.listing_cache_mode == 'off':
+            return None
+
+        from dir_cache import DirectoryCache
+
+        # Trusting unchanged directories is only safe while the filters stay the same
+        cache = DirectoryCache(self.source, self.destination, self.listing_cache_mode,
+                               self.filter_signature(), cache_dir=self.listing_cache_dir)
+        cache.load()
+        return cache
+
+    def filter_signature(self):
+        """Settings that decide which files a run syncs"""
+        return json.dumps([self.mode, self.config.get('include'), self.config.get('exclude')])
+
+    def open_journal(self):
+        """Resume journal for this pair, and what an interrupted run left (or None)"""
+        from resume_journal import ResumeJournal
+
+        signature = json.dumps([self.filter_signature(), self.subfolders])
+        journal = ResumeJournal(self.source, self.destination, signature, self.journal_dir)
+        if not self.resume_interrupted:
+            journal.finish()    # a journal left from before is out of date after this run
+            return None, None
+
+        state = journal.load()
+        if state and not state['pending'] and not state['complete'] and state['cursor'] is None:
+            state = None    # stopped before it found anything
+        return journal, state
+
+    def pending_inventory(self, pending):
+        """FileInventory of the files an interrupted run still had to copy"""
+        files = FileInventory(self.source)
+        last = dir_index = None
+        for rel_path in sorted(rel_path for status, rel_path in pending if status != EXTRA):
+            rel_dir, name = os.path.split(rel_path)
+            try:
+                st = os.stat(self.source / rel_path)
+            except OSError:
+                continue    # gone since
+            if rel_dir != last:
+                dir_index = files.add_dir(rel_dir)
+                last = rel_dir
+            files.add(dir_index, name, st.st_size, st.st_mtime)
+        return files
+
+    def trust_compared(self, source_files, state):
+        """Trust files the interrupted run already found unchanged
+
+        Files in directories its diff had passed (before the cursor) and
+        not modified since it started. Returns the number of files.
+        """
+        if state['cursor'] is None:
+            return 0
+
+        cursor = dir_key(state['cursor'], self.name_fold)
+        pending = {rel_path for status, rel_path in state['pending']}
+        trusted = 0
+        last = None
+        for index in source_files:
+            dir_index = source_files.dir_of[index]
+            if dir_index != last:
+                # Walk order: every later directory comes after the cursor too
+                if dir_key(source_files.dirs[dir_index], self.name_fold) >= cursor:
+                    break
+                last = dir_index
+            if source_files.flags[index] & TRUSTED:
+                continue
+
+            rel_path = source_files.rel_path(index)
+            mtime = source_files.mtimes[index] if source_files.sizes[index] >= 0 else None
+            if mtime is None:
+                try:
+                    mtime = os.stat(self.source / rel_path).st_mtime
+                except OSError:
+                    continue
+            if mtime < state['started'] and rel_path not in pending:
+                source_files.flags[index] |= TRUSTED
+                trusted += 1
+        return trusted
+
+    def resume_items(self, pending, source_files, compare):
+        """Diff items for the files an interrupted run left, checked again"""
+        wanted = {rel_path for status, rel_path in pending if status != EXTRA}
+        indexes = {}
+        if wanted:
+            for index in source_files:
+                rel_path = source_files.rel_path(index)
+                if rel_path in wanted:
+                    indexes[rel_path] = index
+
+        for status, rel_path in pending:
+            if self.checkpoint():
+                return
+            rel_dir, name = os.path.split(rel_path)
+            if status == EXTRA:
+                if self.mode == 'mirror' and not (self.source / rel_path).exists() and \
+                        (self.destination / rel_path).exists():
+                    yield EXTRA, rel_dir, name, None, None
+                continue
+
+            index = indexes.get(rel_path)
+            if index is None:
+                continue    # gone from the source
+            try:
+                st = os.stat(self.destination / rel_path)
+            except FileNotFoundError:
+                yield NEW, rel_dir, name, index, None
+                continue
+            except OSError:
+                yield CHANGED, rel_dir, name, index, None
+                continue
+            dest_info = (st.st_size, st.st_mtime)
+            yield (CHANGED if compare(index, dest_info) else SAME), rel_dir, name, index, dest_info
+
+    @staticmethod
+    def stat_info(path):
+        """(size, mtime) of a file, or None"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime
+
+    def open_packs(self):
+        """Pack store of the destination, or None when its index cannot be read"""
         try:
-            if self.subfolders:
-                for root, dirs, filenames in os.walk(directory):
-                    # Filter out excluded directories
-                    dirs[:] = [d for d in dirs if not any(
-                        fnmatch(d, pattern) for pattern in self.exclude_patterns
-                    )]
-
-                    for filename in filenames:
-                        file_path = Path(root) / filename
-                        if self.should_include_file(file_path):
-                            files.append(file_path)
+            packs = PackStore(self.destination, self.pack_compression, self.pack_size,
+                              self.pack_index_dir, log=self.log).open()
+        except Exception as e:
+            self.log(f"Pack files unavailable, copying small files one by one: {str(e)}",
+                     "ERROR")
+            return None
+        self.log(f"Packing files up to {self.pack_max_size // 1024} KB "
+                 f"({self.pack_compression} compression): {packs.summary()}", "INFO")
+        return packs
+
+    def pack_matches(self, rel_path, info, entry):
+        """Whether a packed copy (size, mtime, crc) is the current version of a file"""
+        if entry[0] != info[0] or abs(entry[1] - info[1]) > 0.001:
+            return False
+        if not self.verify or \
+                self.verify_policy.policy_for(os.path.basename(rel_path), info[0]) == 'metadata':
+            return True
+
+        # Verify mode: compare contents with the checksum stored in the record
+        with self.phase_stats.phase('hash'):
+            try:
+                with open(self.source / rel_path, 'rb') as f:
+                    crc = zlib.crc32(f.read())
+            except OSError:
+                return False
+        self.phase_stats.count('hash', size=info[0])
+        return crc == entry[2]
+
+    def plan_packs(self, source_files):
+        """Leave small files whose packed copy is current out of the diff
+
+        They are flagged as trusted; the other small files reach the copy
+        loop as new files and are packed there (pack_file()). In mirror mode
+        the files still in the source are noted for finish_packs(). Returns
+        the number of current files.
+        """
+        mirror = self.mode == 'mirror'
+        current = 0
+        for index in source_files:
+            rel_path = source_files.rel_path(index)
+            entry = self.packs.lookup(rel_path)
+            if source_files.is_trusted(index):
+                # Unchanged folder (listing cache trust mode)
+                if entry and mirror:
+                    self.packs.keep(rel_path)
+                continue
+
+            info = source_files.info(index) or self.stat_info(self.source / rel_path)
+            if info is None:
+                continue
+            if info[0] > self.pack_max_size:
+                if entry:
+                    # Grown past the limit: a plain file from now on
+                    self.packs.remove(rel_path)
+                continue
+
+            if mirror:
+                self.packs.keep(rel_path)
+            if entry and self.pack_matches(rel_path, info, entry):
+                source_files.flags[index] |= TRUSTED
+                current += 1
+        return current
+
+    def pack_file(self, source_file, rel_path, source_info):
+        """Append a small new or changed file to the current pack"""
+        entry = self.packs.lookup(rel_path)
+        if entry and self.pack_matches(rel_path, source_info, entry):
+            # Packed by an interrupted run after its journal was last written
+            self.count_stat('skipped')
+            return True
+
+        # Verify mode: records are read back from the NAS once their batch is written
+        verify = self.verify and \
+            self.verify_policy.policy_for(source_file.name, source_info[0]) != 'metadata'
+        transfer_start = time.monotonic()
+        try:
+            with self.phase_stats.phase('pack'):
+                written = self.packs.add(rel_path, source_file, verify=verify)
+        except Exception as e:
+            self.log(f"Error packing {source_file}: {str(e)}", "ERROR")
+            self.count_stat('errors')
+            self.record_transfer(source_file, self.source, 'error', error=str(e))
+            return False
+
+        self.throttle_bandwidth(written)
+        self.phase_stats.count('pack', size=written)
+        self.count_stat('bytes_transferred', written)
+        duration = time.monotonic() - transfer_start
+
+        action = 'updated' if entry else 'copied'
+        self.log(f"{'Updated in pack' if entry else 'Packed'}: {source_file.name}")
+        self.count_stat(action)
+        self.record_transfer(source_file, self.source, action, source_info[0], duration)
+        self.report_pack_failures()
+        return True
+
+    def report_pack_failures(self):
+        """Errors for packed files whose record did not read back intact"""
+        for rel_path in self.packs.take_failed():
+            self.log(f"Verification failed for {rel_path.rsplit('/', 1)[-1]} (packed)", "ERROR")
+            self.count_stat('errors')
+            self.record_transfer(self.source / rel_path, self.source, 'error',
+                                 error="Verification failed")
+
+    def finish_packs(self, complete_scan):
+        """Forget packed files gone from the source (mirror mode), compact the packs"""
+        if self.mode == 'mirror' and complete_scan:
+            with self.phase_stats.phase('delete'):
+                removed = self.packs.remove_unseen()
+            for rel_path in removed:
+                self.log(f"Deleted from pack: {rel_path.rsplit('/', 1)[-1]}")
+                self.record_transfer(Path(rel_path), self.destination, 'deleted')
+            self.count_stat('deleted', len(removed))
+            self.phase_stats.count('delete', ops=len(removed))
+
+        with self.phase_stats.phase('pack'):
+            compacted, freed = self.packs.compact(self.pack_compact_ratio, self.checkpoint)
+        if compacted:
+            self.log(f"Compacted {compacted} packs, {freed / (1024 * 1024):.1f} MB freed",
+                     "INFO")
+
+    def close_packs(self):
+        """Write the last records and the index on the NAS"""
+        if not self.packs:
+            return
+        try:
+            with self.phase_stats.phase('pack'):
+                self.packs.close()
+        except Exception as e:
+            self.log(f"Error writing pack files: {str(e)}", "ERROR")
+            self.count_stat('errors')
+        self.report_pack_failures()
+        self.packs = None
+
+    def apply_capabilities(self, fold_names=True):
+        """Pick the mtime tolerance, temp-file scheme and name matching for the destination
+
+        fold_names=False keeps exact name matching, for runs whose source was
+        already scanned in case-sensitive order.
+        """
+        if self.fs_probe in ('off', False):
+            return
+
+        from fs_probe import choose_strategy, get_capabilities
+
+        self.capabilities = get_capabilities(self.destination, log=self.log)
+        if not self.capabilities:
+            return
+
+        strategy = choose_strategy(self.capabilities)
+        self.mtime_tolerance = strategy['mtime_tolerance']
+        self.temp_files = strategy['temp_files']
+        if fold_names and strategy['case_fold']:
+            self.name_fold = str.lower
+        self.log(f"Destination strategy: mtime tolerance {self.mtime_tolerance:g}s, "
+                 f"temp files {self.temp_files}, "
+                 f"{'case-insensitive' if self.name_fold else 'exact'} names, "
+                 f"dedup {strategy['dedup']}", "INFO")
+
+    def keep_dir(self, name):
+        """Whether a scan descends into a subdirectory (exclude patterns)"""
+        if name == PACK_DIR:
+            return False
+        return not any(fnmatch(name, pattern) for pattern in self.exclude_patterns)
+
+    def _add_files(self, files, root, entries, flags=0):
+        """Add the included files of one directory to an inventory"""
+        dir_index = None
+        for entry in entries:
+            name, size, mtime = entry if isinstance(entry, tuple) else (entry, -1, 0.0)
+            if not self.should_include_file(os.path.join(root, name)):
+                continue
+            if dir_index is None:
+                dir_index = files.add_dir(root[len(files.root):].lstrip(os.sep))
+            files.add(dir_index, name, size, mtime, flags)
+
+    def _list_files(self, directory, cache=None, stats=False):
+        files = FileInventory(directory)
+        lister = list_dir_stat if stats else list_dir
+        try:
+            if self.subfolders and cache:
+                for root, filenames, trusted in cache.walk(directory, self.keep_dir,
+                                                           self.scan_threads, self.name_fold):
+                    self._add_files(files, root, filenames, TRUSTED if trusted else 0)
+            elif self.subfolders:
+                walker = ParallelWalker(self.scan_threads, self.keep_dir, lister,
+                                        sort_key=self.name_fold)
+                for root, dirs, entries in walker.walk(directory):
+                    self._add_files(files, root, entries)
             else:
-                for item in directory.iterdir():
-                    if item.is_file() and self.should_include_file(item):
-                        files.append(item)
+                dirs, entries = lister(files.root)
+                self._add_files(files, files.root, sorted(entries))
         except PermissionError:
             self.log(f"Permission denied accessing: {directory}", "ERROR")
         except Exception as e:
@@ -207,73 +861,169 @@ class SyncEngine:
 
         return files
 
-    def delete_extra_files(self, source_files_rel, dest_files):
-        """Delete files in destination that don't exist in source (mirror mode)"""
-        if self.mode != 'mirror':
-            return
+    def delete_extra_file(self, dest_file):
+        """Delete a destination file that doesn't exist in source (mirror mode)"""
+        with self.phase_stats.phase('delete'):
+            try:
+                dest_file.unlink()
+                self.log(f"Deleted: {dest_file.name}")
+                self.count_stat('deleted')
+                self.record_transfer(dest_file, self.destination, 'deleted')
+                self.phase_stats.count('delete')
+                return True
+            except Exception as e:
+                self.log(f"Error deleting {dest_file}: {str(e)}", "ERROR")
+                self.count_stat('errors')
+                return False
 
-        for dest_file in dest_files:
-            if self.should_stop:
-                break
+    def verify_unchanged(self, diff, source_files):
+        """Hash the files the diff found unchanged, a few files ahead of the copy loop
 
-            try:
-                rel_path = dest_file.relative_to(self.destination)
+        Runs on the hash pool with both sides of a file hashed at once; files
+        whose contents differ are passed on as changed.
+        """
+        window = deque()
 
-                if rel_path not in source_files_rel:
-                    dest_file.unlink()
-                    self.log(f"Deleted: {dest_file.name}")
-                    self.stats['deleted'] += 1
+        def resolve(item, futures):
+            if futures:
+                source_hash, dest_hash = self.hash_pool.pair_result(futures)
+                if source_hash != dest_hash:
+                    return (CHANGED,) + item[1:]
+            return item
 
-            except Exception as e:
-                self.log(f"Error deleting {dest_file}: {str(e)}", "ERROR")
-                self.stats['errors'] += 1
+        try:
+            for item in diff:
+                futures = None
+                status, rel_dir, name, index, dest_info = item
+                policy = 'metadata'
+                if status == SAME and not source_files.is_trusted(index):
+                    policy = self.verify_policy.policy_for(name, dest_info[0])
+                if policy != 'metadata':
+                    rel_path = os.path.join(rel_dir, name) if rel_dir else name
+                    futures = self.hash_pool.submit_pair(self.source / rel_path,
+                                                         self.destination / rel_path,
+                                                         dest_info[0], (policy,))
+                window.append((item, futures))
+
+                if len(window) > self.hash_pool.read_ahead:
+                    yield resolve(*window.popleft())
+
+            while window:
+                yield resolve(*window.popleft())
+        finally:
+            # Stopped early: drop hashes that have not started yet
+            for item, futures in window:
+                for future in futures or ():
+                    future.cancel()
+
+    def destination_listings(self, source_files):
+        """Destination directory listings for diff_trees, in walk order
+
+        Mirror mode walks the whole destination to find extra files; the other
+        modes only list the directories that hold source files.
+        """
+        if self.mode == 'mirror':
+            top = str(self.destination)
+            fold = self.name_fold or (lambda name: name)
+            spans = {fold(rel_dir): (indexes[0], indexes[-1] + 1)
+                     for rel_dir, indexes in source_groups(source_files)}
+
+            def list_dest(path):
+                # Only files that will be compared need a stat; extras just need a name
+                first, end = spans.get(fold(path[len(top):].lstrip(os.sep)), (0, 0))
+                wanted = {fold(source_files.names[index]) for index in range(first, end)
+                          if not source_files.is_trusted(index)}
+                return list_dir_stat(path, wanted, self.name_fold)
+
+            keep_dir = self.keep_dir if self.subfolders else (lambda name: False)
+            walker = ParallelWalker(self.scan_threads, keep_dir, list_dest,
+                                    sort_key=self.name_fold)
+            for root, dirs, entries in walker.walk(top):
+                self.dest_index.add_known_dir(root)
+                yield (root[len(top):].lstrip(os.sep),
+                       {name: (size, mtime) for name, size, mtime in entries})
+            return
 
-        # Remove empty directories
-        if self.subfolders:
-            self.remove_empty_dirs(self.destination)
+        for rel_dir, indexes in source_groups(source_files):
+            if all(source_files.is_trusted(index) for index in indexes):
+                yield rel_dir, None
+                continue
+
+            directory = self.destination / rel_dir
+            files = self.dest_index.listing(directory)
+            if files is False:
+                # Listing failed: look the files up one by one
+                files = {}
+                for index in indexes:
+                    name = source_files.names[index]
+                    info = self.dest_index.lookup(directory / name)
+                    if info:
+                        files[name] = info
+            yield rel_dir, files
 
     def remove_empty_dirs(self, directory):
         """Remove empty directories recursively"""
         try:
-            for item in directory.iterdir():
-                if item.is_dir():
-                    self.remove_empty_dirs(item)
-                    try:
-                        item.rmdir()
-                    except OSError:
-                        pass
+            # Only folders without files can end up empty
+            walker = ParallelWalker(self.scan_threads)
+            candidates = [root for root, dirs, files in walker.walk(directory) if not files]
         except Exception:
-            pass
+            return
+
+        # Walk order lists parents before children, so go backwards: children first
+        top = str(directory)
+        for path in reversed(candidates):
+            if path != top:
+                try:
+                    os.rmdir(path)
+                except OSError:
+                    pass
 
     def apply_retention_policy(self):
         """Delete files older than retention period"""
         if not self.retention_enabled:
             return
 
+        with self.phase_stats.phase('retention'):
+            self._apply_retention_policy()
+
+    def _apply_retention_policy(self):
         cutoff_time = datetime.now() - timedelta(days=self.retention_days)
         cutoff_timestamp = cutoff_time.timestamp()
 
         self.log(f"Applying retention policy: keeping files newer than {self.retention_days} days", "INFO")
 
         try:
-            dest_files = self.get_all_files(self.destination)
+            dest_files = self.get_all_files(self.destination, stats=True)
             cleaned_count = 0
 
-            for dest_file in dest_files:
-                if self.should_stop:
+            for index in dest_files:
+                if self.checkpoint():
                     break
 
+                dest_file = dest_files.path(index)
                 try:
-                    file_mtime = dest_file.stat().st_mtime
+                    info = dest_files.info(index)
+                    file_mtime = info[1] if info else dest_file.stat().st_mtime
 
                     if file_mtime < cutoff_timestamp:
                         dest_file.unlink()
                         self.log(f"Retention cleanup: Deleted {dest_file.name}", "INFO")
                         cleaned_count += 1
+                        self.record_transfer(dest_file, self.destination, 'retention')
+                        self.phase_stats.count('retention')
 
                 except Exception as e:
                     self.log(f"Error applying retention to {dest_file}: {str(e)}", "ERROR")
 
+            if self.packs and not self.should_stop:
+                for rel_path in self.packs.remove_older(cutoff_timestamp):
+                    self.log(f"Retention cleanup: Deleted {rel_path.rsplit('/', 1)[-1]} "
+                             f"from pack", "INFO")
+                    cleaned_count += 1
+                    self.record_transfer(Path(rel_path), self.destination, 'retention')
+                    self.phase_stats.count('retention')
+
             if cleaned_count > 0:
                 self.log(f"Retention policy: Cleaned {cleaned_count} old files", "SUCCESS")
                 self.remove_empty_dirs(self.destination)
@@ -283,59 +1033,259 @@ class SyncEngine:
 
     def sync(self):
         """Main sync function"""
+        if self.profile_mode == 'off':
+            return self._sync()
+
+        from profiling import SyncProfiler
+
+        profiler = SyncProfiler(self.profile_mode, keep=self.profile_keep)
+        self.log(f"Profiling enabled ({self.profile_mode})", "INFO")
+        result = profiler.run(self._sync)
+        for path in profiler.output_files:
+            self.log(f"Profile written: {path}", "INFO")
+        return result
+
+    def _sync(self):
         self.should_stop = False
+        self.phase_stats = PhaseStats()
         self.log(f"Syncing from {self.source} to {self.destination}")
         self.log(f"Mode: {self.mode}, Verify: {self.verify}, Subfolders: {self.subfolders}")
 
+        if self.ledger:
+            self.run_id = self.ledger.begin_run(self.source, self.destination)
+
+        # A complete plan left by an interrupted run replaces the scan and diff
+        self.journal, resume = self.open_journal()
+        rescan = not (resume and resume['complete'])
+        self.listing_cache = self.open_listing_cache() if rescan else None
+
         try:
-            # Get all source files
-            source_files = self.get_all_files(self.source)
+            # Probe the destination before the scan: name matching decides the walk order
+            if self.destination.is_dir():
+                self.apply_capabilities()
+
+            if rescan:
+                # Get all source files (with sizes and mtimes, stat-ed on the walker threads)
+                source_files = self.get_all_files(self.source, self.listing_cache, stats=True)
+            else:
+                with self.phase_stats.phase('scan'):
+                    source_files = self.pending_inventory(resume['pending'])
             total_files = len(source_files)
 
+            if self.listing_cache:
+                self.log(f"Listing cache: {self.listing_cache.summary()}", "INFO")
+
+            if resume and rescan:
+                trusted = self.trust_compared(source_files, resume)
+                total_files += len(resume['pending'])
+                self.log(f"Resuming the interrupted run: {len(resume['pending'])} files left "
+                         f"first, then the rest of the tree ({trusted} files already compared)",
+                         "INFO")
+            elif resume:
+                total_files = len(resume['pending'])
+                self.log(f"Resuming the interrupted run: {total_files} files left, "
+                         f"{resume['done']} already done, no rescan", "INFO")
+
             if total_files == 0:
+                if self.journal:
+                    self.journal.finish()
+                    self.journal = None
                 self.log("No files to sync (check your include/exclude patterns)", "WARNING")
                 return {
                     'success': True,
                     'copied': 0,
                     'updated': 0,
                     'deleted': 0,
-                    'errors': 0
+                    'errors': 0,
+                    'run_id': self.run_id,
+                    'phases': self.phase_stats.as_dict()
                 }
 
             self.log(f"Found {total_files} files to process")
 
             # Create destination directory if it doesn't exist
             self.destination.mkdir(parents=True, exist_ok=True)
-
-            # Copy/update files
-            for i, source_file in enumerate(source_files):
-                if self.should_stop:
+            if self.capabilities is None:
+                self.apply_capabilities(fold_names=False)
+
+            # Small files whose packed copy is current stay out of the diff
+            if self.pack_small_files:
+                self.packs = self.open_packs()
+                if self.packs and rescan:
+                    with self.phase_stats.phase('compare'):
+                        current = self.plan_packs(source_files)
+                    self.log(f"Packed files up to date: {current}", "INFO")
+
+            # Destination listings: prefetched for the source directories, or a
+            # parallel walk of the whole destination in mirror mode
+            from dest_index import DestinationIndex
+
+            self.dest_index = DestinationIndex(self.destination, workers=self.scan_threads)
+            self.dest_index.add_known_dir(self.destination)
+            if self.mode != 'mirror' and rescan:
+                self.dest_index.prefetch(
+                    self.destination / rel_dir
+                    for rel_dir in source_files.file_dirs(skip_trusted=True)
+                )
+
+            def compare(index, dest_info):
+                rel_path = source_files.rel_path(index)
+                try:
+                    return self.files_are_different(self.source / rel_path,
+                                                    self.destination / rel_path,
+                                                    dest_info, source_files.info(index),
+                                                    check_content=False)
+                except OSError:
+                    # Let the copy report the problem
+                    return True
+
+            def keep_extra(rel_dir, name):
+                return self.should_include_file(os.path.join(str(self.destination), rel_dir, name))
+
+            # Files an interrupted run left go first, checked again
+            resumed = self.resume_items(resume['pending'], source_files, compare) \
+                if resume else iter(())
+
+            # Trusted files: directory unchanged since a complete sync (trust mode)
+            diff = None
+            if rescan:
+                diff = diff_trees(source_files, self.destination_listings(source_files), compare,
+                                  skip=source_files.is_trusted,
+                                  keep_extra=keep_extra if self.mode == 'mirror' else None,
+                                  fold=self.name_fold)
+
+            # Verify mode: content checks run on a thread pool, ahead of the loop
+            if self.verify:
+                self.hash_pool = HashPool(self.file_digest, self.hash_workers)
+                resumed = self.verify_unchanged(resumed, source_files)
+                if diff is not None:
+                    diff = self.verify_unchanged(diff, source_files)
+
+            # Record the plan and progress as they happen, in batches
+            if self.journal:
+                self.journal.begin(resume['pending'] if resume else (), complete=diff is None)
+                if diff is not None:
+                    diff = self.journal.track(diff)
+            diff = chain(resumed, diff) if diff is not None else resumed
+
+            # Other orders than scan order: copies start once the diff is complete
+            if not self.transfer_order.streaming:
+                self.log(f"Transfer order: {self.transfer_order.describe()}", "INFO")
+
+                def order_key(item):
+                    _, rel_dir, name, index, _ = item
+                    rel_path = os.path.join(rel_dir, name) if rel_dir else name
+                    return self.transfer_order.key(rel_path, self.source / rel_path,
+                                                   source_files.info(index))
+
+                diff = self.transfer_order.reorder(diff, order_key)
+
+            # Parallel transfers: a bounded pool, with the tuner deciding how many run
+            finished = queue.SimpleQueue()
+            self.tuner = self.create_tuner()
+            if self.tuner and self.tuner.max_workers > 1:
+                self.transfers = ThreadPoolExecutor(max_workers=self.tuner.max_workers,
+                                                    thread_name_prefix='transfer')
+            in_flight = 0
+            processed = 0
+            source_prefix = len(os.path.join(str(self.source), ''))
+
+            def finish_transfer(source_file, copied):
+                nonlocal processed
+                # Failed directories are listed and compared again next run
+                if not copied and self.listing_cache:
+                    self.listing_cache.invalidate(source_file.parent)
+                if copied and source_file and self.journal:
+                    self.journal.done(str(source_file)[source_prefix:])
+                processed += 1
+                self.update_progress((processed / total_files) * 100)
+
+            # Copy/update new and changed files, delete extras as the diff finds them
+            while True:
+                while in_flight and not finished.empty():
+                    finish_transfer(*finished.get())
+                    in_flight -= 1
+                # Ledger batches are written here, never on the transfer threads
+                if self.ledger:
+                    self.ledger.flush_if_due()
+
+                if self.checkpoint():
                     self.log("Sync stopped by user", "WARNING")
                     break
 
-                rel_path = source_file.relative_to(self.source)
-                dest_file = self.destination / rel_path
-
-                self.copy_file(source_file, dest_file)
-
-                # Update progress
-                progress = ((i + 1) / total_files) * 100
-                self.update_progress(progress)
+                with self.phase_stats.phase('compare'):
+                    item = next(diff, None)
+                if item is None:
+                    break
 
-            # Handle deletions in mirror mode
-            if self.mode == 'mirror' and not self.should_stop:
-                dest_files = self.get_all_files(self.destination)
-                source_files_rel = {f.relative_to(self.source) for f in source_files}
-                self.delete_extra_files(source_files_rel, dest_files)
+                status, rel_dir, name, index, dest_info = item
+                rel_path = os.path.join(rel_dir, name) if rel_dir else name
+
+                if status == EXTRA:
+                    if self.delete_extra_file(self.destination / rel_path) and self.journal:
+                        self.journal.done(rel_path)
+                    continue
+
+                if not source_files.is_trusted(index):
+                    self.phase_stats.count('compare')
+
+                if status == SAME:
+                    self.count_stat('skipped')
+                    finish_transfer(None, True)
+                    continue
+
+                source_file = self.source / rel_path
+                if status == NEW and self.packs:
+                    info = source_files.info(index) or self.stat_info(source_file)
+                    if info and info[0] <= self.pack_max_size:
+                        finish_transfer(source_file, self.pack_file(source_file, rel_path, info))
+                        continue
+
+                args = (source_file, self.destination / rel_path, source_files.info(index),
+                        status == CHANGED)
+                if self.transfers:
+                    self.tuner.acquire()
+                    future = self.transfers.submit(self.transfer, *args)
+                    future.add_done_callback(
+                        lambda future, path=source_file: finished.put(
+                            (path, not future.exception() and future.result())))
+                    in_flight += 1
+                else:
+                    finish_transfer(source_file, self.transfer(*args))
+
+            # Let the transfers still running finish their files
+            while in_flight:
+                finish_transfer(*finished.get())
+                in_flight -= 1
+            self.save_tuning()
+
+            if self.packs and not self.should_stop:
+                self.finish_packs(rescan)
+
+            # Done: nothing left to resume (a stopped run keeps its journal)
+            if self.journal and not self.should_stop:
+                self.journal.finish()
+                self.journal = None
+
+            # Remove directories mirror mode left empty
+            if self.mode == 'mirror' and self.subfolders and not self.should_stop:
+                with self.phase_stats.phase('delete'):
+                    self.remove_empty_dirs(self.destination)
 
             # Apply retention policy if enabled
             if not self.should_stop:
                 self.apply_retention_policy()
+            self.close_packs()
 
             success = self.stats['errors'] == 0
 
+            # Only a complete run may vouch for the cached directories
+            if self.listing_cache and not self.should_stop:
+                self.listing_cache.save()
+
             bytes_mb = self.stats['bytes_transferred'] / (1024 * 1024)
             self.log(f"Total data transferred: {bytes_mb:.2f} MB", "INFO")
+            self.log(f"Phase times: {self.phase_stats.summary()}", "INFO")
 
             return {
                 'success': success,
@@ -343,7 +1293,9 @@ class SyncEngine:
                 'updated': self.stats['updated'],
                 'deleted': self.stats['deleted'],
                 'errors': self.stats['errors'],
-                'skipped': self.stats['skipped']
+                'skipped': self.stats['skipped'],
+                'run_id': self.run_id,
+                'phases': self.phase_stats.as_dict()
             }
 
         except Exception as e:
@@ -354,5 +1306,25 @@ class SyncEngine:
                 'updated': self.stats['updated'],
                 'deleted': self.stats['deleted'],
                 'errors': self.stats['errors'] + 1,
-                'skipped': self.stats['skipped']
+                'skipped': self.stats['skipped'],
+                'run_id': self.run_id,
+                'phases': self.phase_stats.as_dict()
             }
+
+        finally:
+            if self.transfers:
+                self.transfers.shutdown()
+                self.transfers = None
+            self.tuner = None
+            self.close_packs()
+            if self.hash_pool:
+                self.hash_pool.close()
+                self.hash_pool = None
+            if self.dest_index:
+                self.dest_index.close()
+                self.dest_index = None
+            if self.journal:
+                self.journal.flush()
+                self.journal = None
+            if self.ledger:
+                self.ledger.flush()
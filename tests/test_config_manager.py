@@ -0,0 +1,42 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config_manager import ConfigManager, get_jobs
+
+
+class MergedConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.tmp.name, 'config.json')
+        with open(self.config_file, 'w') as f:
+            json.dump({'source': '/old', 'fs_probe': 'off', 'hash_workers': 3,
+                       'transfer_workers': 4, 'pack_size_mb': 64}, f)
+        self.manager = ConfigManager(self.config_file)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_file_only_keys_survive_a_gui_save(self):
+        # What the GUI does on save: its own fields laid over the file
+        self.manager.save_config(self.manager.merged_config({'source': '/new', 'jobs': []}))
+
+        saved = self.manager.load_config()
+        self.assertEqual(saved['source'], '/new')
+        self.assertEqual(saved['fs_probe'], 'off')
+        self.assertEqual(saved['hash_workers'], 3)
+
+    def test_file_only_keys_reach_the_jobs(self):
+        jobs = get_jobs(self.manager.merged_config({'source': '/new', 'jobs': []}))
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0]['fs_probe'], 'off')
+        self.assertEqual(jobs[0]['transfer_workers'], 4)
+        self.assertEqual(jobs[0]['pack_size_mb'], 64)
+
+
+if __name__ == '__main__':
+    unittest.main()
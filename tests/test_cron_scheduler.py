@@ -0,0 +1,31 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cron_scheduler import CronExpression
+
+
+class CronDayFieldsTest(unittest.TestCase):
+    def test_step_day_field_is_and_ed_with_weekday(self):
+        # */2 starts with '*': only odd days that are also Mondays match
+        cron = CronExpression('0 3 */2 * 1')
+        self.assertFalse(cron.any_day)
+        # 2026-10-19 is a Monday on an odd day, 2026-10-26 a Monday on an even day
+        self.assertEqual(cron.next_after(datetime(2026, 10, 18, 12, 0)),
+                         datetime(2026, 10, 19, 3, 0))
+        self.assertEqual(cron.next_after(datetime(2026, 10, 19, 12, 0)),
+                         datetime(2026, 11, 9, 3, 0))
+
+    def test_restricted_day_fields_are_or_ed(self):
+        cron = CronExpression('0 3 1 * 1')
+        self.assertTrue(cron.any_day)
+        # Monday the 19th matches through the weekday alone
+        self.assertEqual(cron.next_after(datetime(2026, 10, 18, 12, 0)),
+                         datetime(2026, 10, 19, 3, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,350 @@
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    source TEXT NOT NULL,
+    destination TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    root TEXT NOT NULL DEFAULT '',
+    path TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    UNIQUE (root, path)
+);
+CREATE TABLE IF NOT EXISTS transfers (
+    run_id INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    action TEXT NOT NULL,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    duration REAL NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transfers_ts ON transfers(ts);
+CREATE INDEX IF NOT EXISTS idx_transfers_run ON transfers(run_id);
+CREATE INDEX IF NOT EXISTS idx_transfers_file ON transfers(file_id);
+CREATE INDEX IF NOT EXISTS idx_files_directory ON files(root, directory);
+"""
+
+# Ledgers from before files were keyed by destination: each file gets the
+# destination of the first run that recorded it
+MIGRATE_FILES = """
+ALTER TABLE files RENAME TO files_old;
+DROP INDEX IF EXISTS idx_files_directory;
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    root TEXT NOT NULL DEFAULT '',
+    path TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    UNIQUE (root, path)
+);
+INSERT INTO files (id, root, path, directory)
+SELECT id, COALESCE((SELECT r.destination FROM transfers t JOIN runs r ON r.id = t.run_id
+                     WHERE t.file_id = files_old.id ORDER BY t.ts LIMIT 1), ''),
+       path, directory
+FROM files_old;
+DROP TABLE files_old;
+"""
+
+# Actions that move data to the destination
+TRANSFER_ACTIONS = ('copied', 'updated')
+
+QUERIES = {
+    'largest': "Largest transfers",
+    'most-updated': "Files updated most often",
+    'slowest-dirs': "Slowest directories",
+    'errors': "Files with errors",
+}
+
+
+class TransferLedger:
+    """Per-file record of every sync run, stored in an indexed SQLite file.
+
+    Records are buffered in memory and written in batches so the copy loop
+    never waits on the database for individual files. Files are keyed by
+    the run's destination and their relative path, so jobs that share
+    relative paths stay apart.
+
+    record() only queues: the sync thread calls flush_if_due() between
+    files, so copy threads never wait for a commit.
+    """
+
+    def __init__(self, db_path=None, batch_size=500, flush_interval=5.0):
+        self.ledger_dir = Path.home() / '.nassync'
+        self.ledger_dir.mkdir(exist_ok=True)
+        self.db_file = Path(db_path) if db_path else self.ledger_dir / 'ledger.db'
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_age_days = 365
+
+        self._pending = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(str(self.db_file), timeout=30)
+
+    def _init_db(self):
+        try:
+            conn = self._connect()
+            try:
+                columns = [row[1] for row in conn.execute("PRAGMA table_info(files)")]
+                if columns and 'root' not in columns:
+                    conn.executescript(MIGRATE_FILES)
+                conn.executescript(SCHEMA)
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error initializing ledger: {e}")
+
+    def begin_run(self, source, destination):
+        """Register a new sync run and return its id"""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    cursor = conn.execute(
+                        "INSERT INTO runs (started, source, destination) VALUES (?, ?, ?)",
+                        (time.time(), str(source), str(destination))
+                    )
+                    run_id = cursor.lastrowid
+                self._prune(conn)
+                return run_id
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error starting ledger run: {e}")
+            return None
+
+    def record(self, run_id, rel_path, action, size=0, duration=0.0, error=None):
+        """Queue a per-file ledger entry, flushing when the batch is full"""
+        if run_id is None:
+            return
+
+        rel_path = Path(rel_path).as_posix()
+        directory = rel_path.rsplit('/', 1)[0] if '/' in rel_path else ''
+
+        with self._lock:
+            self._pending.append(
+                (run_id, rel_path, directory, time.time(), action, size, duration, error)
+            )
+
+    def flush_if_due(self):
+        """Write the queued entries once the batch is full or old enough"""
+        with self._lock:
+            due = (len(self._pending) >= self.batch_size or
+                   (self._pending and
+                    time.monotonic() - self._last_flush >= self.flush_interval))
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write all queued entries in a single transaction"""
+        with self._lock:
+            batch = self._pending
+            self._pending = []
+            self._last_flush = time.monotonic()
+
+        if not batch:
+            return
+
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    # The run's destination is the root of its files
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO files (root, path, directory) "
+                        "SELECT destination, ?, ? FROM runs WHERE id = ?",
+                        {(item[1], item[2], item[0]) for item in batch}
+                    )
+                    conn.executemany(
+                        "INSERT INTO transfers (run_id, file_id, ts, action, bytes, duration, error) "
+                        "VALUES (?, (SELECT f.id FROM files f JOIN runs r ON f.root = r.destination "
+                        "WHERE r.id = ? AND f.path = ?), ?, ?, ?, ?, ?)",
+                        [(run_id, run_id, path, ts, action, size, duration, error)
+                         for run_id, path, _, ts, action, size, duration, error in batch]
+                    )
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error writing ledger: {e}")
+
+    def _prune(self, conn):
+        """Drop entries older than the maximum ledger age"""
+        cutoff = (datetime.now() - timedelta(days=self.max_age_days)).timestamp()
+        with conn:
+            conn.execute("DELETE FROM transfers WHERE ts < ?", (cutoff,))
+            conn.execute("DELETE FROM runs WHERE started < ?", (cutoff,))
+            conn.execute("DELETE FROM files WHERE id NOT IN (SELECT file_id FROM transfers)")
+
+    def _query(self, sql, params):
+        self.flush()
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def _since(self, days):
+        if not days:
+            return 0
+        return (datetime.now() - timedelta(days=days)).timestamp()
+
+    def largest_transfers(self, days=7, limit=20):
+        """Largest individual transfers in the last `days` days"""
+        return self._query(
+            "SELECT f.root, f.path, t.action, t.bytes, t.duration, "
+            "CASE WHEN t.duration > 0 THEN t.bytes / t.duration END AS throughput, "
+            "t.ts, t.run_id "
+            "FROM transfers t JOIN files f ON f.id = t.file_id "
+            "WHERE t.ts >= ? AND t.action IN ('copied', 'updated') "
+            "ORDER BY t.bytes DESC LIMIT ?",
+            (self._since(days), limit)
+        )
+
+    def most_updated(self, days=30, limit=20):
+        """Files that were re-transferred most often"""
+        return self._query(
+            "SELECT f.root, f.path, COUNT(*) AS updates, SUM(t.bytes) AS bytes, MAX(t.ts) AS ts "
+            "FROM transfers t JOIN files f ON f.id = t.file_id "
+            "WHERE t.ts >= ? AND t.action = 'updated' "
+            "GROUP BY t.file_id ORDER BY updates DESC, bytes DESC LIMIT ?",
+            (self._since(days), limit)
+        )
+
+    def slowest_directories(self, days=7, limit=20):
+        """Directories that consumed the most transfer time"""
+        return self._query(
+            "SELECT f.root, f.directory, COUNT(*) AS files, SUM(t.bytes) AS bytes, "
+            "SUM(t.duration) AS duration, "
+            "CASE WHEN SUM(t.duration) > 0 THEN SUM(t.bytes) / SUM(t.duration) END AS throughput "
+            "FROM transfers t JOIN files f ON f.id = t.file_id "
+            "WHERE t.ts >= ? AND t.action IN ('copied', 'updated') "
+            "GROUP BY f.root, f.directory ORDER BY duration DESC LIMIT ?",
+            (self._since(days), limit)
+        )
+
+    def errors(self, days=7, limit=50):
+        """Most recent per-file failures"""
+        return self._query(
+            "SELECT f.root, f.path, t.error, t.ts, t.run_id "
+            "FROM transfers t JOIN files f ON f.id = t.file_id "
+            "WHERE t.ts >= ? AND t.action = 'error' "
+            "ORDER BY t.ts DESC LIMIT ?",
+            (self._since(days), limit)
+        )
+
+    def run_transfers(self, run_id, limit=1000):
+        """All ledger entries of a single run"""
+        return self._query(
+            "SELECT f.path, t.action, t.bytes, t.duration, t.error, t.ts "
+            "FROM transfers t JOIN files f ON f.id = t.file_id "
+            "WHERE t.run_id = ? ORDER BY t.ts LIMIT ?",
+            (run_id, limit)
+        )
+
+    def run_query(self, name, days=7, limit=20):
+        """Dispatch one of the named QUERIES"""
+        if name == 'largest':
+            return self.largest_transfers(days, limit)
+        if name == 'most-updated':
+            return self.most_updated(days, limit)
+        if name == 'slowest-dirs':
+            return self.slowest_directories(days, limit)
+        if name == 'errors':
+            return self.errors(days, limit)
+        raise ValueError(f"Unknown ledger query: {name}")
+
+    def clear(self):
+        """Remove all ledger data"""
+        with self._lock:
+            self._pending = []
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM transfers")
+                conn.execute("DELETE FROM files")
+                conn.execute("DELETE FROM runs")
+        finally:
+            conn.close()
+
+
+def format_bytes(value):
+    """Human readable byte count"""
+    value = float(value or 0)
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if value < 1024 or unit == 'TB':
+            return f"{value:.1f} {unit}" if unit != 'B' else f"{int(value)} B"
+        value /= 1024
+
+
+def format_row(row):
+    """Format a query row for display"""
+    formatted = {}
+    for key, value in row.items():
+        if value is None:
+            formatted[key] = ''
+        elif key == 'bytes':
+            formatted[key] = format_bytes(value)
+        elif key == 'throughput':
+            formatted[key] = f"{format_bytes(value)}/s"
+        elif key == 'duration':
+            formatted[key] = f"{value:.2f}s"
+        elif key == 'ts':
+            formatted[key] = datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            formatted[key] = str(value)
+    return formatted
+
+
+def add_arguments(parser):
+    """Add ledger query arguments to an argparse parser"""
+    parser.add_argument('query', choices=sorted(QUERIES), help="Ledger query to run")
+    parser.add_argument('--days', type=int, default=7, help="Look back this many days (0 = all)")
+    parser.add_argument('--limit', type=int, default=20, help="Maximum rows to show")
+    parser.add_argument('--json', action='store_true', help="Print rows as JSON")
+
+
+def run_cli(args):
+    """Run a ledger query from parsed CLI arguments"""
+    rows = TransferLedger().run_query(args.query, args.days, args.limit)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+
+    print(QUERIES[args.query])
+    print("=" * 80)
+    if not rows:
+        print("No entries")
+        return 0
+
+    for row in rows:
+        print("  ".join(f"{key}={value}" for key, value in format_row(row).items()))
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the NAS Sync per-file transfer ledger")
+    add_arguments(parser)
+    return run_cli(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -74,6 +74,11 @@ class TrayIcon:
         return pystray.Menu(
             pystray.MenuItem("Show Window", self.show_window, default=True),
             pystray.MenuItem("Sync Now", self.sync_now),
+            pystray.MenuItem(
+                lambda item: "Resume Sync" if self.app.sync_paused else "Pause Sync",
+                self.toggle_pause,
+                enabled=lambda item: self.app.is_syncing,
+            ),
             pystray.Menu.SEPARATOR,
             pystray.MenuItem(
                 "Auto-Sync",
@@ -96,6 +101,9 @@ class TrayIcon:
     def sync_now(self, icon=None, item=None):
         self.app.root.after(0, self.app.sync_now)
 
+    def toggle_pause(self, icon=None, item=None):
+        self.app.root.after(0, self.app.toggle_pause)
+
     def toggle_auto_sync(self, icon=None, item=None):
         self.app.root.after(0, self.app.toggle_auto_sync)
 
@@ -0,0 +1,114 @@
+"""
+NAS Sync - Streaming tree diff
+
+Source and destination are both walked in the same order (depth first,
+names sorted, see parallel_walk.py), so the two sequences of directories
+can be merge-joined like two sorted files: a directory present on one side
+only is new or extra as a whole, a directory on both sides is diffed name
+by name. Results come out one file at a time while the walk is still
+running, and only the destination directory being joined is held in memory
+instead of every destination path.
+
+Statuses:
+  new      only in the source
+  changed  on both sides, compare() says they differ
+  same     on both sides and identical (or skipped, see diff_trees)
+  extra    only in the destination
+"""
+
+import os
+
+
+NEW = 'new'
+CHANGED = 'changed'
+SAME = 'same'
+EXTRA = 'extra'
+
+
+def dir_key(rel_dir, fold=None):
+    """Sort key matching the walk order: components compared one by one"""
+    if not rel_dir:
+        return ()
+    if fold:
+        return tuple(fold(part) for part in rel_dir.split(os.sep))
+    return tuple(rel_dir.split(os.sep))
+
+
+def source_groups(inventory):
+    """(relative directory, file indexes) of a FileInventory, in scan order"""
+    indexes = []
+    last = None
+    for index in inventory:
+        dir_index = inventory.dir_of[index]
+        if dir_index != last and indexes:
+            yield inventory.dirs[last], indexes
+            indexes = []
+        last = dir_index
+        indexes.append(index)
+    if indexes:
+        yield inventory.dirs[last], indexes
+
+
+def _diff_dir(inventory, rel_dir, indexes, files, compare, skip, keep_extra, fold):
+    # Names left in `remaining` after the source side are extras
+    if not files:
+        remaining = {}
+    elif fold:
+        remaining = {fold(name): (name, info) for name, info in files.items()}
+    else:
+        remaining = {name: (name, info) for name, info in files.items()}
+    for index in indexes:
+        name = inventory.names[index]
+        dest_info = remaining.pop(fold(name) if fold else name, (None, None))[1]
+        if skip and skip(index):
+            status = SAME
+        elif dest_info is None:
+            status = NEW
+        else:
+            status = CHANGED if compare(index, dest_info) else SAME
+        yield status, rel_dir, name, index, dest_info
+
+    if keep_extra:
+        for name, dest_info in sorted(remaining.values()):
+            if keep_extra(rel_dir, name):
+                yield EXTRA, rel_dir, name, None, dest_info
+
+
+def diff_trees(inventory, dest_listings, compare, skip=None, keep_extra=None, fold=None):
+    """Merge-join a source FileInventory with destination listings
+
+    dest_listings yields (relative directory, {name: (size, mtime)} or None
+    when missing) in walk order. compare(index, dest_info) decides whether
+    a file on both sides differs; skip(index) marks source files as same
+    without looking at the destination. Extras are only reported when
+    keep_extra(rel_dir, name) is given and returns True. fold (e.g.
+    str.lower) matches names case-insensitively; both walks must then be
+    sorted by the same key.
+
+    Yields (status, relative directory, name, source index, dest_info).
+    """
+    groups = source_groups(inventory)
+    listings = iter(dest_listings)
+    group = next(groups, None)
+    listing = next(listings, None)
+
+    while group is not None or listing is not None:
+        if listing is None or (group is not None and
+                               dir_key(group[0], fold) < dir_key(listing[0], fold)):
+            # Directory missing on the destination
+            for item in _diff_dir(inventory, group[0], group[1], None, compare, skip, None,
+                                  fold):
+                yield item
+            group = next(groups, None)
+        elif group is None or dir_key(group[0], fold) > dir_key(listing[0], fold):
+            # Directory without source files
+            for item in _diff_dir(inventory, listing[0], (), listing[1], compare, skip,
+                                  keep_extra, fold):
+                yield item
+            listing = next(listings, None)
+        else:
+            for item in _diff_dir(inventory, group[0], group[1], listing[1], compare, skip,
+                                  keep_extra, fold):
+                yield item
+            group = next(groups, None)
+            listing = next(listings, None)